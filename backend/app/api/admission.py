@@ -0,0 +1,171 @@
+import math
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+# Приоритеты маршрутов: лёгкие маршруты (/, /countries, /metrics, документация,
+# /admin) не ограничиваются вовсе, тяжёлые отсекаются раньше обычных
+PRIORITY_NORMAL = "normal"
+PRIORITY_LOW = "low"
+
+# (метод, путь, метка маршрута, приоритет); путь с "/" на конце — префикс
+ROUTE_RULES: Tuple[Tuple[str, str, str, str], ...] = (
+    ("POST", "/check", "/check", PRIORITY_NORMAL),
+    ("POST", "/check/stream", "/check/stream", PRIORITY_NORMAL),
+    ("POST", "/check/examples", "/check/examples", PRIORITY_NORMAL),
+    ("POST", "/check/batch", "/check/batch", PRIORITY_LOW),
+    ("POST", "/route", "/route", PRIORITY_LOW),
+    ("GET", "/countries/", "/countries/{country_code}/combinations", PRIORITY_NORMAL),
+)
+
+
+def classify(method: str, path: str) -> Optional[Tuple[str, str]]:
+    """
+    Определяет метку и приоритет маршрута по сырому пути запроса.
+
+    Middleware работает до маршрутизации FastAPI, поэтому путь сверяется
+    с ROUTE_RULES напрямую.
+
+    Returns:
+        Пара (метка маршрута, приоритет) или None, если маршрут не ограничивается.
+    """
+    for rule_method, rule_path, route, priority in ROUTE_RULES:
+        if method != rule_method:
+            continue
+        prefix = rule_path.endswith("/")
+        if path == rule_path or (prefix and path.startswith(rule_path)):
+            return route, priority
+    return None
+
+
+@dataclass(frozen=True)
+class Rejection:
+    """
+    Отказ в приёме запроса.
+
+    Attributes:
+        status (int): 503 — сервер исчерпал общий лимит, 429 — запрос
+            отсечён по приоритету или задержке, пока ёмкость ещё есть.
+        retry_after (int): Через сколько секунд стоит повторить запрос.
+        reason (str): Причина для тела ответа.
+    """
+
+    status: int
+    retry_after: int
+    reason: str
+
+
+class AdmissionController:
+    """
+    Контроль допуска: ограничивает число тяжёлых запросов в работе.
+
+    Все ограничиваемые маршруты делят общий лимит max_inflight. Запросы
+    низкого приоритета (/route, /check/batch) допускаются, только пока
+    занято меньше low_priority_share лимита, поэтому остаток зарезервирован
+    для /check. Для каждого маршрута ведётся экспоненциальное среднее
+    задержки; если оно выше latency_target, лимит маршрута уменьшается
+    пропорционально (target / задержка), чтобы очередь не росла,
+    пока клиенты не отвалятся по таймауту. Среднее затухает со временем
+    (вдвое за latency_half_life секунд без новых замеров), поэтому
+    маршрут, отсекавший запросы во время всплеска, не остаётся
+    зажатым, когда через него перестают проходить медленные запросы.
+
+    Потокобезопасен.
+
+    Attributes:
+        max_inflight (int): Общий лимит запросов в работе (0 — без контроля).
+        low_priority_share (float): Доля лимита для запросов низкого приоритета.
+        latency_target (float): Целевая задержка маршрута в секундах
+            (0 — не учитывать задержку).
+        smoothing (float): Вес нового замера в среднем задержки.
+        latency_half_life (float): Период полураспада среднего задержки
+            в секундах (0 — не затухает).
+    """
+
+    def __init__(
+        self,
+        max_inflight: int = 32,
+        low_priority_share: float = 0.5,
+        latency_target: float = 2.0,
+        smoothing: float = 0.2,
+        latency_half_life: float = 10.0,
+    ) -> None:
+        self.max_inflight = max_inflight
+        self.low_priority_share = low_priority_share
+        self.latency_target = latency_target
+        self.smoothing = smoothing
+        self.latency_half_life = latency_half_life
+        self._lock = threading.Lock()
+        # Маршрут -> (среднее задержки, время последнего замера)
+        self._latency: Dict[str, Tuple[float, float]] = {}
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected_overloaded = 0
+        self.rejected_shed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_inflight > 0
+
+    def latency(self, route: str) -> float:
+        """Среднее задержки маршрута с учётом затухания (0 — замеров не было)."""
+        entry = self._latency.get(route)
+        if entry is None:
+            return 0.0
+        latency, measured_at = entry
+        if self.latency_half_life:
+            elapsed = time.monotonic() - measured_at
+            latency *= 0.5 ** (elapsed / self.latency_half_life)
+        return latency
+
+    def limit(self, route: str, priority: str) -> int:
+        """Текущий лимит запросов в работе, при котором маршрут ещё допускается."""
+        limit = self.max_inflight
+        if priority == PRIORITY_LOW:
+            limit = max(1, math.floor(limit * self.low_priority_share))
+        latency = self.latency(route)
+        if self.latency_target and latency > self.latency_target:
+            limit = max(1, math.floor(limit * self.latency_target / latency))
+        return limit
+
+    def acquire(self, route: str, priority: str) -> Optional[Rejection]:
+        """
+        Пытается занять место для запроса.
+
+        Returns:
+            None, если запрос принят (после него обязателен release),
+            иначе Rejection.
+        """
+        with self._lock:
+            if self.in_flight < self.limit(route, priority):
+                self.in_flight += 1
+                self.admitted += 1
+                return None
+
+            retry_after = max(1, math.ceil(self.latency(route)))
+            if self.in_flight >= self.max_inflight:
+                self.rejected_overloaded += 1
+                return Rejection(503, retry_after, "Server is overloaded")
+            self.rejected_shed += 1
+            return Rejection(429, retry_after, f"Too many concurrent {route} requests")
+
+    def release(self, route: str, elapsed: float) -> None:
+        """Освобождает место и учитывает задержку завершившегося запроса."""
+        with self._lock:
+            self.in_flight -= 1
+            if route in self._latency:
+                previous = self.latency(route)
+                elapsed = previous + self.smoothing * (elapsed - previous)
+            self._latency[route] = (elapsed, time.monotonic())
+
+    def stats(self) -> Dict[str, float]:
+        """Возвращает лимит, число запросов в работе и счётчики отказов."""
+        with self._lock:
+            return {
+                "max_inflight": self.max_inflight,
+                "in_flight": self.in_flight,
+                "admitted": self.admitted,
+                "rejected_overloaded": self.rejected_overloaded,
+                "rejected_shed": self.rejected_shed,
+            }
@@ -1,14 +1,23 @@
 from functools import lru_cache
+from pathlib import Path
 
+from app.api.admission import AdmissionController
+from app.core.config import get_settings
 from app.core.repository import CountryRepository
+from app.services.cache import ResultCache
 from app.services.calculator import PlateCalculator
+from app.services.executor import ComputeExecutor
 from app.services.plate_service import PlateService
 
 
 @lru_cache
 def get_country_repository() -> CountryRepository:
     """Возвращает экземпляр репозитория стран."""
-    return CountryRepository()
+    settings = get_settings()
+    return CountryRepository(
+        watch_interval=settings.data_watch_interval,
+        snapshot_file=Path(settings.snapshot_path) if settings.snapshot_path else None,
+    )
 
 
 @lru_cache
@@ -17,10 +26,44 @@ def get_plate_calculator() -> PlateCalculator:
     return PlateCalculator()
 
 
+@lru_cache
+def get_result_cache() -> ResultCache:
+    """Возвращает кэш результатов с лимитами из настроек окружения."""
+    settings = get_settings()
+    return ResultCache(max_size=settings.cache_max_size, ttl=settings.cache_ttl)
+
+
 @lru_cache
 def get_plate_service() -> PlateService:
     """Собирает PlateService со всеми зависимостями."""
     return PlateService(
         repository=get_country_repository(),
         calculator=get_plate_calculator(),
+        cache=get_result_cache(),
+        engine=get_settings().engine,
+    )
+
+
+@lru_cache
+def get_compute_executor() -> ComputeExecutor:
+    """Возвращает исполнитель вычислений с режимом из настроек окружения."""
+    settings = get_settings()
+    return ComputeExecutor(
+        mode=settings.executor_mode,
+        max_workers=settings.executor_workers,
+        max_pending=settings.executor_max_pending,
+        timeout=settings.executor_timeout,
+        service_factory=get_plate_service,
+    )
+
+
+@lru_cache
+def get_admission_controller() -> AdmissionController:
+    """Возвращает контроль допуска с лимитами из настроек окружения."""
+    settings = get_settings()
+    return AdmissionController(
+        max_inflight=settings.admission_max_inflight,
+        low_priority_share=settings.admission_low_priority_share,
+        latency_target=settings.admission_latency_target,
+        latency_half_life=settings.admission_latency_half_life,
     )
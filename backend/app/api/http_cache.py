@@ -0,0 +1,55 @@
+import hashlib
+from typing import Hashable, Optional
+
+from app.core.config import get_settings
+from fastapi import Request, Response
+
+
+def make_etag(dataset_digest: str, *key: Hashable) -> str:
+    """
+    Строит сильный ETag ответа по хешу содержимого данных и ключу запроса.
+
+    Ответы детерминированных эндпоинтов (включая примеры номеров)
+    зависят только от этих значений, поэтому одинаковый ETag гарантирует
+    побайтно тот же ответ. Хеш данных (DatasetSnapshot.digest), в отличие
+    от версии снимка, не сбрасывается при перезапуске и совпадает
+    у всех воркеров.
+    """
+    digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{dataset_digest}-{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    """Проверяет If-None-Match (список тегов, слабые теги, "*")."""
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    Возвращает ответ 304, если клиент уже получил ответ с этим ETag.
+
+    Проверка выполняется до вызова сервиса, поэтому повторный запрос
+    с актуальным If-None-Match не запускает расчёт. 304 определён только
+    для GET и HEAD (RFC 9110, 13.1.2), поэтому для остальных методов
+    If-None-Match игнорируется и ответ всегда содержит тело.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None
+    header = request.headers.get("if-none-match")
+    if header is None or not _matches(header, etag):
+        return None
+    response = Response(status_code=304)
+    return tag(response, etag)
+
+
+def tag(response: Response, etag: str) -> Response:
+    """Проставляет ETag и настроенный Cache-Control."""
+    response.headers["ETag"] = etag
+    cache_control = get_settings().http_cache_control
+    if cache_control:
+        response.headers["Cache-Control"] = cache_control
+    return response
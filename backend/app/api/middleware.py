@@ -0,0 +1,163 @@
+import os
+import time
+import uuid
+
+from app.api.admission import AdmissionController, classify
+from app.core.metrics import metrics
+from app.core.profiling import EXTENSIONS, FORMATS, RequestProfile, current_profile
+from fastapi.responses import JSONResponse
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware, записывающее длительность HTTP-запросов по маршрутам.
+
+    Метка route — шаблон пути FastAPI (например, "/check"), а не сырой URL,
+    чтобы число временных рядов оставалось ограниченным.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            metrics.request_latency.observe(
+                time.perf_counter() - started,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI-middleware контроля допуска (см. AdmissionController).
+
+    Запросы к ограничиваемым маршрутам сверх лимита отклоняются сразу,
+    до разбора тела и постановки в очередь вычислений: 503 при исчерпании
+    общего лимита, 429 при отсечении по приоритету или задержке; в обоих
+    случаях с заголовком Retry-After. Лёгкие маршруты проходят без учёта.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        rule = classify(scope["method"], scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        route, priority = rule
+        rejection = self.controller.acquire(route, priority)
+        if rejection is not None:
+            response = JSONResponse(
+                status_code=rejection.status,
+                content={"detail": rejection.reason},
+                headers={"Retry-After": str(rejection.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(route, time.perf_counter() - started)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI-middleware профилирования отдельных запросов (см. RequestProfile).
+
+    Подключается только при BACKEND_PROFILING=1, поэтому обычные запросы
+    его не проходят. Запрос с заголовком "X-Profile: pstats" или
+    "X-Profile: collapsed" выполняется под профилировщиком, профиль
+    записывается в каталог directory, а путь к файлу возвращается
+    в заголовке X-Profile-File. Одновременно профилируется один запрос:
+    профилировщики потока event loop мешали бы друг другу. Если cProfile
+    занят вне middleware, запрос pstats сэмплируется (файл .collapsed.txt).
+
+    Повторный запрос может быть отдан из кэша результатов; чтобы увидеть
+    расчёт, профилируйте новый запрос или отключите кэш.
+    """
+
+    def __init__(self, app, directory: str):
+        self.app = app
+        self.directory = directory
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = dict(scope["headers"]).get(b"x-profile")
+        if requested is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_format = requested.decode("latin-1").strip().lower()
+        if profile_format not in FORMATS:
+            response = JSONResponse(
+                status_code=400,
+                content={
+                    "detail": f"X-Profile must be one of: {', '.join(FORMATS)}"
+                },
+            )
+            await response(scope, receive, send)
+            return
+        if self._active:
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": "Another request is being profiled"},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_path(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", path.encode("utf-8")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        profile = RequestProfile(profile_format)
+        token = current_profile.set(profile)
+        self._active = True
+        profile.start()
+        # Формат известен после start: занятый cProfile заменяется сэмплером
+        path = os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            f"{EXTENSIONS[profile.format]}",
+        )
+        try:
+            await self.app(scope, receive, send_with_path)
+        finally:
+            profile.stop()
+            current_profile.reset(token)
+            self._active = False
+            profile.dump(path)
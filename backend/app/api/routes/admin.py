@@ -0,0 +1,40 @@
+import secrets
+
+from app.api.deps import get_country_repository
+from app.core.config import get_settings
+from app.core.repository import CountryRepository
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin_token(x_admin_token: str = Header(default="")) -> None:
+    """Пропускает запрос только с верным X-Admin-Token."""
+    token = get_settings().admin_token
+    if not token:
+        # Без настроенного токена служебные эндпоинты не существуют
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_admin_token, token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.post(
+    "/reload",
+    status_code=202,
+    dependencies=[Depends(require_admin_token)],
+    summary="Перезагрузить данные стран",
+    description=(
+        "Запускает фоновую перезагрузку CSV. Новый снимок данных подменяет "
+        "текущий атомарно; запросы в работе дорабатывают со старым. "
+        "При ошибке чтения остаётся прежняя версия."
+    ),
+)
+async def reload_countries(
+    repository: CountryRepository = Depends(get_country_repository),
+):
+    """HTTP-обработчик перезагрузки данных."""
+    started = repository.reload_in_background()
+    return {
+        "status": "started" if started else "in_progress",
+        "version": repository.version,
+    }
@@ -0,0 +1,21 @@
+from app.core.metrics import metrics
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(prefix="", tags=["Monitoring"])
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Метрики в формате Prometheus",
+    description=(
+        "Гистограммы задержек по маршрутам и внутренним стадиям расчёта, "
+        "счётчики оценённых и пропущенных стран, статистика кэша и исполнителя."
+    ),
+)
+async def read_metrics():
+    """HTTP-обработчик экспорта метрик."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -1,11 +1,32 @@
-from typing import List
+import json
+from typing import AsyncIterator, Callable, List, Literal, Optional
 
-from app.api.deps import get_plate_service
+from app.api import http_cache
+from app.api.deps import get_compute_executor, get_plate_service
+from app.api.serialization import (
+    encode_batch_response,
+    encode_result,
+    encode_search_response,
+)
+from app.core.metrics import stage
+from app.schemas.combination import CombinationsResponse
 from app.schemas.country import CountrySchema
-from app.schemas.search import SearchRequest, SearchResponse
+from app.schemas.plate import ExamplesMode
+from app.schemas.search import (
+    MAX_QUERY_POSITIONS,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    ExamplesRequest,
+    ExamplesResponse,
+    SearchRequest,
+    SearchResponse,
+)
 from app.schemas.trip import TripRouteResponse
-from app.services.plate_service import PlateService
-from fastapi import APIRouter, Depends
+from app.services.executor import ComputeExecutor
+from app.services.plate_service import DEFAULT_ROUTE_STOPS, PlateService
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
 
 router = APIRouter(prefix="", tags=["Plates"])
 
@@ -17,10 +38,58 @@ router = APIRouter(prefix="", tags=["Plates"])
     description="Возвращает полный список поддерживаемых стран с шаблонами номерных знаков.",
 )
 async def list_countries(
+    http_request: Request,
+    response: Response,
     service: PlateService = Depends(get_plate_service),
 ):
     """HTTP-обработчик списка стран."""
-    return service.repository.get_all()
+    snapshot = service.repository.get_snapshot()
+    etag = http_cache.make_etag(snapshot.digest, "countries")
+    cached = http_cache.not_modified(http_request, etag)
+    if cached is not None:
+        return cached
+    http_cache.tag(response, etag)
+    return snapshot.countries
+
+
+@router.get(
+    "/countries/{country_code}/combinations",
+    response_model=CombinationsResponse,
+    summary="Самые вероятные комбинации страны",
+    description=(
+        "Обратный поиск: комбинации заданной длины, которые чаще всего "
+        "встречаются в номерах страны, и её самые вероятные числа. "
+        "Короткие длины отдаются из таблицы, построенной при загрузке данных."
+    ),
+)
+async def country_combinations(
+    http_request: Request,
+    country_code: str,
+    length: int = Query(
+        3, ge=1, le=MAX_QUERY_POSITIONS, description="Длина комбинации."
+    ),
+    limit: int = Query(10, ge=1, le=100, description="Сколько комбинаций вернуть."),
+    service: PlateService = Depends(get_plate_service),
+    executor: ComputeExecutor = Depends(get_compute_executor),
+):
+    """HTTP-обработчик обратного поиска комбинаций."""
+    etag = http_cache.make_etag(
+        service.repository.get_snapshot().digest,
+        "combinations",
+        country_code.upper(),
+        length,
+        limit,
+    )
+    cached = http_cache.not_modified(http_request, etag)
+    if cached is not None:
+        return cached
+
+    response = await executor.run(
+        service, "get_combinations", country_code, length=length, limit=limit
+    )
+    if response is None:
+        raise HTTPException(status_code=404, detail="Unknown country code")
+    return http_cache.tag(_json_response(response), etag)
 
 
 @router.post(
@@ -29,30 +98,232 @@ async def list_countries(
     summary="Проверить комбинацию номерного знака",
     description=(
         "Вычисляет вероятность вхождения комбинации "
-        "в номера всех поддерживаемых стран."
+        "в номера всех поддерживаемых стран. В suggestions — варианты "
+        "с заменой похожих символов (O/0, S/5, ...), дающие лучший шанс."
     ),
 )
 async def check_plate(
     request: SearchRequest,
     lang: str = "ru",
+    limit: Optional[int] = Query(
+        None, ge=1, description="Сколько лучших стран вернуть."
+    ),
+    min_probability: Optional[float] = Query(
+        None, ge=0.0, le=100.0, description="Минимальная вероятность страны, %."
+    ),
+    examples: ExamplesMode = Query(
+        "full",
+        description=(
+            "Формат примеров номеров: full (посимвольно), compact "
+            "(строка и битовая маска) или none (без примеров)."
+        ),
+    ),
     service: PlateService = Depends(get_plate_service),
+    executor: ComputeExecutor = Depends(get_compute_executor),
 ):
-    """HTTP-обработчик проверки комбинации."""
-    results = service.check_plate(request.query, lang)
+    """
+    HTTP-обработчик проверки комбинации.
 
-    if not results:
-        return SearchResponse(results=[], total_results=0, max_probability=0.0)
+    Ответ детерминирован для (запрос, параметры, содержимое данных), поэтому
+    отдаётся с ETag. Для POST If-None-Match не проверяется: 304 допустим
+    только для GET и HEAD.
+    """
+    etag = http_cache.make_etag(
+        service.repository.get_snapshot().digest,
+        "check",
+        request.query.strip().upper(),
+        lang,
+        limit,
+        min_probability,
+        examples,
+    )
+    search = await executor.run(
+        service,
+        "search_plate",
+        request.query,
+        lang,
+        limit=limit,
+        min_probability=min_probability,
+        examples=examples,
+    )
+
+    return http_cache.tag(
+        _encoded_response(
+            lambda: encode_search_response(
+                search.results, search.total, search.suggestions
+            )
+        ),
+        etag,
+    )
 
-    # Статистика теперь тоже вычисляется на бэкенде
-    max_prob = max(r.probability for r in results) if results else 0.0
 
-    return SearchResponse(
-        results=results,
-        total_results=len(results),
-        max_probability=max_prob,
+@router.post(
+    "/check/stream",
+    summary="Проверить комбинацию с потоковой выдачей",
+    description=(
+        "Отдаёт результаты по странам по мере вычисления (в порядке убывания "
+        "вероятности) в формате NDJSON или Server-Sent Events. "
+        "Последнее событие summary содержит total_results и max_probability."
+    ),
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+            "description": "Поток событий result и завершающее событие summary.",
+        }
+    },
+)
+async def check_plate_stream(
+    request: SearchRequest,
+    lang: str = "ru",
+    stream_format: Literal["ndjson", "sse"] = Query("ndjson", alias="format"),
+    examples: ExamplesMode = Query("full", description="Формат примеров номеров."),
+    service: PlateService = Depends(get_plate_service),
+    executor: ComputeExecutor = Depends(get_compute_executor),
+):
+    """
+    HTTP-обработчик потоковой проверки комбинации.
+
+    Поток проходит через исполнитель, как и /check: он учитывается в лимите
+    очереди и ограничен таймаутом.
+    """
+    results = await executor.stream(
+        service, "iter_plate", request.query, lang, examples
+    )
+
+    if stream_format == "sse":
+        return StreamingResponse(
+            _stream_events(results, _format_sse),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    return StreamingResponse(
+        _stream_events(results, _format_ndjson), media_type="application/x-ndjson"
     )
 
 
+def _format_ndjson(event: str, data: str) -> str:
+    """Одна строка NDJSON: {"event": ..., "data": ...}."""
+    return f'{{"event":"{event}","data":{data}}}\n'
+
+
+def _format_sse(event: str, data: str) -> str:
+    """Одно событие Server-Sent Events."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def _stream_events(results, formatter) -> AsyncIterator[str]:
+    """
+    Сериализует результаты по одному и завершает поток сводкой.
+
+    Результаты строятся исполнителем (ComputeExecutor.stream), поэтому
+    построение не блокирует event loop. Поток не ограничен лимитом, поэтому
+    total_results сводки совпадает с total_results ответа /check.
+    """
+    total = 0
+    max_prob = 0.0
+    async for result in results:
+        total += 1
+        max_prob = max(max_prob, result.probability)
+        yield formatter("result", encode_result(result).decode("utf-8"))
+
+    summary = json.dumps({"total_results": total, "max_probability": max_prob})
+    yield formatter("summary", summary)
+
+
+@router.post(
+    "/check/batch",
+    response_model=BatchSearchResponse,
+    summary="Проверить пакет комбинаций",
+    description=(
+        "Вычисляет вероятности для нескольких комбинаций за один запрос. "
+        "Параметр top ограничивает число стран в ответе на каждую комбинацию."
+    ),
+)
+async def check_plate_batch(
+    request: BatchSearchRequest,
+    lang: str = "ru",
+    service: PlateService = Depends(get_plate_service),
+    executor: ComputeExecutor = Depends(get_compute_executor),
+):
+    """HTTP-обработчик пакетной проверки комбинаций."""
+    queries = [item.query for item in request.queries]
+    searches = await executor.run(
+        service,
+        "search_plates",
+        queries,
+        lang,
+        limit=request.top,
+        min_probability=request.min_probability,
+        examples=request.examples,
+    )
+
+    batch = [(search.results, search.total) for search in searches]
+    return _encoded_response(lambda: encode_batch_response(queries, batch))
+
+
+@router.post(
+    "/check/examples",
+    response_model=ExamplesResponse,
+    summary="Получить ещё примеры номеров",
+    description=(
+        "Постранично отдаёт примеры номеров страны, содержащих комбинацию. "
+        "Примеры детерминированы: первая страница совпадает с примерами /check."
+    ),
+)
+async def check_plate_examples(
+    request: ExamplesRequest,
+    service: PlateService = Depends(get_plate_service),
+    executor: ComputeExecutor = Depends(get_compute_executor),
+):
+    """HTTP-обработчик листания примеров."""
+    # Запрашивается на одну запись больше, чтобы узнать о следующей странице
+    page = await executor.run(
+        service,
+        "get_examples",
+        request.query,
+        request.country_code,
+        request.offset,
+        request.count + 1,
+    )
+    if page is None:
+        raise HTTPException(status_code=404, detail="Unknown country code")
+
+    has_more = len(page) > request.count
+    return _json_response(
+        ExamplesResponse(
+            query=request.query,
+            country_code=request.country_code,
+            offset=request.offset,
+            examples=page[: request.count],
+            next_offset=request.offset + request.count if has_more else None,
+        )
+    )
+
+
+def _encoded_response(encode: Callable[[], bytes]) -> Response:
+    """
+    Отдаёт тело, собранное быстрым сериализатором, внутри стадии "serialization".
+
+    Схема OpenAPI по-прежнему описывается response_model декоратора.
+    """
+    with stage("serialization"):
+        body = encode()
+    return Response(content=body, media_type="application/json")
+
+
+def _json_response(model: BaseModel) -> Response:
+    """
+    Сериализует модель ответа в JSON внутри стадии "serialization".
+
+    Модель уже собрана и провалидирована, поэтому повторная обработка
+    через response_model не нужна; схема OpenAPI берётся из декоратора.
+    """
+    with stage("serialization"):
+        body = model.model_dump_json()
+    return Response(content=body, media_type="application/json")
+
+
 @router.post(
     "/route",
     response_model=TripRouteResponse,
@@ -62,10 +333,22 @@ async def check_plate(
 async def build_route(
     request: SearchRequest,
     lang: str = "ru",
+    max_stops: int = Query(
+        DEFAULT_ROUTE_STOPS,
+        ge=1,
+        description="Сколько стран включить в маршрут (не больше числа стран).",
+    ),
     service: PlateService = Depends(get_plate_service),
+    executor: ComputeExecutor = Depends(get_compute_executor),
 ):
     """Генерация маршрута со ссылками на билеты."""
-    segments = service.create_luck_route(
-        request.query, lang, user_lat=request.user_lat, user_lng=request.user_lng
+    segments = await executor.run(
+        service,
+        "create_luck_route",
+        request.query,
+        lang,
+        user_lat=request.user_lat,
+        user_lng=request.user_lng,
+        max_stops=max_stops,
     )
-    return TripRouteResponse(segments=segments)
+    return _json_response(TripRouteResponse(segments=segments))
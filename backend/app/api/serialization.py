@@ -0,0 +1,77 @@
+import json
+from typing import List, Sequence, Tuple
+
+from app.schemas.plate import PlateCalculationResult
+
+
+def encode_result(result: PlateCalculationResult) -> bytes:
+    """
+    Возвращает JSON результата, сериализуя его не больше одного раза.
+
+    Результаты, которые отдаёт сервис, не изменяются и переиспользуются
+    кэшем, поэтому готовые байты хранятся в приватном поле модели:
+    повторный ответ из кэша склеивается из готовых фрагментов без обхода
+    дерева символов и примеров и без повторной валидации.
+    """
+    private = result.__pydantic_private__
+    encoded = private["_encoded"]
+    if encoded is None:
+        encoded = private["_encoded"] = result.__pydantic_serializer__.to_json(result)
+    return encoded
+
+
+def _search_fields(
+    results: Sequence[PlateCalculationResult],
+    total: int,
+    suggestions: Sequence[str] = (),
+) -> bytes:
+    """
+    Поля SearchResponse без фигурных скобок.
+
+    total — число подходящих стран без учёта лимита, поэтому оно может быть
+    больше len(results).
+    """
+    max_probability = max((r.probability for r in results), default=0.0)
+    return b"".join(
+        (
+            b'"results":[',
+            b",".join([encode_result(r) for r in results]),
+            b'],"total_results":%d,"max_probability":%s,"suggestions":%s'
+            % (
+                total,
+                json.dumps(max_probability).encode(),
+                json.dumps(list(suggestions), ensure_ascii=False).encode(),
+            ),
+        )
+    )
+
+
+def encode_search_response(
+    results: Sequence[PlateCalculationResult],
+    total: int,
+    suggestions: Sequence[str] = (),
+) -> bytes:
+    """Тело SearchResponse для списка результатов и числа стран без лимита."""
+    return b"{" + _search_fields(results, total, suggestions) + b"}"
+
+
+def encode_batch_response(
+    queries: List[str],
+    batch: Sequence[Tuple[Sequence[PlateCalculationResult], int]],
+) -> bytes:
+    """
+    Тело BatchSearchResponse (элементы в порядке запросов).
+
+    Элемент batch — пара (результаты, число стран без учёта лимита).
+    """
+    items = b",".join(
+        [
+            b"{%s,\"query\":%s}"
+            % (
+                _search_fields(results, total),
+                json.dumps(query, ensure_ascii=False).encode(),
+            )
+            for query, (results, total) in zip(queries, batch)
+        ]
+    )
+    return b'{"items":[' + items + b"]}"
@@ -0,0 +1,137 @@
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+
+
+def _env_int(name: str, default: int) -> int:
+    """Читает целое число из переменной окружения."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return int(value)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Читает флаг из переменной окружения ("1", "true", "yes", "on")."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name: str, default: float) -> float:
+    """Читает число с плавающей точкой из переменной окружения."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return float(value)
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Настройки бэкенда, считываемые из переменных окружения.
+
+    Attributes:
+        cache_max_size (int): Максимальное число запросов в кэше результатов
+            (BACKEND_CACHE_MAX_SIZE, 0 — кэш отключён).
+        cache_ttl (float): Время жизни записи кэша в секундах (BACKEND_CACHE_TTL).
+        engine (str): Движок подсчёта совпадений: "vectorized" (NumPy, по всем
+            странам сразу) или "scalar" (BACKEND_ENGINE).
+        executor_mode (str): Где выполняются вычисления: "inline", "thread"
+            или "process" (BACKEND_EXECUTOR_MODE).
+        executor_workers (int): Размер пула (BACKEND_EXECUTOR_WORKERS).
+        executor_max_pending (int): Максимум принятых вычислений, сверх него
+            запросы отклоняются с 503 (BACKEND_EXECUTOR_MAX_PENDING, 0 — без лимита).
+        executor_timeout (float): Таймаут вычисления в секундах, по истечении
+            запрос завершается с 504 (BACKEND_EXECUTOR_TIMEOUT, 0 — без лимита).
+        data_watch_interval (float): Период проверки изменений CSV в секундах;
+            при изменении данные перезагружаются в фоне
+            (BACKEND_DATA_WATCH_INTERVAL, 0 — не следить).
+        snapshot_path (str): Путь бинарного снимка данных
+            (BACKEND_SNAPSHOT_PATH, пустой — countries.bin рядом с CSV).
+        admin_token (str): Токен для служебных эндпоинтов /admin
+            (BACKEND_ADMIN_TOKEN, пустой — эндпоинты отключены).
+        admission_max_inflight (int): Сколько тяжёлых запросов (/check, /route,
+            ...) может быть в работе, сверх лимита ответ 503/429 с Retry-After
+            (BACKEND_ADMISSION_MAX_INFLIGHT, 0 — без контроля допуска).
+        admission_low_priority_share (float): Доля лимита, доступная /route
+            и /check/batch (BACKEND_ADMISSION_LOW_PRIORITY_SHARE).
+        admission_latency_target (float): Целевая задержка маршрута в секундах;
+            при превышении его лимит снижается
+            (BACKEND_ADMISSION_LATENCY_TARGET, 0 — не учитывать задержку).
+        admission_latency_half_life (float): За сколько секунд среднее
+            задержки маршрута затухает вдвое
+            (BACKEND_ADMISSION_LATENCY_HALF_LIFE, 0 — не затухает).
+        http_cache_control (str): Заголовок Cache-Control детерминированных
+            ответов с ETag (/countries, /check, комбинации)
+            (BACKEND_HTTP_CACHE_CONTROL, пустой — не отправлять).
+        profiling_enabled (bool): Разрешает профилировать запросы с заголовком
+            X-Profile (BACKEND_PROFILING; выключено — middleware не подключается).
+        profile_dir (str): Каталог для файлов профилей (BACKEND_PROFILE_DIR).
+    """
+
+    cache_max_size: int = 1024
+    cache_ttl: float = 600.0
+    engine: str = "vectorized"
+    executor_mode: str = "thread"
+    executor_workers: int = 4
+    executor_max_pending: int = 64
+    executor_timeout: float = 10.0
+    data_watch_interval: float = 5.0
+    snapshot_path: str = ""
+    admin_token: str = ""
+    admission_max_inflight: int = 32
+    admission_low_priority_share: float = 0.5
+    admission_latency_target: float = 2.0
+    admission_latency_half_life: float = 10.0
+    # По умолчанию кэши хранят ответ, но сверяют ETag перед каждым использованием
+    http_cache_control: str = "no-cache"
+    profiling_enabled: bool = False
+    profile_dir: str = os.path.join(tempfile.gettempdir(), "signluck-profiles")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Собирает настройки из окружения, подставляя значения по умолчанию."""
+        return cls(
+            cache_max_size=_env_int("BACKEND_CACHE_MAX_SIZE", cls.cache_max_size),
+            cache_ttl=_env_float("BACKEND_CACHE_TTL", cls.cache_ttl),
+            engine=os.getenv("BACKEND_ENGINE", cls.engine).strip().lower(),
+            executor_mode=os.getenv(
+                "BACKEND_EXECUTOR_MODE", cls.executor_mode
+            ).strip().lower(),
+            executor_workers=_env_int("BACKEND_EXECUTOR_WORKERS", cls.executor_workers),
+            executor_max_pending=_env_int(
+                "BACKEND_EXECUTOR_MAX_PENDING", cls.executor_max_pending
+            ),
+            executor_timeout=_env_float("BACKEND_EXECUTOR_TIMEOUT", cls.executor_timeout),
+            data_watch_interval=_env_float(
+                "BACKEND_DATA_WATCH_INTERVAL", cls.data_watch_interval
+            ),
+            snapshot_path=os.getenv("BACKEND_SNAPSHOT_PATH", cls.snapshot_path).strip(),
+            admin_token=os.getenv("BACKEND_ADMIN_TOKEN", cls.admin_token).strip(),
+            admission_max_inflight=_env_int(
+                "BACKEND_ADMISSION_MAX_INFLIGHT", cls.admission_max_inflight
+            ),
+            admission_low_priority_share=_env_float(
+                "BACKEND_ADMISSION_LOW_PRIORITY_SHARE", cls.admission_low_priority_share
+            ),
+            admission_latency_target=_env_float(
+                "BACKEND_ADMISSION_LATENCY_TARGET", cls.admission_latency_target
+            ),
+            admission_latency_half_life=_env_float(
+                "BACKEND_ADMISSION_LATENCY_HALF_LIFE", cls.admission_latency_half_life
+            ),
+            http_cache_control=os.getenv(
+                "BACKEND_HTTP_CACHE_CONTROL", cls.http_cache_control
+            ).strip(),
+            profiling_enabled=_env_bool("BACKEND_PROFILING", cls.profiling_enabled),
+            profile_dir=os.getenv("BACKEND_PROFILE_DIR", cls.profile_dir).strip(),
+        )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """Возвращает настройки процесса."""
+    return Settings.from_env()
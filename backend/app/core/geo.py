@@ -0,0 +1,97 @@
+import math
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy необязателен
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Расстояние по большому кругу между двумя точками, км."""
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = (
+        math.sin(dlat / 2) ** 2
+        + math.cos(math.radians(lat1))
+        * math.cos(math.radians(lat2))
+        * math.sin(dlon / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _haversine_grid(lat1, lon1, lat2, lon2):
+    """Векторизованный haversine: аргументы в радианах, с broadcasting."""
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+@dataclass(frozen=True)
+class DistanceMatrix:
+    """
+    Попарные расстояния между странами набора данных.
+
+    Считается один раз при построении снимка данных, поэтому маршрут
+    берёт расстояния между кандидатами индексированием без тригонометрии.
+
+    Attributes:
+        values (np.ndarray): values[i, j] — расстояние между странами, км,
+            форма (C, C).
+        lats (np.ndarray): Широты стран в радианах.
+        lngs (np.ndarray): Долготы стран в радианах.
+    """
+
+    values: "np.ndarray"
+    lats: "np.ndarray"
+    lngs: "np.ndarray"
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    @classmethod
+    def from_points(
+        cls, lats: Sequence[float], lngs: Sequence[float]
+    ) -> Optional["DistanceMatrix"]:
+        """Строит матрицу по координатам в градусах (None без NumPy)."""
+        if np is None:
+            return None
+        lat = np.radians(np.asarray(lats, dtype=np.float64))
+        lng = np.radians(np.asarray(lngs, dtype=np.float64))
+        values = _haversine_grid(lat[:, None], lng[:, None], lat[None, :], lng[None, :])
+        return cls(values=values, lats=lat, lngs=lng)
+
+    def from_origin(self, lat: float, lng: float, indices: Sequence[int]) -> "np.ndarray":
+        """Расстояния от произвольной точки (в градусах) до стран indices."""
+        idx = np.asarray(indices, dtype=np.intp)
+        return _haversine_grid(
+            math.radians(lat), math.radians(lng), self.lats[idx], self.lngs[idx]
+        )
+
+    def submatrix(
+        self,
+        indices: Sequence[int],
+        origin: Optional[tuple] = None,
+    ) -> "np.ndarray":
+        """
+        Матрица расстояний между странами indices.
+
+        Если задана точка origin (широта, долгота), она добавляется
+        узлом 0, а страны сдвигаются на единицу.
+        """
+        idx = np.asarray(indices, dtype=np.intp)
+        sub = self.values[np.ix_(idx, idx)]
+        if origin is None:
+            return sub
+
+        row = self.from_origin(origin[0], origin[1], idx)
+        full = np.zeros((len(idx) + 1, len(idx) + 1), dtype=np.float64)
+        full[0, 1:] = row
+        full[1:, 0] = row
+        full[1:, 1:] = sub
+        return full
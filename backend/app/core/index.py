@@ -0,0 +1,146 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+from app.core.plan import DIGIT_SLOT, LETTER_SLOT, PlatePlan, slot_mask
+from app.core.query import query_classes
+
+
+@dataclass(frozen=True, slots=True)
+class CapabilitySignature:
+    """
+    Сводка возможностей шаблона страны для быстрого отсева запросов.
+
+    Attributes:
+        length (int): Число слотов шаблона.
+        letter_slots (int): Число буквенных слотов.
+        digit_slots (int): Число цифровых слотов.
+        letters_mask (int): Битовая маска разрешённых букв.
+        literals (str): Фиксированные символы шаблона.
+    """
+
+    length: int
+    letter_slots: int
+    digit_slots: int
+    letters_mask: int
+    literals: str
+
+    @property
+    def letter_capacity(self) -> int:
+        """Сколько букв максимум может быть в номере."""
+        return self.letter_slots + sum(c.isalpha() for c in self.literals)
+
+    @property
+    def digit_capacity(self) -> int:
+        """Сколько цифр максимум может быть в номере."""
+        return self.digit_slots + sum(c.isdigit() for c in self.literals)
+
+    @classmethod
+    def from_plan(cls, plan: PlatePlan) -> "CapabilitySignature":
+        return cls(
+            length=len(plan),
+            letter_slots=plan.pattern.count(LETTER_SLOT),
+            digit_slots=plan.pattern.count(DIGIT_SLOT),
+            letters_mask=slot_mask(plan.letters),
+            literals=plan.literals,
+        )
+
+
+def _capacity_sets(values: Sequence[int]) -> Tuple[int, ...]:
+    """sets[k] — битовое множество стран, у которых значение не меньше k."""
+    top = max(values, default=0)
+    sets = [0] * (top + 1)
+    for idx, value in enumerate(values):
+        bit = 1 << idx
+        for k in range(value + 1):
+            sets[k] |= bit
+    return tuple(sets)
+
+
+@dataclass(frozen=True)
+class CapabilityIndex:
+    """
+    Индекс сигнатур стран, отсеивающий заведомо невозможные запросы.
+
+    Множества стран хранятся как битовые маски (бит i — страна i в порядке
+    репозитория), поэтому отбор кандидатов сводится к нескольким AND:
+    - каждый символ запроса должен встречаться хотя бы в одном слоте;
+    - длина запроса не больше длины шаблона;
+    - букв и цифр в запросе не больше, чем может вместить шаблон.
+
+    Attributes:
+        signatures (Tuple[CapabilitySignature, ...]): Сигнатуры стран.
+        char_sets (Dict[str, int]): Страны, где символ может встретиться.
+        length_sets (Tuple[int, ...]): Страны с длиной шаблона >= k.
+        letter_sets (Tuple[int, ...]): Страны, вмещающие >= k букв.
+        digit_sets (Tuple[int, ...]): Страны, вмещающие >= k цифр.
+    """
+
+    signatures: Tuple[CapabilitySignature, ...]
+    char_sets: Dict[str, int]
+    length_sets: Tuple[int, ...]
+    letter_sets: Tuple[int, ...]
+    digit_sets: Tuple[int, ...]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    @classmethod
+    def from_plans(cls, plans: Sequence[PlatePlan]) -> "CapabilityIndex":
+        signatures = tuple(CapabilitySignature.from_plan(p) for p in plans)
+
+        char_sets: Dict[str, int] = {}
+        for idx, plan in enumerate(plans):
+            bit = 1 << idx
+            for c in set("".join(plan.slot_chars)):
+                char_sets[c] = char_sets.get(c, 0) | bit
+
+        return cls(
+            signatures=signatures,
+            char_sets=char_sets,
+            length_sets=_capacity_sets([s.length for s in signatures]),
+            letter_sets=_capacity_sets([s.letter_capacity for s in signatures]),
+            digit_sets=_capacity_sets([s.digit_capacity for s in signatures]),
+        )
+
+    def candidate_mask(self, query: Sequence[str]) -> int:
+        """
+        Возвращает битовое множество стран, прошедших все проверки.
+
+        Args:
+            query: Строка запроса (с синтаксисом app.core.query) или готовая
+                последовательность классов символов: позиция-класс совпадает
+                с любым из своих символов.
+        """
+        if isinstance(query, str):
+            query = query_classes(query)
+        mask = (1 << len(self.signatures)) - 1
+
+        for chars in Counter(query):
+            allowed = 0
+            for char in chars:
+                allowed |= self.char_sets.get(char, 0)
+            mask &= allowed
+            if not mask:
+                return 0
+
+        for sets, need in (
+            (self.length_sets, len(query)),
+            (self.letter_sets, sum(chars.isalpha() for chars in query)),
+            (self.digit_sets, sum(chars.isdigit() for chars in query)),
+        ):
+            if need >= len(sets):
+                return 0
+            mask &= sets[need]
+
+        return mask
+
+    def candidates(self, query: Sequence[str]) -> List[int]:
+        """Возвращает индексы стран, где запрос в принципе может встретиться."""
+        mask = self.candidate_mask(query)
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(low.bit_length() - 1)
+            mask ^= low
+        return result
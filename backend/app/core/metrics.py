@@ -0,0 +1,171 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# Границы корзин гистограмм в секундах
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Монотонный счётчик с метками."""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, total in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total:g}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами и метками."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # метки -> [счётчики по корзинам (+Inf последней), сумма]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = ([0] * (len(self.buckets) + 1), [0.0])
+                self._series[label_values] = series
+            series[0][index] += 1
+            series[1][0] += value
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            items = sorted(
+                (values, (list(counts), total[0]))
+                for values, (counts, total) in self._series.items()
+            )
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _format_labels(self.labels, values, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {total:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса в текстовом формате Prometheus.
+
+    Помимо собственных счётчиков и гистограмм умеет публиковать
+    снимки статистики внешних компонентов (кэш, исполнитель) как gauge.
+    """
+
+    def __init__(self) -> None:
+        self.request_latency = Histogram(
+            "signluck_request_duration_seconds",
+            "HTTP request latency by route.",
+            labels=("method", "route", "status"),
+        )
+        self.stage_latency = Histogram(
+            "signluck_stage_duration_seconds",
+            "Time spent in internal computation stages.",
+            labels=("stage",),
+        )
+        self.patterns_scored = Counter(
+            "signluck_patterns_scored_total",
+            "Unique plate patterns whose match count was computed, per query.",
+        )
+        self.patterns_skipped = Counter(
+            "signluck_patterns_skipped_total",
+            "Unique plate patterns skipped by the prefilter index or upper-bound "
+            "pruning, per query.",
+        )
+        self._collectors: Dict[str, Callable[[], Dict[str, float]]] = {}
+
+    def register_collector(
+        self, prefix: str, collect: Callable[[], Dict[str, float]]
+    ) -> None:
+        """Регистрирует источник числовой статистики (например, cache.stats)."""
+        self._collectors[prefix] = collect
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (
+            self.request_latency,
+            self.stage_latency,
+            self.patterns_scored,
+            self.patterns_skipped,
+        ):
+            lines.extend(metric.render())
+
+        for prefix, collect in sorted(self._collectors.items()):
+            for key, value in sorted(collect().items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"signluck_{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Замеряет длительность блока в гистограмме стадий."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.stage_latency.observe(time.perf_counter() - started, name)
@@ -0,0 +1,123 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.plan import DIGIT_SLOT, LETTER_SLOT, PlatePlan
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy необязателен
+    np = None
+
+# Коды классов слотов в PackedPlans.slot_classes
+SLOT_PADDING = 0
+SLOT_LETTER = 1
+SLOT_DIGIT = 2
+SLOT_LITERAL = 3
+
+# Максимальный total, при котором DP в int64 не переполняется
+INT64_SAFE_TOTAL = 2**62
+
+
+@dataclass(frozen=True)
+class PackedPlans:
+    """
+    Шаблоны всех стран, упакованные в выровненные массивы NumPy.
+
+    Шаблоны дополняются до общей длины нейтральными слотами
+    (один вариант, ни один символ не подходит), поэтому DP по слотам
+    выполняется сразу для всех стран.
+
+    Attributes:
+        slot_classes (np.ndarray): Коды классов слотов, форма (C, L).
+        option_counts (np.ndarray): Число вариантов слотов, форма (C, L).
+        suffix_products (np.ndarray): Произведения вариантов слотов [s, L),
+            форма (C, L + 1).
+        membership (np.ndarray): membership[a, c, s] — допустим ли символ
+            алфавита a в слоте s страны c, форма (A, C, L).
+        alphabet (Dict[str, int]): Индекс символа в membership.
+        totals (List[int]): Общее число номеров каждой страны.
+        int64_safe (np.ndarray): Можно ли считать страну в int64, форма (C,).
+        plans (Tuple[PlatePlan, ...]): Исходные планы в том же порядке.
+    """
+
+    slot_classes: "np.ndarray"
+    option_counts: "np.ndarray"
+    suffix_products: "np.ndarray"
+    membership: "np.ndarray"
+    alphabet: Dict[str, int]
+    totals: List[int]
+    int64_safe: "np.ndarray"
+    plans: Tuple[PlatePlan, ...]
+
+    def __len__(self) -> int:
+        return len(self.totals)
+
+    @property
+    def width(self) -> int:
+        return self.option_counts.shape[1]
+
+    def take(self, indices: Sequence[int]) -> "PackedPlans":
+        """Возвращает упаковку только для стран с указанными индексами."""
+        rows = np.asarray(indices, dtype=np.intp)
+        return PackedPlans(
+            slot_classes=self.slot_classes[rows],
+            option_counts=self.option_counts[rows],
+            suffix_products=self.suffix_products[rows],
+            membership=self.membership[:, rows],
+            alphabet=self.alphabet,
+            totals=[self.totals[i] for i in indices],
+            int64_safe=self.int64_safe[rows],
+            plans=tuple(self.plans[i] for i in indices),
+        )
+
+    @classmethod
+    def from_plans(cls, plans: Sequence[PlatePlan]) -> Optional["PackedPlans"]:
+        """
+        Упаковывает скомпилированные шаблоны.
+
+        Returns:
+            PackedPlans или None, если NumPy не установлен.
+        """
+        if np is None:
+            return None
+
+        n_countries = len(plans)
+        width = max((len(p) for p in plans), default=0)
+
+        alphabet: Dict[str, int] = {}
+        for plan in plans:
+            for chars in plan.slot_chars:
+                for c in chars:
+                    alphabet.setdefault(c, len(alphabet))
+
+        slot_classes = np.full((n_countries, width), SLOT_PADDING, dtype=np.int8)
+        option_counts = np.ones((n_countries, width), dtype=np.int64)
+        suffix_products = np.ones((n_countries, width + 1), dtype=np.int64)
+        membership = np.zeros((len(alphabet), n_countries, width), dtype=np.int64)
+        int64_safe = np.array([p.total < INT64_SAFE_TOTAL for p in plans], dtype=bool)
+
+        for c, plan in enumerate(plans):
+            for s, p_char in enumerate(plan.pattern):
+                if p_char == LETTER_SLOT:
+                    slot_classes[c, s] = SLOT_LETTER
+                elif p_char == DIGIT_SLOT:
+                    slot_classes[c, s] = SLOT_DIGIT
+                else:
+                    slot_classes[c, s] = SLOT_LITERAL
+                for ch in plan.slot_chars[s]:
+                    membership[alphabet[ch], c, s] = 1
+
+            if int64_safe[c]:
+                option_counts[c, : len(plan)] = plan.option_counts
+                suffix_products[c, : len(plan) + 1] = plan.suffix_products
+
+        return cls(
+            slot_classes=slot_classes,
+            option_counts=option_counts,
+            suffix_products=suffix_products,
+            membership=membership,
+            alphabet=alphabet,
+            totals=[p.total for p in plans],
+            int64_safe=int64_safe,
+            plans=tuple(plans),
+        )
@@ -0,0 +1,149 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from math import comb
+from string import ascii_uppercase, digits
+from typing import Iterable, Tuple
+
+LETTER_SLOT = "A"
+DIGIT_SLOT = "0"
+
+
+def _binomial_tail(n: int, p: float) -> Tuple[float, ...]:
+    """Возвращает tail[r] = P(Bin(n, p) >= r) для r = 0..n."""
+    pmf = [comb(n, k) * p**k * (1 - p) ** (n - k) for k in range(n + 1)]
+    tail = [0.0] * (n + 2)
+    for k in range(n, -1, -1):
+        tail[k] = tail[k + 1] + pmf[k]
+    return tuple(min(t, 1.0) for t in tail[: n + 1])
+
+
+def char_mask(chars: Iterable[str]) -> int:
+    """Возвращает битовую маску набора символов (бит = код символа)."""
+    mask = 0
+    for c in chars:
+        mask |= 1 << ord(c)
+    return mask
+
+
+@lru_cache(maxsize=256)
+def slot_mask(chars: str) -> int:
+    """char_mask для набора символов слота (наборов в данных единицы)."""
+    return char_mask(chars)
+
+
+@dataclass(frozen=True, slots=True)
+class PlatePlan:
+    """
+    Неизменяемый скомпилированный шаблон номерного знака.
+
+    Строится один раз при загрузке репозитория и используется калькулятором
+    на горячем пути вместо повторного разбора строки шаблона.
+
+    Attributes:
+        pattern (str): Шаблон в верхнем регистре.
+        allowed_letters (str): Разрешённые буквы в верхнем регистре.
+        slot_chars (Tuple[str, ...]): Допустимые символы каждого слота.
+        masks (Tuple[int, ...]): Битовые маски допустимых символов по слотам.
+        option_counts (Tuple[int, ...]): Количество вариантов каждого слота.
+        prefix_products (Tuple[int, ...]): prefix_products[i] — число вариантов
+            для слотов [0, i).
+        suffix_products (Tuple[int, ...]): suffix_products[i] — число вариантов
+            для слотов [i, n).
+        total (int): Общее число номеров шаблона.
+        letters (str): Буквы, допустимые в буквенных слотах.
+        literals (str): Символы литеральных слотов (в порядке шаблона).
+        letter_tail (Tuple[float, ...]): letter_tail[r] — вероятность, что
+            конкретная буква встретится хотя бы в r буквенных слотах.
+        digit_tail (Tuple[float, ...]): То же для конкретной цифры.
+    """
+
+    pattern: str
+    allowed_letters: str
+    slot_chars: Tuple[str, ...]
+    masks: Tuple[int, ...]
+    option_counts: Tuple[int, ...]
+    prefix_products: Tuple[int, ...]
+    suffix_products: Tuple[int, ...]
+    total: int
+    letters: str
+    literals: str
+    letter_tail: Tuple[float, ...]
+    digit_tail: Tuple[float, ...]
+
+    def __len__(self) -> int:
+        return len(self.pattern)
+
+
+@lru_cache(maxsize=1024)
+def compile_plan(pattern: str, allowed_letters: str = "") -> PlatePlan:
+    """
+    Компилирует шаблон страны в PlatePlan.
+
+    Одинаковые пары (шаблон, буквы) компилируются один раз.
+
+    Args:
+        pattern: Шаблон номера ('A' — буква, '0' — цифра, остальное — литерал).
+        allowed_letters: Разрешённые буквы; пустая строка означает весь алфавит.
+    """
+    pattern = pattern.upper()
+    allowed = allowed_letters.upper()
+    letters = "".join(sorted(set(allowed))) if allowed else ascii_uppercase
+    return restore_plan(
+        pattern,
+        allowed,
+        letter_tail=_binomial_tail(pattern.count(LETTER_SLOT), 1 / len(letters)),
+        digit_tail=_binomial_tail(pattern.count(DIGIT_SLOT), 1 / len(digits)),
+    )
+
+
+def restore_plan(
+    pattern: str,
+    allowed_letters: str,
+    letter_tail: Tuple[float, ...],
+    digit_tail: Tuple[float, ...],
+) -> PlatePlan:
+    """
+    Собирает PlatePlan по уже нормализованным шаблону и буквам.
+
+    Биномиальные хвосты — самая дорогая часть компиляции — передаются
+    готовыми (например, из бинарного снимка), остальное восстанавливается
+    за O(длина шаблона).
+    """
+    letters = ascii_uppercase
+    if allowed_letters:
+        letters = "".join(sorted(set(allowed_letters)))
+
+    slot_chars = []
+    for char in pattern:
+        if char == LETTER_SLOT:
+            slot_chars.append(letters)
+        elif char == DIGIT_SLOT:
+            slot_chars.append(digits)
+        else:
+            slot_chars.append(char)
+
+    option_counts = tuple(len(chars) for chars in slot_chars)
+
+    prefix = [1]
+    for count in option_counts:
+        prefix.append(prefix[-1] * count)
+
+    suffix = [1]
+    for count in reversed(option_counts):
+        suffix.append(suffix[-1] * count)
+    suffix.reverse()
+
+    return PlatePlan(
+        pattern=pattern,
+        allowed_letters=allowed_letters,
+        slot_chars=tuple(slot_chars),
+        masks=tuple(slot_mask(chars) for chars in slot_chars),
+        option_counts=option_counts,
+        prefix_products=tuple(prefix),
+        suffix_products=tuple(suffix),
+        total=prefix[-1],
+        letters=letters,
+        literals="".join(c for c in pattern if c not in (LETTER_SLOT, DIGIT_SLOT)),
+        letter_tail=letter_tail,
+        digit_tail=digit_tail,
+    )
@@ -0,0 +1,204 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Форматы профиля: pstats — детерминированный профиль cProfile (открывается
+# pstats/snakeviz), collapsed — свёрнутые стеки сэмплирующего профилировщика
+# (flamegraph.pl, speedscope)
+FORMAT_PSTATS = "pstats"
+FORMAT_COLLAPSED = "collapsed"
+FORMATS = (FORMAT_PSTATS, FORMAT_COLLAPSED)
+EXTENSIONS = {FORMAT_PSTATS: ".prof", FORMAT_COLLAPSED: ".collapsed.txt"}
+
+# cProfile с Python 3.12 работает через sys.monitoring: профилировщик один
+# на интерпретатор и видит все потоки, а второй включённый бросает ValueError.
+# До 3.12 профиль действует только в потоке, который его включил
+_PER_THREAD_CPROFILE = sys.version_info < (3, 12)
+# Режим pstats занимает cProfile процесса, пока профиль не остановлен
+_cprofile_lock = threading.Lock()
+
+# Профиль текущего запроса. Задаётся только ProfilingMiddleware для запросов
+# с заголовком X-Profile; в остальных запросах всегда None
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def _frame_name(frame) -> str:
+    """Имя кадра для свёрнутого стека: "функция (файл:строка)"."""
+    code = frame.f_code
+    filename = code.co_filename
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        filename = filename.split(marker, 1)[1]
+    else:
+        relative = os.path.relpath(filename)
+        if not relative.startswith(".."):
+            filename = relative
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    """Сворачивает стек кадра в строку от корня к вершине через ";"."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _Sampler:
+    """
+    Сэмплирующий профилировщик: фоновый поток с периодом interval снимает
+    стеки отслеживаемых потоков через sys._current_frames().
+
+    Фактический период не меньше интервала переключения GIL
+    (sys.getswitchinterval()), пока профилируемый код не отпускает GIL.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def track(self) -> int:
+        """Начинает сэмплировать текущий поток; возвращает его идентификатор."""
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = self._threads.get(ident, 0) + 1
+        return ident
+
+    def untrack(self, ident: int) -> None:
+        with self._lock:
+            self._threads[ident] -= 1
+            if not self._threads[ident]:
+                del self._threads[ident]
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                idents = list(self._threads)
+            frames = sys._current_frames()
+            for ident in idents:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+
+
+class RequestProfile:
+    """
+    Профиль одного HTTP-запроса.
+
+    Запрос выполняется в двух потоках: event loop (маршрутизация, разбор
+    и сериализация pydantic, режим исполнителя "inline") и поток пула
+    ComputeExecutor (PlateService, PlateCalculator). Middleware профилирует
+    поток event loop между start и stop, исполнитель оборачивает вызов
+    сервиса в run; профили обоих потоков сводятся в один файл.
+
+    Пока запрос ждёт на await, event loop выполняет и другие запросы,
+    поэтому их работа в потоке event loop тоже попадает в профиль
+    (в режиме pstats с Python 3.12 — и работа в остальных потоках).
+
+    В процессе одновременно работает один профиль pstats: с Python 3.12
+    второй cProfile не включается. Если cProfile занят, start переключает
+    профиль на сэмплирование (format становится FORMAT_COLLAPSED).
+
+    Attributes:
+        format (str): FORMAT_PSTATS или FORMAT_COLLAPSED.
+    """
+
+    def __init__(self, format: str = FORMAT_PSTATS, interval: float = 0.001) -> None:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown profile format: {format}")
+        self.format = format
+        self.interval = interval
+        self._profiles: List[cProfile.Profile] = []
+        self._sampler = _Sampler(interval) if format == FORMAT_COLLAPSED else None
+        self._loop_profile: Optional[cProfile.Profile] = None
+        self._loop_ident: Optional[int] = None
+
+    def start(self) -> None:
+        """Начинает профилировать текущий поток (поток event loop)."""
+        if self._sampler is None:
+            if self._enable_cprofile():
+                return
+            self.format = FORMAT_COLLAPSED
+            self._sampler = _Sampler(self.interval)
+        self._sampler.start()
+        self._loop_ident = self._sampler.track()
+
+    def _enable_cprofile(self) -> bool:
+        """Включает cProfile, если его не занял другой профиль."""
+        if not _cprofile_lock.acquire(blocking=False):
+            return False
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # С Python 3.12 профилировщик включили в обход RequestProfile
+            _cprofile_lock.release()
+            return False
+        self._loop_profile = profile
+        self._profiles.append(profile)
+        return True
+
+    def stop(self) -> None:
+        """Останавливает профилирование; вызывается в том же потоке, что start."""
+        if self._sampler is not None:
+            self._sampler.untrack(self._loop_ident)
+            self._sampler.stop()
+        else:
+            self._loop_profile.disable()
+            _cprofile_lock.release()
+
+    def run(self, func: Callable[[], T]) -> T:
+        """Выполняет func в текущем потоке под профилировщиком."""
+        if self._sampler is not None:
+            ident = self._sampler.track()
+            try:
+                return func()
+            finally:
+                self._sampler.untrack(ident)
+
+        if not _PER_THREAD_CPROFILE:
+            # Профиль, включённый в start, уже видит этот поток
+            return func()
+        profile = cProfile.Profile()
+        self._profiles.append(profile)
+        return profile.runcall(func)
+
+    def dump(self, path: str) -> None:
+        """Записывает профиль в файл (каталог создаётся при необходимости)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if self._sampler is not None:
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self._sampler.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            return
+
+        stats = pstats.Stats(self._profiles[0])
+        for profile in self._profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
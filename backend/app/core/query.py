@@ -0,0 +1,93 @@
+from functools import lru_cache
+from string import ascii_uppercase, digits
+from typing import NamedTuple, Tuple
+
+# Специальные символы синтаксиса запроса
+ANY_CHAR = "?"
+DIGIT_CLASS = "#"
+LETTER_CLASS = "@"
+
+_CLASS_CHARS = {
+    ANY_CHAR: ascii_uppercase + digits,
+    DIGIT_CLASS: digits,
+    LETTER_CLASS: ascii_uppercase,
+}
+
+
+class QuerySyntaxError(ValueError):
+    """Запрос не соответствует синтаксису шаблонов."""
+
+
+class QueryToken(NamedTuple):
+    """
+    Одна позиция запроса.
+
+    Attributes:
+        text (str): Исходная запись позиции ("7", "?", "#", "[ABE]").
+        chars (str): Допустимые символы позиции (отсортированы, без повторов).
+    """
+
+    text: str
+    chars: str
+
+
+def _parse_set(body: str) -> str:
+    """Разбирает содержимое [...]: символы и диапазоны вида A-E, 0-9."""
+    chars = set()
+    i = 0
+    while i < len(body):
+        if i + 2 < len(body) and body[i + 1] == "-":
+            start, end = body[i], body[i + 2]
+            if start > end or start.isdigit() != end.isdigit():
+                raise QuerySyntaxError(f"Invalid range {start}-{end}")
+            chars.update(chr(c) for c in range(ord(start), ord(end) + 1))
+            i += 3
+        else:
+            chars.add(body[i])
+            i += 1
+    return "".join(sorted(chars))
+
+
+@lru_cache(maxsize=4096)
+def parse_query(query: str) -> Tuple[QueryToken, ...]:
+    """
+    Разбирает запрос на позиции.
+
+    Синтаксис:
+    - обычный символ совпадает сам с собой;
+    - "?" — любая буква или цифра;
+    - "#" — любая цифра, "@" — любая буква;
+    - "[ABE]" — любой символ из набора, допускаются диапазоны "[A-E0-3]".
+
+    Raises:
+        QuerySyntaxError: Незакрытый или пустой набор, неверный диапазон.
+    """
+    tokens = []
+    i = 0
+    while i < len(query):
+        char = query[i]
+        if char == "[":
+            end = query.find("]", i + 1)
+            if end == -1:
+                raise QuerySyntaxError("Unclosed character set")
+            chars = _parse_set(query[i + 1 : end])
+            if not chars:
+                raise QuerySyntaxError("Empty character set")
+            tokens.append(QueryToken(query[i : end + 1], chars))
+            i = end + 1
+        elif char == "]":
+            raise QuerySyntaxError("Unexpected ']'")
+        else:
+            tokens.append(QueryToken(char, _CLASS_CHARS.get(char, char)))
+            i += 1
+    return tuple(tokens)
+
+
+def query_classes(query: str) -> Tuple[str, ...]:
+    """Допустимые символы каждой позиции запроса."""
+    return tuple(token.chars for token in parse_query(query))
+
+
+def is_literal(query: str) -> bool:
+    """Состоит ли запрос только из обычных символов."""
+    return all(token.text == token.chars for token in parse_query(query))
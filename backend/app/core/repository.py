@@ -1,25 +1,116 @@
 import csv
+import dataclasses
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, List, Optional, Tuple
 
+from app.core.index import CapabilityIndex
+from app.core.packed import PackedPlans
+from app.core.plan import PlatePlan
+from app.core.snapshot import CompiledCountry, DatasetSnapshot
+from app.core.snapshot_file import (
+    SnapshotFormatError,
+    read_snapshot,
+    snapshot_path,
+    source_digest,
+)
 from app.schemas.country import CountrySchema
 
 logger = logging.getLogger(__name__)
 
+__all__ = ["CompiledCountry", "CountryRepository"]
+
 
 class CountryRepository:
     """
     Репозиторий для управления данными о странах из CSV-хранилища
 
+    Данные публикуются неизменяемыми снимками (DatasetSnapshot). Перезагрузка
+    строит новый снимок целиком и атомарно подменяет ссылку на него, поэтому
+    запросы в работе продолжают использовать свой снимок и никогда не ждут
+    перезагрузки.
+
+    При загрузке сначала читается бинарный снимок (см. app.core.snapshot_file)
+    со всеми производными структурами; если его нет, он повреждён или собран
+    из другой версии CSV, данные разбираются из CSV.
+
     Attributes:
         file_path (Path): Абсолютный путь к файлу данных CSV.
-        _cache (Optional[List[CountrySchema]]): Внутренний кэш для хранения данных.
+        snapshot_file (Path): Путь бинарного снимка данных (по умолчанию
+            рядом с CSV).
+        watch_interval (float): Как часто (в секундах) проверять mtime файла
+            и запускать фоновую перезагрузку при изменении (0 — не следить).
+        _snapshot (Optional[DatasetSnapshot]): Текущий снимок данных.
     """
 
-    def __init__(self):
-        self.file_path = Path(__file__).parent.parent.parent / "data" / "countries.csv"
-        self._cache: Optional[List[CountrySchema]] = None
+    def __init__(
+        self,
+        file_path: Optional[Path] = None,
+        watch_interval: float = 0.0,
+        snapshot_file: Optional[Path] = None,
+    ):
+        self.file_path = file_path or (
+            Path(__file__).parent.parent.parent / "data" / "countries.csv"
+        )
+        self.snapshot_file = snapshot_file or snapshot_path(self.file_path)
+        self.watch_interval = watch_interval
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._version = 0
+        self._load_lock = threading.Lock()
+        # Первая загрузка: одновременные холодные запросы ждут один разбор
+        self._init_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._last_check = 0.0
+        self._listeners: List[Callable[[DatasetSnapshot], None]] = []
+
+    @classmethod
+    def from_countries(cls, countries: List[CountrySchema]) -> "CountryRepository":
+        """Создаёт репозиторий поверх готового списка стран (без чтения CSV)."""
+        repository = cls()
+        repository._set_data(countries)
+        return repository
+
+    @property
+    def version(self) -> int:
+        """Версия текущего снимка (0 — данные ещё не загружены)."""
+        snapshot = self._snapshot
+        return snapshot.version if snapshot is not None else 0
+
+    def _set_data(
+        self, countries: List[CountrySchema], source_mtime: Optional[int] = None
+    ) -> DatasetSnapshot:
+        """Строит снимок из стран и атомарно публикует его с новой версией."""
+        return self._publish(
+            lambda version: DatasetSnapshot.build(countries, version, source_mtime)
+        )
+
+    def _publish(self, make: Callable[[int], DatasetSnapshot]) -> DatasetSnapshot:
+        """Создаёт снимок make(версия) и атомарно публикует его."""
+        with self._load_lock:
+            snapshot = make(self._version + 1)
+            self._version = snapshot.version
+            self._snapshot = snapshot
+
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception:
+                logger.exception(
+                    "Snapshot listener failed for version %d", snapshot.version
+                )
+        return snapshot
+
+    def subscribe(self, listener: Callable[[DatasetSnapshot], None]) -> None:
+        """
+        Регистрирует обработчик, вызываемый после публикации каждого снимка.
+
+        Обработчик выполняется в потоке загрузки (для фоновой перезагрузки —
+        в фоновом), поэтому подходит для предрасчёта производных данных.
+        Ошибки обработчика логируются и не отменяют публикацию.
+        """
+        self._listeners.append(listener)
 
     def _get_flag_emoji(self, country_code: str) -> str:
         """Генерирует emoji флага из кода страны (ISO 3166-1 alpha-2)."""
@@ -27,26 +118,26 @@ class CountryRepository:
             return "🏳️"
         return "".join(chr(ord(c) + 127397) for c in country_code.upper())
 
-    def get_all(self) -> List[CountrySchema]:
-        """
-        Читает CSV и возвращает все шаблоны стран.
-
-        Использует ленивую загрузку с кэшированием в памяти.
+    def _source_mtime(self) -> Optional[int]:
+        try:
+            return self.file_path.stat().st_mtime_ns
+        except OSError:
+            return None
 
-        Returns:
-            List[CountrySchema]: Список объектов стран.
+    def _read_csv(self) -> Tuple[List[CountrySchema], Optional[int]]:
+        """
+        Читает и валидирует CSV.
 
         Raises:
             FileNotFoundError: Если CSV-файл отсутствует по указанному пути.
             IOError: Если возникла ошибка при чтении или обработке файла.
         """
-        if self._cache is not None:
-            return self._cache
-
         if not self.file_path.exists():
             logger.error(f"Data source not found: {self.file_path}")
             raise FileNotFoundError(f"CSV not found with path: {self.file_path}")
 
+        # mtime берётся до чтения: правка во время разбора будет замечена позже
+        mtime = self._source_mtime()
         try:
             with open(self.file_path, mode="r", encoding="utf-8") as f:
                 reader = csv.DictReader(f)
@@ -56,10 +147,150 @@ class CountryRepository:
                         row["allowed_letters"] = ""
                     row["flag_emoji"] = self._get_flag_emoji(row["country_code"])
                     cleaned_data.append(CountrySchema(**row))
-
-                self._cache = cleaned_data
-                return self._cache
+            return cleaned_data, mtime
 
         except Exception as e:
             logger.exception(f"Error with reading CSV: {e}")
             raise IOError(f"Error with processing countries data: {e}")
+
+    def _load(self) -> DatasetSnapshot:
+        """Загружает данные из бинарного снимка или CSV и публикует их."""
+        if not self.file_path.exists():
+            logger.error(f"Data source not found: {self.file_path}")
+            raise FileNotFoundError(f"CSV not found with path: {self.file_path}")
+
+        mtime = self._source_mtime()
+        try:
+            loaded = read_snapshot(self.snapshot_file, source_digest(self.file_path))
+        except (OSError, SnapshotFormatError) as e:
+            logger.warning("Ignoring binary snapshot %s: %s", self.snapshot_file, e)
+            loaded = None
+
+        if loaded is not None:
+            return self._publish(
+                lambda version: dataclasses.replace(
+                    loaded, version=version, source_mtime=mtime
+                )
+            )
+
+        countries, mtime = self._read_csv()
+        return self._set_data(countries, mtime)
+
+    def get_snapshot(self) -> DatasetSnapshot:
+        """
+        Возвращает текущий снимок данных.
+
+        Первый вызов загружает CSV синхронно; одновременные первые вызовы
+        ждут эту же загрузку, а не разбирают данные каждый сам. Дальше,
+        если включено слежение, не чаще раза в watch_interval сверяется
+        mtime файла и при изменении запускается фоновая перезагрузка;
+        вызов при этом не ждёт её и возвращает текущий снимок.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._init_lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self._load()
+            return snapshot
+
+        if self.watch_interval > 0 and snapshot.source_mtime is not None:
+            self._check_for_changes(snapshot)
+        return snapshot
+
+    def _check_for_changes(self, snapshot: DatasetSnapshot) -> None:
+        now = time.monotonic()
+        if now - self._last_check < self.watch_interval:
+            return
+        self._last_check = now
+
+        mtime = self._source_mtime()
+        if mtime is not None and mtime != snapshot.source_mtime:
+            self.reload_in_background()
+
+    def reload(self) -> List[CountrySchema]:
+        """
+        Перечитывает CSV и публикует новый снимок с увеличенной версией.
+
+        При ошибке чтения или валидации текущий снимок остаётся в силе.
+        Кэши, ключ которых включает версию, после перезагрузки перестают совпадать.
+        """
+        snapshot = self._load()
+        logger.info(
+            "Loaded %d countries from %s (version %d)",
+            len(snapshot.countries),
+            self.file_path,
+            snapshot.version,
+        )
+        return snapshot.countries
+
+    def reload_in_background(self) -> bool:
+        """
+        Запускает перезагрузку в фоновом потоке.
+
+        Returns:
+            bool: False, если перезагрузка уже идёт.
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+
+        def run() -> None:
+            try:
+                self.reload()
+            except Exception:
+                logger.exception(
+                    "Background reload failed, keeping version %d", self.version
+                )
+            finally:
+                self._reload_lock.release()
+
+        threading.Thread(target=run, name="countries-reload", daemon=True).start()
+        return True
+
+    def get_all(self) -> List[CountrySchema]:
+        """
+        Возвращает все шаблоны стран из текущего снимка.
+
+        Использует ленивую загрузку с кэшированием в памяти.
+
+        Returns:
+            List[CountrySchema]: Список объектов стран.
+
+        Raises:
+            FileNotFoundError: Если CSV-файл отсутствует по указанному пути.
+            IOError: Если возникла ошибка при чтении или обработке файла.
+        """
+        return self.get_snapshot().countries
+
+    def get_compiled(self) -> List[CompiledCountry]:
+        """
+        Возвращает все страны вместе со скомпилированными шаблонами.
+
+        Returns:
+            List[CompiledCountry]: Пары (страна, план основного формата)
+            в порядке CSV.
+        """
+        return self.get_snapshot().compiled
+
+    def get_packed(self) -> Optional[PackedPlans]:
+        """
+        Возвращает уникальные шаблоны всех форматов, упакованные в массивы NumPy.
+
+        Returns:
+            PackedPlans в порядке snapshot.scoring_plans или None,
+            если NumPy недоступен.
+        """
+        return self.get_snapshot().packed
+
+    def get_index(self) -> CapabilityIndex:
+        """
+        Возвращает индекс сигнатур шаблонов для предварительного отсева запросов.
+
+        Returns:
+            CapabilityIndex: Индекс в порядке snapshot.scoring_plans.
+        """
+        return self.get_snapshot().index
+
+    def get_plan(self, country_code: str) -> Optional[PlatePlan]:
+        """Возвращает скомпилированный шаблон основного формата страны по её коду."""
+        return self.get_snapshot().plans.get(country_code.upper())
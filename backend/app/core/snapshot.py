@@ -0,0 +1,168 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.geo import DistanceMatrix
+from app.core.index import CapabilityIndex
+from app.core.packed import PackedPlans
+from app.core.plan import PlatePlan, compile_plan
+from app.schemas.country import CountrySchema
+
+
+def dataset_digest(countries: Sequence[CountrySchema]) -> str:
+    """
+    Хеш содержимого набора данных.
+
+    В отличие от version (счётчика перезагрузок в процессе) одинаков
+    во всех процессах и после перезапуска, пока не изменились данные.
+    """
+    digest = hashlib.sha256()
+    for country in countries:
+        digest.update(country.model_dump_json().encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()[:16]
+
+
+class CompiledCountry(NamedTuple):
+    """Страна вместе со скомпилированным шаблоном её основного формата."""
+
+    country: CountrySchema
+    plan: PlatePlan
+
+
+@dataclass(frozen=True)
+class DatasetSnapshot:
+    """
+    Неизменяемый снимок набора данных со всеми производными структурами.
+
+    Снимок строится целиком до публикации в репозитории, поэтому запрос,
+    получивший снимок, работает с согласованными странами, планами,
+    индексом и упаковкой до конца, даже если данные тем временем
+    перезагрузились. Списки внутри снимка не изменяются.
+
+    Совпадения считаются по уникальным шаблонам (scoring_plans), а не по
+    странам: шаблон, общий для нескольких стран или форматов, компилируется
+    и оценивается один раз. Индекс и упаковка построены в их порядке,
+    а вероятность страны собирается из счётов её форматов по долям.
+
+    Attributes:
+        version (int): Версия набора данных.
+        countries (List[CountrySchema]): Страны в порядке CSV.
+        compiled (List[CompiledCountry]): Страны с планом основного формата.
+        plans (Dict[str, PlatePlan]): План основного формата по коду страны.
+        positions (Dict[str, int]): Индекс страны в countries по её коду.
+        scoring_plans (List[PlatePlan]): Уникальные планы всех форматов.
+        formats (List[Tuple[Tuple[int, float], ...]]): Для каждой страны —
+            пары (индекс в scoring_plans, доля формата).
+        plan_countries (List[Tuple[int, ...]]): Для каждого уникального
+            плана — индексы стран, где он используется.
+        index (CapabilityIndex): Индекс сигнатур scoring_plans.
+        packed (Optional[PackedPlans]): Упаковка scoring_plans для NumPy
+            (None без NumPy).
+        distances (Optional[DistanceMatrix]): Попарные расстояния между
+            странами (None без NumPy).
+        source_mtime (Optional[int]): mtime исходного файла (нс), если есть.
+        digest (str): Хеш содержимого стран (см. dataset_digest).
+    """
+
+    version: int
+    countries: List[CountrySchema]
+    compiled: List[CompiledCountry]
+    plans: Dict[str, PlatePlan]
+    positions: Dict[str, int]
+    scoring_plans: List[PlatePlan]
+    formats: List[Tuple[Tuple[int, float], ...]]
+    plan_countries: List[Tuple[int, ...]]
+    index: CapabilityIndex
+    packed: Optional[PackedPlans]
+    distances: Optional[DistanceMatrix]
+    source_mtime: Optional[int] = None
+    digest: str = ""
+
+    def country_formats(self, idx: int) -> Tuple[Tuple[PlatePlan, float], ...]:
+        """Возвращает пары (план, доля) всех форматов страны idx."""
+        return tuple((self.scoring_plans[p], w) for p, w in self.formats[idx])
+
+    @classmethod
+    def build(
+        cls,
+        countries: List[CountrySchema],
+        version: int,
+        source_mtime: Optional[int] = None,
+    ) -> "DatasetSnapshot":
+        """Компилирует шаблоны и строит все производные структуры."""
+        scoring_plans: List[PlatePlan] = []
+        plan_ids: Dict[Tuple[str, str], int] = {}
+        formats: List[Tuple[Tuple[int, float], ...]] = []
+        for country in countries:
+            refs = []
+            for fmt in country.formats:
+                plan = compile_plan(fmt.pattern, country.allowed_letters)
+                key = (plan.pattern, plan.allowed_letters)
+                plan_id = plan_ids.get(key)
+                if plan_id is None:
+                    plan_id = plan_ids[key] = len(scoring_plans)
+                    scoring_plans.append(plan)
+                refs.append((plan_id, fmt.weight))
+            formats.append(tuple(refs))
+
+        return cls.assemble(
+            countries,
+            scoring_plans,
+            formats,
+            version,
+            index=CapabilityIndex.from_plans(scoring_plans),
+            packed=PackedPlans.from_plans(scoring_plans),
+            distances=DistanceMatrix.from_points(
+                [c.lat for c in countries], [c.lng for c in countries]
+            ),
+            source_mtime=source_mtime,
+            digest=dataset_digest(countries),
+        )
+
+    @classmethod
+    def assemble(
+        cls,
+        countries: List[CountrySchema],
+        scoring_plans: List[PlatePlan],
+        formats: List[Tuple[Tuple[int, float], ...]],
+        version: int,
+        *,
+        index: CapabilityIndex,
+        packed: Optional[PackedPlans],
+        distances: Optional[DistanceMatrix],
+        source_mtime: Optional[int] = None,
+        digest: str = "",
+    ) -> "DatasetSnapshot":
+        """
+        Собирает снимок из готовых планов, индекса, упаковки и расстояний.
+
+        Достраивает только дешёвые таблицы (страны плана, основной формат,
+        поиск по коду), поэтому бинарный снимок (app.core.snapshot_file)
+        загружается без компиляции шаблонов и пересчёта производных данных.
+        """
+        plan_countries: List[List[int]] = [[] for _ in scoring_plans]
+        compiled: List[CompiledCountry] = []
+        for idx, (country, refs) in enumerate(zip(countries, formats)):
+            for plan_id, _ in refs:
+                if idx not in plan_countries[plan_id]:
+                    plan_countries[plan_id].append(idx)
+            # Основной формат — с наибольшей долей, как country.pattern
+            primary = max(refs, key=lambda ref: ref[1])[0]
+            compiled.append(CompiledCountry(country, scoring_plans[primary]))
+
+        return cls(
+            version=version,
+            countries=countries,
+            compiled=compiled,
+            plans={c.country.country_code: c.plan for c in compiled},
+            positions={c.country_code: i for i, c in enumerate(countries)},
+            scoring_plans=scoring_plans,
+            formats=formats,
+            plan_countries=[tuple(c) for c in plan_countries],
+            index=index,
+            packed=packed,
+            distances=distances,
+            source_mtime=source_mtime,
+            digest=digest,
+        )
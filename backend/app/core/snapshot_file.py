@@ -0,0 +1,476 @@
+"""
+Бинарный снимок набора стран для быстрого холодного старта.
+
+Сборка (из каталога backend):
+
+    python -m app.core.snapshot_file            # data/countries.csv -> data/countries.bin
+
+Снимок хранит не только провалидированные страны, но и все производные
+структуры DatasetSnapshot: планы шаблонов (с биномиальными хвостами),
+битовые множества индекса сигнатур, упаковку для NumPy, матрицу расстояний
+и хеш данных. Загрузка ничего из этого не пересчитывает: массивы NumPy
+отображаются прямо из mmap без копирования, планы и индекс собираются
+из готовых значений, страны — через model_construct без валидации
+(данные проверены при сборке).
+
+Формат (little-endian, без pickle):
+- заголовок: магия, версия формата, флаги, SHA-256 исходного CSV, хеш
+  данных, размеры таблиц и таблица секций (смещение, размер);
+- таблица строк: смещения u32 и общий UTF-8 блоб;
+- записи стран, форматов (план, шаблон, доля) и уникальных планов
+  фиксированной ширины, хвосты планов (f64);
+- битовые множества индекса фиксированной ширины;
+- массивы PackedPlans и DistanceMatrix (флаг _FLAG_ARRAYS, если при сборке
+  был NumPy).
+
+Секции выровнены по 8 байт. Снимок считается устаревшим, если хэш CSV
+не совпадает. FORMAT_VERSION нужно увеличивать при любом изменении
+производных структур: старый снимок тогда отбрасывается, а не читается.
+"""
+
+import argparse
+import hashlib
+import mmap
+import struct
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.geo import DistanceMatrix
+from app.core.index import CapabilityIndex, CapabilitySignature
+from app.core.packed import PackedPlans, np
+from app.core.plan import PlatePlan, restore_plan
+from app.core.snapshot import DatasetSnapshot
+from app.schemas.country import CountrySchema, PlateFormat
+
+MAGIC = b"SLDS"
+FORMAT_VERSION = 3
+
+# Секции файла в порядке записи
+(
+    _S_OFFSETS,
+    _S_BLOB,
+    _S_COUNTRIES,
+    _S_FORMATS,
+    _S_PLANS,
+    _S_TAILS,
+    _S_INDEX,
+    _S_SLOT_CLASSES,
+    _S_OPTION_COUNTS,
+    _S_SUFFIX_PRODUCTS,
+    _S_MEMBERSHIP,
+    _S_INT64_SAFE,
+    _S_DISTANCES,
+    _S_LATS,
+    _S_LNGS,
+) = range(15)
+_SECTIONS = 15
+_ALIGN = 8
+
+# Флаг: в файле есть массивы PackedPlans и DistanceMatrix
+_FLAG_ARRAYS = 1
+
+# Магия, версия, флаги, SHA-256 CSV, хеш данных; строки, страны, форматы,
+# планы, хвосты, строка алфавита упаковки, ширина упаковки
+_HEADER = struct.Struct("<4sHH32s16s7I")
+_SECTION = struct.Struct("<QQ")
+_OFFSET = struct.Struct("<I")
+# Шесть строк, lat, lng, первый формат и число форматов
+_COUNTRY = struct.Struct("<6IddII")
+# План, шаблон формата как в CSV и доля
+_FORMAT = struct.Struct("<IId")
+# Шаблон, разрешённые буквы; начало и длина хвостов букв и цифр
+_PLAN = struct.Struct("<6I")
+# Строка символов char_sets и число множеств длины, букв и цифр
+_INDEX = struct.Struct("<4I")
+_NONE = 0xFFFFFFFF
+
+_STRING_FIELDS = (
+    "country_code",
+    "country_name",
+    "country_name_en",
+    "pattern",
+    "allowed_letters",
+    "flag_emoji",
+)
+
+
+class SnapshotFormatError(ValueError):
+    """Файл снимка повреждён или записан другой версией формата."""
+
+
+def source_digest(csv_path: Path) -> bytes:
+    """Возвращает SHA-256 содержимого исходного CSV."""
+    return hashlib.sha256(csv_path.read_bytes()).digest()
+
+
+def snapshot_path(csv_path: Path) -> Path:
+    """Путь снимка по умолчанию: рядом с CSV с расширением .bin."""
+    return csv_path.with_suffix(".bin")
+
+
+def _array_bytes(array, dtype: str) -> bytes:
+    """Байты массива в заданном little-endian dtype (C-порядок)."""
+    return np.ascontiguousarray(array, dtype=dtype).tobytes()
+
+
+def encode(snapshot: DatasetSnapshot, digest: bytes) -> bytes:
+    """Сериализует снимок данных со всеми производными структурами."""
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        idx = string_ids.get(value)
+        if idx is None:
+            idx = string_ids[value] = len(strings)
+            strings.append(value)
+        return idx
+
+    countries = []
+    formats = []
+    for country, refs in zip(snapshot.countries, snapshot.formats):
+        ids = [intern(getattr(country, name)) for name in _STRING_FIELDS]
+        countries.append(
+            _COUNTRY.pack(*ids, country.lat, country.lng, len(formats), len(refs))
+        )
+        formats.extend(
+            _FORMAT.pack(plan_id, intern(fmt.pattern), weight)
+            for fmt, (plan_id, weight) in zip(country.formats, refs)
+        )
+
+    plans = []
+    tails: List[float] = []
+    for plan in snapshot.scoring_plans:
+        plans.append(
+            _PLAN.pack(
+                intern(plan.pattern),
+                intern(plan.allowed_letters),
+                len(tails),
+                len(plan.letter_tail),
+                len(tails) + len(plan.letter_tail),
+                len(plan.digit_tail),
+            )
+        )
+        tails.extend(plan.letter_tail)
+        tails.extend(plan.digit_tail)
+
+    index = snapshot.index
+    set_size = (len(index) + 7) // 8
+    char_sets = "".join(index.char_sets)
+    sets = [
+        *index.char_sets.values(),
+        *index.length_sets,
+        *index.letter_sets,
+        *index.digit_sets,
+    ]
+    index_section = _INDEX.pack(
+        intern(char_sets),
+        len(index.length_sets),
+        len(index.letter_sets),
+        len(index.digit_sets),
+    ) + b"".join(bits.to_bytes(set_size, "little") for bits in sets)
+
+    packed = snapshot.packed
+    distances = snapshot.distances
+    flags = 0
+    arrays = [b""] * 8
+    alphabet_id, width = _NONE, 0
+    if packed is not None and distances is not None:
+        flags |= _FLAG_ARRAYS
+        alphabet_id, width = intern("".join(packed.alphabet)), packed.width
+        arrays = [
+            _array_bytes(packed.slot_classes, "<i1"),
+            _array_bytes(packed.option_counts, "<i8"),
+            _array_bytes(packed.suffix_products, "<i8"),
+            _array_bytes(packed.membership, "<i8"),
+            _array_bytes(packed.int64_safe, "?"),
+            _array_bytes(distances.values, "<f8"),
+            _array_bytes(distances.lats, "<f8"),
+            _array_bytes(distances.lngs, "<f8"),
+        ]
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = [0]
+    for chunk in encoded:
+        offsets.append(offsets[-1] + len(chunk))
+
+    sections = [
+        b"".join(_OFFSET.pack(o) for o in offsets),
+        b"".join(encoded),
+        b"".join(countries),
+        b"".join(formats),
+        b"".join(plans),
+        struct.pack(f"<{len(tails)}d", *tails),
+        index_section,
+        *arrays,
+    ]
+
+    position = _HEADER.size + _SECTION.size * _SECTIONS
+    table = []
+    body = []
+    for section in sections:
+        padding = -position % _ALIGN
+        body.append(b"\0" * padding)
+        position += padding
+        table.append(_SECTION.pack(position, len(section)))
+        body.append(section)
+        position += len(section)
+
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        flags,
+        digest,
+        snapshot.digest.encode("ascii"),
+        len(strings),
+        len(snapshot.countries),
+        len(formats),
+        len(snapshot.scoring_plans),
+        len(tails),
+        alphabet_id,
+        width,
+    )
+    return header + b"".join(table) + b"".join(body)
+
+
+def decode(data, expected_digest: Optional[bytes] = None) -> Optional[DatasetSnapshot]:
+    """
+    Восстанавливает снимок данных (с version=0) из бинарного файла.
+
+    Массивы NumPy ссылаются на data без копирования, поэтому data (mmap)
+    должен жить, пока жив снимок.
+
+    Args:
+        data: Содержимое файла снимка (bytes или mmap).
+        expected_digest: SHA-256 текущего CSV; None — не проверять свежесть.
+
+    Returns:
+        DatasetSnapshot или None, если снимок устарел.
+
+    Raises:
+        SnapshotFormatError: Если файл повреждён или другой версии формата.
+    """
+    try:
+        (
+            magic,
+            version,
+            flags,
+            digest,
+            dataset_digest,
+            n_strings,
+            n_countries,
+            n_formats,
+            n_plans,
+            n_tails,
+            alphabet_id,
+            width,
+        ) = _HEADER.unpack_from(data, 0)
+    except struct.error as e:
+        raise SnapshotFormatError(f"Truncated snapshot header: {e}")
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise SnapshotFormatError(f"Unsupported snapshot format {magic!r} v{version}")
+    if expected_digest is not None and digest != expected_digest:
+        return None
+
+    table = [
+        _SECTION.unpack_from(data, _HEADER.size + _SECTION.size * i)
+        for i in range(_SECTIONS)
+    ]
+    end = table[-1][0] + table[-1][1]
+    if end != len(data) or any(start + size > end for start, size in table):
+        raise SnapshotFormatError("Snapshot size does not match its header")
+
+    def section(idx: int):
+        start, size = table[idx]
+        return data[start : start + size]
+
+    offsets = [o for (o,) in _OFFSET.iter_unpack(section(_S_OFFSETS))]
+    blob = bytes(section(_S_BLOB))
+    strings = [
+        blob[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(n_strings)
+    ]
+
+    tails = struct.unpack(f"<{n_tails}d", section(_S_TAILS))
+    scoring_plans = [
+        restore_plan(
+            strings[pattern],
+            strings[allowed],
+            letter_tail=tails[letter_start : letter_start + letter_len],
+            digit_tail=tails[digit_start : digit_start + digit_len],
+        )
+        for (
+            pattern,
+            allowed,
+            letter_start,
+            letter_len,
+            digit_start,
+            digit_len,
+        ) in _PLAN.iter_unpack(section(_S_PLANS))
+    ]
+    if len(scoring_plans) != n_plans:
+        raise SnapshotFormatError("Plan table does not match its header")
+
+    format_records = list(_FORMAT.iter_unpack(section(_S_FORMATS)))
+    if len(format_records) != n_formats:
+        raise SnapshotFormatError("Format table does not match its header")
+
+    countries: List[CountrySchema] = []
+    formats: List[Tuple[Tuple[int, float], ...]] = []
+    for *ids, lat, lng, first, count in _COUNTRY.iter_unpack(section(_S_COUNTRIES)):
+        fields = {
+            name: (strings[idx] if idx != _NONE else None)
+            for name, idx in zip(_STRING_FIELDS, ids)
+        }
+        records = format_records[first : first + count]
+        # Данные провалидированы при сборке снимка
+        country_formats = [
+            PlateFormat.model_construct(pattern=strings[pattern], weight=weight)
+            for _, pattern, weight in records
+        ]
+        countries.append(
+            CountrySchema.model_construct(
+                lat=lat, lng=lng, formats=country_formats, **fields
+            )
+        )
+        formats.append(tuple((plan_id, weight) for plan_id, _, weight in records))
+    if len(countries) != n_countries:
+        raise SnapshotFormatError("Country table does not match its header")
+
+    index = _decode_index(section(_S_INDEX), strings, scoring_plans)
+
+    packed: Optional[PackedPlans] = None
+    distances: Optional[DistanceMatrix] = None
+    if np is not None and flags & _FLAG_ARRAYS:
+        alphabet = strings[alphabet_id]
+
+        def array(idx: int, dtype: str, shape: Tuple[int, ...]):
+            start, size = table[idx]
+            count = size // np.dtype(dtype).itemsize
+            return np.frombuffer(data, dtype, count, start).reshape(shape)
+
+        packed = PackedPlans(
+            slot_classes=array(_S_SLOT_CLASSES, "<i1", (n_plans, width)),
+            option_counts=array(_S_OPTION_COUNTS, "<i8", (n_plans, width)),
+            suffix_products=array(_S_SUFFIX_PRODUCTS, "<i8", (n_plans, width + 1)),
+            membership=array(_S_MEMBERSHIP, "<i8", (len(alphabet), n_plans, width)),
+            alphabet={c: i for i, c in enumerate(alphabet)},
+            totals=[plan.total for plan in scoring_plans],
+            int64_safe=array(_S_INT64_SAFE, "?", (n_plans,)),
+            plans=tuple(scoring_plans),
+        )
+        distances = DistanceMatrix(
+            values=array(_S_DISTANCES, "<f8", (n_countries, n_countries)),
+            lats=array(_S_LATS, "<f8", (n_countries,)),
+            lngs=array(_S_LNGS, "<f8", (n_countries,)),
+        )
+    elif np is not None:
+        # Снимок собран без NumPy: упаковка и расстояния считаются здесь
+        packed = PackedPlans.from_plans(scoring_plans)
+        distances = DistanceMatrix.from_points(
+            [c.lat for c in countries], [c.lng for c in countries]
+        )
+
+    return DatasetSnapshot.assemble(
+        countries,
+        scoring_plans,
+        formats,
+        0,
+        index=index,
+        packed=packed,
+        distances=distances,
+        digest=dataset_digest.decode("ascii"),
+    )
+
+
+def _decode_index(
+    data, strings: List[str], plans: List[PlatePlan]
+) -> CapabilityIndex:
+    """Восстанавливает CapabilityIndex из готовых битовых множеств."""
+    chars_id, n_length, n_letter, n_digit = _INDEX.unpack_from(data, 0)
+    chars = strings[chars_id]
+    set_size = (len(plans) + 7) // 8
+    n_sets = len(chars) + n_length + n_letter + n_digit
+    body = bytes(data[_INDEX.size :])
+    if len(body) != set_size * n_sets:
+        raise SnapshotFormatError("Index section does not match its header")
+    sets = [
+        int.from_bytes(body[i * set_size : (i + 1) * set_size], "little")
+        for i in range(n_sets)
+    ]
+
+    length_start = len(chars)
+    letter_start = length_start + n_length
+    digit_start = letter_start + n_letter
+    return CapabilityIndex(
+        signatures=tuple(CapabilitySignature.from_plan(p) for p in plans),
+        char_sets=dict(zip(chars, sets)),
+        length_sets=tuple(sets[length_start:letter_start]),
+        letter_sets=tuple(sets[letter_start:digit_start]),
+        digit_sets=tuple(sets[digit_start:]),
+    )
+
+
+def write_snapshot(snapshot: DatasetSnapshot, digest: bytes, path: Path) -> None:
+    """Атомарно записывает снимок (через временный файл)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(encode(snapshot, digest))
+    tmp.replace(path)
+
+
+def read_snapshot(
+    path: Path, expected_digest: Optional[bytes] = None
+) -> Optional[DatasetSnapshot]:
+    """
+    Читает снимок через mmap.
+
+    Массивы снимка отображаются из файла; mmap закрывается, когда снимок
+    перестаёт использоваться. Файл заменяется только атомарно
+    (write_snapshot), поэтому отображение старого файла остаётся целым.
+
+    Returns:
+        См. decode; None также, если файла нет.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        if f.seek(0, 2) == 0:
+            raise SnapshotFormatError("Empty snapshot file")
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return decode(data, expected_digest)
+    except (struct.error, IndexError, UnicodeDecodeError, ValueError) as e:
+        if isinstance(e, SnapshotFormatError):
+            raise
+        raise SnapshotFormatError(f"Corrupted snapshot: {e}")
+    finally:
+        try:
+            data.close()
+        except BufferError:
+            # На mmap ссылаются массивы NumPy снимка: его закроет сборщик мусора
+            pass
+
+
+def main(argv: List[str] | None = None) -> int:
+    from app.core.repository import CountryRepository
+
+    parser = argparse.ArgumentParser(description="Build binary countries snapshot")
+    parser.add_argument("--csv", type=Path, default=None, help="исходный CSV")
+    parser.add_argument("--out", type=Path, default=None, help="путь снимка")
+    args = parser.parse_args(argv)
+
+    repository = CountryRepository(args.csv)
+    countries, _ = repository._read_csv()
+    out = args.out or snapshot_path(repository.file_path)
+    snapshot = DatasetSnapshot.build(countries, 0)
+    write_snapshot(snapshot, source_digest(repository.file_path), out)
+    print(f"Wrote {len(countries)} countries to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
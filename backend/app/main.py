@@ -1,15 +1,54 @@
 import os
+from contextlib import asynccontextmanager
 
+from app.api.deps import (
+    get_admission_controller,
+    get_compute_executor,
+    get_plate_service,
+    get_result_cache,
+)
+from app.api.middleware import (
+    AdmissionMiddleware,
+    MetricsMiddleware,
+    ProfilingMiddleware,
+)
+from app.api.routes import admin
+from app.api.routes import metrics as metrics_routes
 from app.api.routes import plates
-from fastapi import FastAPI
+from app.core.config import get_settings
+from app.core.metrics import metrics
+from app.services.executor import ComputeOverloadedError, ComputeTimeoutError
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Останавливает пул вычислений при завершении приложения."""
+    yield
+    get_compute_executor().shutdown()
+
 
 app = FastAPI(
     title="SignLuck API",
     description="API сервиса анализа вероятностей номерных знаков",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Профилирование внутри контроля допуска и метрик; без BACKEND_PROFILING
+# middleware не подключается и обычные запросы его не проходят
+settings = get_settings()
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware, directory=settings.profile_dir)
+
+# Контроль допуска внутри метрик: отказы тоже попадают в задержки запросов
+app.add_middleware(AdmissionMiddleware, controller=get_admission_controller())
+app.add_middleware(MetricsMiddleware)
+
+# CORS подключается последним и оборачивает все остальные middleware,
+# поэтому заголовки CORS есть и у отказов контроля допуска (503/429).
 # Чтение списка разрешенных источников из переменных окружения
 # Если переменная не задана, используется localhost для разработки
 origins = os.getenv("BACKEND_CORS_ORIGINS", "http://localhost:5173").split(",")
@@ -20,9 +59,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Фронтенду нужен Retry-After из ответов 429/503
+    expose_headers=["Retry-After"],
 )
 
 app.include_router(plates.router)
+app.include_router(metrics_routes.router)
+app.include_router(admin.router)
+
+metrics.register_collector("cache", lambda: get_result_cache().stats())
+metrics.register_collector("executor", lambda: get_compute_executor().stats())
+metrics.register_collector("singleflight", lambda: get_plate_service().inflight.stats())
+metrics.register_collector("admission", lambda: get_admission_controller().stats())
+
+
+@app.exception_handler(ComputeOverloadedError)
+async def compute_overloaded_handler(request: Request, exc: ComputeOverloadedError):
+    """Очередь вычислений переполнена — клиенту стоит повторить позже."""
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.exception_handler(ComputeTimeoutError)
+async def compute_timeout_handler(request: Request, exc: ComputeTimeoutError):
+    """Вычисление не уложилось в таймаут."""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
 
 
 @app.get("/", tags=["Health"])
@@ -0,0 +1,22 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class CombinationItem(BaseModel):
+    """Комбинация и вероятность встретить её в номере страны."""
+
+    combination: str
+    probability: float = Field(..., ge=0.0, le=100.0)
+
+
+class CombinationsResponse(BaseModel):
+    """Самые вероятные комбинации заданной длины для страны."""
+
+    country_code: str
+    length: int
+    combinations: List[CombinationItem]
+    lucky_numbers: List[CombinationItem] = Field(
+        default_factory=list,
+        description="Самые вероятные чисто цифровые комбинации той же длины.",
+    )
@@ -1,6 +1,23 @@
-from typing import Optional
+from typing import Any, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+# Разделитель нескольких шаблонов (и их долей) в одной ячейке CSV
+FORMAT_SEPARATOR = "|"
+
+
+class PlateFormat(BaseModel):
+    """
+    Один из форматов номеров, одновременно находящихся в обращении.
+
+    Attributes:
+        pattern (str): Шаблон номерного знака.
+        weight (float): Доля формата в автопарке страны (после нормировки
+            доли всех форматов страны в сумме дают 1).
+    """
+
+    pattern: str
+    weight: float = Field(1.0, gt=0)
 
 
 class CountrySchema(BaseModel):
@@ -9,13 +26,19 @@ class CountrySchema(BaseModel):
 
     Используется для валидации данных из CSV-репозитория.
 
+    У страны может быть несколько форматов (старая и новая серии,
+    региональные варианты). В CSV они перечисляются в колонке pattern
+    через "|", а их доли в парке — в необязательной колонке weights
+    в том же порядке (без неё форматы равновероятны).
+
     Attributes:
         country_code (str): Двухбуквенный ISO-код страны.
         country_name (str): Полное название страны.
-        pattern (str): Шаблон номерного знака.
+        pattern (str): Шаблон основного формата (с наибольшей долей).
         allowed_letters (str): Разрешённые буквы.
         lat (float): Географическая широта страны.
         lng (float): Географическая долгота страны.
+        formats (List[PlateFormat]): Все форматы страны с нормированными долями.
     """
 
     country_code: str = Field(..., min_length=2, max_length=2)
@@ -26,10 +49,63 @@ class CountrySchema(BaseModel):
     lat: float
     lng: float
     flag_emoji: Optional[str] = None
+    formats: List[PlateFormat] = Field(default_factory=list)
 
     @field_validator("country_code")
     @classmethod
     def normalize_country_code(cls, v: str) -> str:
         return v.upper()
 
+    @model_validator(mode="before")
+    @classmethod
+    def split_formats(cls, data: Any) -> Any:
+        """Разбирает "A000AA|0000AA" и weights="0.7|0.3" в список форматов."""
+        if not isinstance(data, dict):
+            return data
+        if data.get("formats"):
+            if not data.get("pattern"):
+                # Основной шаблон всё равно выбирается по долям в normalize_formats
+                first = data["formats"][0]
+                first = first["pattern"] if isinstance(first, dict) else first.pattern
+                data = {**data, "pattern": first}
+            return data
+
+        pattern = data.get("pattern")
+        weights = data.get("weights")
+        if not isinstance(pattern, str) or (
+            FORMAT_SEPARATOR not in pattern and not weights
+        ):
+            return data
+
+        patterns = [p.strip() for p in pattern.split(FORMAT_SEPARATOR)]
+        if weights:
+            shares = [w.strip() for w in str(weights).split(FORMAT_SEPARATOR)]
+            if len(shares) != len(patterns):
+                raise ValueError(
+                    f"Got {len(shares)} weights for {len(patterns)} patterns"
+                )
+        else:
+            shares = [1.0] * len(patterns)
+
+        return {
+            **data,
+            "pattern": patterns[0],
+            "formats": [{"pattern": p, "weight": w} for p, w in zip(patterns, shares)],
+        }
+
+    @model_validator(mode="after")
+    def normalize_formats(self) -> "CountrySchema":
+        """Нормирует доли форматов и выбирает основной шаблон."""
+        if not self.formats:
+            self.formats = [PlateFormat(pattern=self.pattern)]
+            return self
+
+        total = sum(f.weight for f in self.formats)
+        self.formats = [
+            PlateFormat(pattern=f.pattern, weight=f.weight / total)
+            for f in self.formats
+        ]
+        self.pattern = max(self.formats, key=lambda f: f.weight).pattern
+        return self
+
     model_config = ConfigDict(from_attributes=True)
@@ -1,6 +1,6 @@
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class PlateVisualSymbol(BaseModel):
@@ -18,6 +18,17 @@ class PlateExampleSymbol(BaseModel):
     is_query: bool  # Является ли этот символ частью искомой комбинации
 
 
+class CompactPlateExample(BaseModel):
+    """Пример номера строкой с битовой маской символов из запроса."""
+
+    value: str
+    query_mask: int  # Бит i установлен, если i-й символ номера взят из запроса
+
+
+# Как отдавать примеры: посимвольно, компактно или не генерировать вовсе
+ExamplesMode = Literal["full", "compact", "none"]
+
+
 class PlateCalculationResult(BaseModel):
     """Результат расчета вероятности для конкретной страны."""
 
@@ -31,3 +42,7 @@ class PlateCalculationResult(BaseModel):
     pattern: str
     flag_emoji: Optional[str] = None
     examples: List[List[PlateExampleSymbol]] = Field(default_factory=list)
+    compact_examples: List[CompactPlateExample] = Field(default_factory=list)
+
+    # Готовый JSON для быстрой сериализации ответа (см. app.api.serialization)
+    _encoded: Optional[bytes] = PrivateAttr(default=None)
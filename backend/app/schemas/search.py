@@ -1,26 +1,125 @@
 from typing import List, Optional
 
-from app.schemas.plate import PlateCalculationResult
+from app.core.query import QuerySyntaxError, parse_query
+from app.schemas.plate import CompactPlateExample, ExamplesMode, PlateCalculationResult
 from pydantic import BaseModel, Field, field_validator
 
+# Максимум позиций в запросе (класс "[ABE]" — одна позиция)
+MAX_QUERY_POSITIONS = 10
+
+
+def _validate_query(v: str) -> str:
+    """Нормализует запрос и проверяет синтаксис и число позиций."""
+    v = v.strip().upper()
+    try:
+        tokens = parse_query(v)
+    except QuerySyntaxError as e:
+        raise ValueError(str(e))
+    if not tokens:
+        raise ValueError("Query must contain at least one position")
+    if len(tokens) > MAX_QUERY_POSITIONS:
+        raise ValueError(f"Query must contain at most {MAX_QUERY_POSITIONS} positions")
+    return v
+
 
 class SearchRequest(BaseModel):
-    """Схема входящего запроса."""
+    """
+    Схема входящего запроса.
+
+    Помимо обычных символов запрос может содержать "?" (любая буква
+    или цифра), "#" (цифра), "@" (буква) и наборы вида "[ABE]" или "[0-3]".
+    """
 
-    query: str = Field(..., min_length=1, max_length=10)
+    query: str = Field(
+        ...,
+        min_length=1,
+        max_length=60,
+        description=(
+            "Комбинация до 10 позиций: символы, ? (любой), # (цифра), "
+            "@ (буква), [ABE] или [0-3] (набор)."
+        ),
+    )
     user_lat: Optional[float] = None
     user_lng: Optional[float] = None
 
     @field_validator("query")
     @classmethod
     def normalize_query(cls, v: str) -> str:
-        return v.strip().upper()
+        return _validate_query(v)
 
 
 class SearchResponse(BaseModel):
     """Схема ответа на поисковый запрос."""
 
     results: List[PlateCalculationResult]
-    total_results: int
+    total_results: int = Field(
+        ...,
+        description=(
+            "Сколько стран проходит min_probability без учёта limit "
+            "(может быть больше числа результатов)."
+        ),
+    )
     max_probability: float
     suggestions: List[str] = Field(default_factory=list)
+
+
+class BatchSearchRequest(BaseModel):
+    """Схема пакетного запроса: несколько комбинаций за один вызов."""
+
+    queries: List[SearchRequest] = Field(..., min_length=1, max_length=5000)
+    top: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Сколько лучших стран вернуть для каждой комбинации.",
+    )
+    min_probability: Optional[float] = Field(
+        default=None,
+        ge=0.0,
+        le=100.0,
+        description="Минимальная вероятность страны в процентах.",
+    )
+    examples: ExamplesMode = Field(
+        default="full",
+        description="Формат примеров номеров: full, compact или none.",
+    )
+
+
+class BatchSearchItem(SearchResponse):
+    """Ответ на одну комбинацию из пакета."""
+
+    query: str
+
+
+class BatchSearchResponse(BaseModel):
+    """Схема ответа на пакетный запрос (в порядке входящих комбинаций)."""
+
+    items: List[BatchSearchItem]
+
+
+class ExamplesRequest(BaseModel):
+    """Запрос страницы примеров номеров для одной страны."""
+
+    query: str = Field(..., min_length=1, max_length=60)
+    country_code: str = Field(..., min_length=2, max_length=2)
+    offset: int = Field(default=0, ge=0, le=1000)
+    count: int = Field(default=5, ge=1, le=50)
+
+    @field_validator("query")
+    @classmethod
+    def normalize_query(cls, v: str) -> str:
+        return _validate_query(v)
+
+    @field_validator("country_code")
+    @classmethod
+    def normalize_country_code(cls, v: str) -> str:
+        return v.strip().upper()
+
+
+class ExamplesResponse(BaseModel):
+    """Страница примеров номеров; next_offset равен None на последней странице."""
+
+    query: str
+    country_code: str
+    offset: int
+    examples: List[CompactPlateExample]
+    next_offset: Optional[int] = None
@@ -1,13 +1,22 @@
+import hashlib
 import logging
 import random
-from typing import Dict, List, Optional, Set
+from fractions import Fraction
+from itertools import islice
+from typing import Iterator, List, Sequence, Tuple
 
+from app.core.metrics import stage
+from app.core.plan import PlatePlan, compile_plan
+from app.core.query import parse_query
 from app.schemas.country import CountrySchema
 from app.schemas.plate import (
+    CompactPlateExample,
+    ExamplesMode,
     PlateCalculationResult,
     PlateExampleSymbol,
     PlateVisualSymbol,
 )
+from app.services.matcher import QueryMatcher
 
 logger = logging.getLogger(__name__)
 
@@ -17,95 +26,131 @@ class PlateCalculator:
     Сервис расчёта вероятности с поддержкой всех допустимых размещений запроса.
 
     Использует комбинаторику для подсчета общего числа вариантов номера
-    и числа выигрышных вариантов, где встречается подстрока пользователя.
+    и точного числа выигрышных вариантов, где встречается подстрока
+    пользователя (см. QueryMatcher). Шаблон страны читается только
+    из скомпилированного PlatePlan.
+
+    Если у страны несколько форматов номеров, вероятность — смесь
+    вероятностей форматов с весами их долей в парке, а символы и примеры
+    строятся по формату, дающему наибольший вклад.
     """
 
-    DIGITS_COUNT = 10
+    EXAMPLES_COUNT = 5
+    # Сколько повторов подряд допускается, прежде чем поток примеров иссякнет
+    EXAMPLE_ATTEMPTS = 10
+
+    EXAMPLES_FULL = "full"
+    EXAMPLES_COMPACT = "compact"
+    EXAMPLES_NONE = "none"
 
     def calculate_probability(
-        self, query: str, country: CountrySchema
+        self,
+        query: str,
+        country: CountrySchema,
+        plan: PlatePlan | None = None,
+        examples: ExamplesMode = EXAMPLES_FULL,
     ) -> PlateCalculationResult | None:
         """Основной метод расчета вероятности.
 
         Args:
             query: Строка запроса (например, "777").
             country: Объект страны с шаблоном номера.
+            plan: Скомпилированный шаблон одного формата. Если не передан,
+                считается смесь всех форматов страны (планы берутся из кэша
+                compile_plan).
+            examples: Формат примеров номеров ("full", "compact", "none").
 
         Returns:
             PlateCalculationResult или None, если совпадений нет.
         """
         query = query.upper()
-        pattern = country.pattern.upper()
-        allowed = country.allowed_letters.upper()
+        matcher = QueryMatcher(query)
+        if plan is not None:
+            winning_combinations = matcher.count(plan)
+            return self.build_result(
+                query, country, plan, winning_combinations, examples
+            )
 
-        matches = self._find_all_matches(query, pattern, allowed)
-        if not matches:
+        parts = []
+        for fmt in country.formats:
+            format_plan = compile_plan(fmt.pattern, country.allowed_letters)
+            parts.append((fmt.weight, matcher.count(format_plan), format_plan))
+        probability, plan, winning_combinations = self.mixture(parts)
+        return self.build_result(
+            query, country, plan, winning_combinations, examples, probability
+        )
+
+    def build_result(
+        self,
+        query: str,
+        country: CountrySchema,
+        plan: PlatePlan,
+        winning_combinations: int,
+        examples: ExamplesMode = EXAMPLES_FULL,
+        probability: float | None = None,
+    ) -> PlateCalculationResult | None:
+        """
+        Собирает результат по уже посчитанному числу выигрышных номеров.
+
+        Используется пакетным движком, который считает совпадения
+        сразу для всех стран.
+
+        Args:
+            query: Строка запроса в верхнем регистре.
+            country: Объект страны.
+            plan: Скомпилированный шаблон формата для символов и примеров.
+            winning_combinations: Число номеров формата, содержащих запрос.
+            examples: Формат примеров номеров ("full", "compact", "none").
+            probability: Готовая вероятность страны (см. mixture); None —
+                вероятность формата plan.
+
+        Returns:
+            PlateCalculationResult или None, если совпадений нет.
+        """
+        if winning_combinations == 0:
             return None
 
-        # Расчет общего количества комбинаций
-        total_combinations = self._calculate_total_combinations(pattern, allowed)
+        matcher = QueryMatcher(query)
+        with stage("matching"):
+            pattern_to_query_map = matcher.placement_map(plan)
+            if pattern_to_query_map is None:
+                return None
 
-        winning_combinations = 0
-        examples = []
-        seen_examples_str: Set[str] = set()
+            # Для визуализации нужно только первое размещение
+            primary_match = next(matcher.iter_placements(plan))
 
-        for match in matches:
-            # Подсчет вариантов для свободных слотов в текущем размещении
-            match_combinations = self._calculate_match_combinations(
-                match, pattern, allowed
-            )
-            winning_combinations += match_combinations
-
-            if len(examples) < 5:
-                ex_symbols = self._generate_example(match, query, pattern, allowed)
-                ex_str = "".join(s.value for s in ex_symbols)
-                if ex_str not in seen_examples_str:
-                    examples.append(ex_symbols)
-                    seen_examples_str.add(ex_str)
-
-        # Генерация дополнительных примеров для визуализации, если их мало
-        if matches and len(examples) < 5 and winning_combinations > len(matches):
-            for _ in range(10):
-                if len(examples) >= 5:
-                    break
-                random_match = random.choice(matches)
-                new_ex_symbols = self._generate_example(
-                    random_match, query, pattern, allowed
+        if probability is None:
+            probability = self.probability(winning_combinations, plan)
+
+        full_examples: List[List[PlateExampleSymbol]] = []
+        compact_examples: List[CompactPlateExample] = []
+        if examples != self.EXAMPLES_NONE:
+            with stage("examples"):
+                page = self.examples_page(
+                    query, country, plan, winning_combinations, 0, self.EXAMPLES_COUNT
                 )
-                new_ex_str = "".join(s.value for s in new_ex_symbols)
-                if new_ex_str not in seen_examples_str:
-                    examples.append(new_ex_symbols)
-                    seen_examples_str.add(new_ex_str)
-
-        probability = (
-            (winning_combinations / total_combinations * 100)
-            if total_combinations > 0
-            else 0.0
-        )
-        probability = min(probability, 100.0)
-
-        # Карта соответствия индексов шаблона и запроса
-        pattern_to_query_map: Dict[int, Set[int]] = {
-            i: set() for i in range(len(pattern))
-        }
-        for match in matches:
-            for query_idx, pattern_idx in enumerate(match):
-                pattern_to_query_map[pattern_idx].add(query_idx)
-
-        # Формирование визуального представления
-        primary_match = matches[0]
-        symbols: List[PlateVisualSymbol] = []
-        for i, p_char in enumerate(pattern):
-            is_fixed_in_primary = i in primary_match
-            value = query[primary_match.index(i)] if is_fixed_in_primary else p_char
-
-            symbols.append(
-                PlateVisualSymbol(
-                    value=value,
-                    is_fixed=is_fixed_in_primary,
-                    possible_query_indices=sorted(list(pattern_to_query_map[i])),
+                if examples == self.EXAMPLES_COMPACT:
+                    compact_examples = page
+                else:
+                    full_examples = [self.expand_example(e) for e in page]
+
+        with stage("symbols"):
+            # Формирование визуального представления
+            tokens = parse_query(query)
+            symbols: List[PlateVisualSymbol] = []
+            for i, p_char in enumerate(plan.pattern):
+                is_fixed_in_primary = i in primary_match
+                value = (
+                    tokens[primary_match.index(i)].text if is_fixed_in_primary else p_char
+                )
+
+                symbols.append(
+                    PlateVisualSymbol(
+                        value=value,
+                        is_fixed=is_fixed_in_primary,
+                        possible_query_indices=sorted(pattern_to_query_map[i]),
+                    )
                 )
-            )
 
         return PlateCalculationResult(
             country_name=country.country_name,
@@ -114,103 +159,186 @@ class PlateCalculator:
             lng=country.lng,
             probability=probability,
             symbols=symbols,
-            allowed_letters=allowed,
-            pattern=pattern,
+            allowed_letters=plan.allowed_letters,
+            pattern=plan.pattern,
             flag_emoji=country.flag_emoji,
-            examples=examples[:10],
+            examples=full_examples,
+            compact_examples=compact_examples,
         )
 
-    def _get_options_count(self, char: str, allowed: str) -> int:
-        """Возвращает количество вариантов для одного символа шаблона."""
-        if char == "A":
-            return len(allowed) if allowed else 26
-        if char == "0":
-            return self.DIGITS_COUNT
-        return 1
-
-    def _calculate_total_combinations(self, pattern: str, allowed: str) -> int:
-        """Считает общее пространство вариантов для шаблона."""
-        total = 1
-        for char in pattern:
-            total *= self._get_options_count(char, allowed)
-        return total
-
-    def _calculate_match_combinations(
-        self, match_indices: List[int], pattern: str, allowed: str
+    def probability(self, winning_combinations: int, plan: PlatePlan) -> float:
+        """Переводит число выигрышных номеров в вероятность в процентах."""
+        if plan.total <= 0:
+            return 0.0
+        return float(Fraction(winning_combinations, plan.total) * 100)
+
+    def mixture(
+        self, parts: Sequence[Tuple[float, int, PlatePlan]]
+    ) -> Tuple[float, PlatePlan, int]:
+        """
+        Смешивает вероятности форматов страны по их долям в парке.
+
+        Args:
+            parts: Тройки (доля формата, число выигрышных номеров, план).
+
+        Returns:
+            Вероятность страны в процентах, план формата с наибольшим
+            вкладом (первый при равенстве) и его число выигрышных номеров.
+        """
+        if len(parts) == 1:
+            _, count, plan = parts[0]
+            return self.probability(count, plan), plan, count
+
+        total = Fraction(0)
+        best = None
+        for weight, count, plan in parts:
+            if not count or plan.total <= 0:
+                continue
+            share = Fraction(weight) * Fraction(count, plan.total)
+            total += share
+            if best is None or share > best[0]:
+                best = (share, plan, count)
+
+        if best is None:
+            _, count, plan = parts[0]
+            return 0.0, plan, count
+        return float(total * 100), best[1], best[2]
+
+    def count_matching_plates(
+        self, query: str, country: CountrySchema, plan: PlatePlan | None = None
     ) -> int:
         """
-        Считает комбинации для конкретного наложения, варьируя только свободные слоты.
+        Возвращает точное число номеров страны, содержащих комбинацию.
 
         Args:
-            match_indices: Индексы шаблона, которые 'заняты' запросом.
+            query: Строка запроса.
+            country: Объект страны с шаблоном номера.
+            plan: Скомпилированный шаблон (по умолчанию — основной формат).
         """
-        combinations = 1
-        for i, char in enumerate(pattern):
-            if i not in match_indices:
-                combinations *= self._get_options_count(char, allowed)
-        return combinations
+        if plan is None:
+            plan = compile_plan(country.pattern, country.allowed_letters)
+        return QueryMatcher(query.upper()).count(plan)
 
-    def _generate_example(
-        self, match_indices: List[int], query: str, pattern: str, allowed: str
-    ) -> List[PlateExampleSymbol]:
-        """Генерирует случайный валидный номер для данного совпадения."""
-        result = []
-        query_ptr = 0
-
-        for i, p_char in enumerate(pattern):
-            if i in match_indices:
-                # Символ из запроса
-                k = match_indices.index(i)
-                result.append(PlateExampleSymbol(value=query[k], is_query=True))
-            else:
-                # Свободный слот, случайная генерация
-                char_val = p_char
-                if p_char == "A":
-                    letters = allowed if allowed else "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-                    char_val = random.choice(letters)
-                elif p_char == "0":
-                    char_val = str(random.randint(0, 9))
+    def match_fraction(
+        self, query: str, country: CountrySchema, plan: PlatePlan | None = None
+    ) -> Fraction:
+        """
+        Возвращает точную долю номеров страны, содержащих комбинацию.
 
-                result.append(PlateExampleSymbol(value=char_val, is_query=False))
+        Без plan доля считается по всем форматам страны с их долями в парке.
+        """
+        if plan is None:
+            fraction = Fraction(0)
+            for fmt in country.formats:
+                fraction += Fraction(fmt.weight) * self.match_fraction(
+                    query, country, compile_plan(fmt.pattern, country.allowed_letters)
+                )
+            return fraction
+        if plan.total == 0:
+            return Fraction(0)
+        return Fraction(self.count_matching_plates(query, country, plan), plan.total)
 
-        return result
+    def example_seed(self, query: str, country: CountrySchema, plan: PlatePlan) -> int:
+        """
+        Детерминированное зерно примеров для пары (запрос, страна).
 
-    def _is_char_matching(self, q_char: str, p_char: str, allowed: str) -> bool:
-        if p_char == "A":
-            return q_char.isalpha() and q_char in allowed
-        if p_char == "0":
-            return q_char.isdigit()
-        return q_char == p_char
+        Одинаковый запрос к тем же данным всегда даёт те же примеры,
+        поэтому результаты можно кэшировать и листать постранично.
+        """
+        key = f"{query}|{country.country_code}|{plan.pattern}|{plan.allowed_letters}"
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little")
 
-    def _find_all_matches(
-        self, query: str, pattern: str, allowed: str
-    ) -> List[List[int]]:
+    def iter_examples(
+        self, query: str, country: CountrySchema, plan: PlatePlan
+    ) -> Iterator[Tuple[str, int]]:
         """
-        Находит ВСЕ допустимые размещения запроса в шаблоне.
+        Лениво выдаёт различные примеры номеров, содержащих запрос.
 
-        Алгоритм пытается "приложить" query к pattern, начиная с разных позиций,
-        учитывая пропуски символов шаблона (например, пробелов или дефисов).
+        Сначала каждое следующее размещение запроса даёт по примеру, затем
+        размещения выбираются случайно. Свободные слоты заполняются
+        генератором с зерном example_seed. Поток заканчивается, когда
+        EXAMPLE_ATTEMPTS попыток подряд дали только повторы.
 
-        Returns:
-            List[List[int]]: Список вариантов. Каждый вариант - это список индексов
-            шаблона, которые соответствуют символам запроса.
+        Yields:
+            Пара (номер, битовая маска слотов, взятых из запроса).
+        """
+        rng = random.Random(self.example_seed(query, country, plan))
+        source = QueryMatcher(query).iter_placements(plan)
+        placements: List[List[int]] = []
+        seen = set()
+        misses = 0
+
+        while misses < self.EXAMPLE_ATTEMPTS:
+            match = next(source, None)
+            if match is not None:
+                placements.append(match)
+            elif placements:
+                match = rng.choice(placements)
+            else:
+                return
+
+            example = self._generate_example(match, query, plan, rng)
+            if example[0] in seen:
+                misses += 1
+                continue
+            misses = 0
+            seen.add(example[0])
+            yield example
+
+    def examples_page(
+        self,
+        query: str,
+        country: CountrySchema,
+        plan: PlatePlan,
+        winning_combinations: int,
+        offset: int = 0,
+        count: int = EXAMPLES_COUNT,
+    ) -> List[CompactPlateExample]:
         """
+        Возвращает страницу примеров [offset, offset + count) из iter_examples.
 
-        results: List[List[int]] = []
+        Примеров не больше, чем выигрышных номеров.
+        """
+        stop = min(offset + count, winning_combinations)
+        return [
+            CompactPlateExample(value=value, query_mask=mask)
+            for value, mask in islice(
+                self.iter_examples(query, country, plan), offset, max(stop, offset)
+            )
+        ]
 
-        def backtrack(q_idx: int, p_idx: int, current: List[int]) -> None:
-            if q_idx == len(query):
-                results.append(current.copy())
-                return
-            if p_idx == len(pattern):
-                return
+    def expand_example(self, example: CompactPlateExample) -> List[PlateExampleSymbol]:
+        """Разворачивает компактный пример в посимвольное представление."""
+        return [
+            PlateExampleSymbol(value=char, is_query=bool(example.query_mask >> i & 1))
+            for i, char in enumerate(example.value)
+        ]
 
-            # Попытка сопоставления
-            if self._is_char_matching(query[q_idx], pattern[p_idx], allowed):
-                backtrack(q_idx + 1, p_idx + 1, current + [p_idx])
+    def _generate_example(
+        self,
+        match_indices: List[int],
+        query: str,
+        plan: PlatePlan,
+        rng: random.Random,
+    ) -> Tuple[str, int]:
+        """
+        Генерирует валидный номер для данного совпадения.
 
-            # Пропуск символа шаблона
-            backtrack(q_idx, p_idx + 1, current)
+        Позиция-класс запроса заполняется случайным символом класса,
+        допустимым в слоте.
 
-        backtrack(0, 0, [])
-        return results
+        Returns:
+            Пара (номер, битовая маска слотов, занятых символами запроса).
+        """
+        tokens = parse_query(query)
+        chars = [rng.choice(c) if len(c) > 1 else c for c in plan.slot_chars]
+        mask = 0
+        for k, i in enumerate(match_indices):
+            allowed = tokens[k].chars
+            if len(allowed) == 1:
+                chars[i] = allowed
+            else:
+                chars[i] = rng.choice([c for c in plan.slot_chars[i] if c in allowed])
+            mask |= 1 << i
+        return "".join(chars), mask
@@ -0,0 +1,172 @@
+import heapq
+from dataclasses import dataclass
+from itertools import islice, product
+from typing import Dict, Iterator, List, Sequence, Tuple, Union
+
+from app.core.plan import PlatePlan
+from app.services.matcher import QueryMatcher
+
+# Длины комбинаций, предрасчитываемые при загрузке данных
+PRECOMPUTED_LENGTHS = (1, 2, 3, 4)
+# Сколько лучших комбинаций хранится для каждой длины
+PRECOMPUTED_LIMIT = 20
+
+
+@dataclass(frozen=True)
+class Combination:
+    """
+    Комбинация символов и вероятность встретить её в номере страны.
+
+    Attributes:
+        combination (str): Комбинация.
+        probability (float): Вероятность в процентах.
+    """
+
+    combination: str
+    probability: float
+
+
+class CombinationFinder:
+    """
+    Поиск самых вероятных комбинаций заданной длины для шаблона страны.
+
+    Для страны с несколькими форматами вероятность комбинации — смесь
+    вероятностей по форматам с их долями в парке.
+
+    Символы, допустимые в одних и тех же слотах всех форматов,
+    взаимозаменяемы: DP подсчёта видит только число подходящих вариантов
+    слота, поэтому
+    вероятность комбинации зависит лишь от последовательности классов
+    таких символов. Обычно классов два-три (разрешённые буквы, цифры,
+    буквы и цифры литералов), и поиск идёт по последовательностям
+    классов, а не по 36^k строкам.
+
+    Последовательности перебираются best-first: у незавершённой
+    последовательности оставшиеся позиции заменяются классом "любой
+    символ", что даёт верхнюю оценку для всех её продолжений. Готовые
+    последовательности выходят в порядке убывания вероятности и
+    разворачиваются в конкретные комбинации лениво.
+
+    Attributes:
+        formats (Tuple[Tuple[PlatePlan, float], ...]): Планы форматов страны
+            с их долями.
+        classes (Tuple[str, ...]): Классы взаимозаменяемых букв и цифр.
+    """
+
+    def __init__(
+        self, formats: Union[PlatePlan, Sequence[Tuple[PlatePlan, float]]]
+    ) -> None:
+        if isinstance(formats, PlatePlan):
+            formats = [(formats, 1.0)]
+        self.formats = tuple((plan, weight) for plan, weight in formats if plan.total)
+        slot_chars = [plan.slot_chars for plan, _ in self.formats]
+
+        groups: Dict[Tuple[Tuple[int, ...], ...], List[str]] = {}
+        for char in sorted(set("".join("".join(chars) for chars in slot_chars))):
+            if not char.isalnum():
+                continue
+            slots = tuple(
+                tuple(i for i, chars in enumerate(plan_chars) if char in chars)
+                for plan_chars in slot_chars
+            )
+            groups.setdefault(slots, []).append(char)
+        self.classes = tuple(sorted("".join(chars) for chars in groups.values()))
+
+    def _probability(self, classes: Sequence[str]) -> float:
+        matcher = QueryMatcher.from_classes(classes)
+        return sum(
+            weight * matcher.count(plan) / plan.total for plan, weight in self.formats
+        )
+
+    def _iter_sequences(
+        self, length: int, classes: Sequence[str]
+    ) -> Iterator[Tuple[float, Tuple[str, ...]]]:
+        """Последовательности классов по убыванию точной вероятности."""
+        if not classes or not self.formats:
+            return
+        any_char = "".join(classes)
+        heap: List[Tuple[float, Tuple[str, ...]]] = [(-1.0, ())]
+        while heap:
+            neg_probability, prefix = heapq.heappop(heap)
+            if len(prefix) == length:
+                yield -neg_probability, prefix
+                continue
+            for cls in classes:
+                child = prefix + (cls,)
+                # Представитель класса вместо всего класса: счёт тот же
+                relaxed = [c[0] for c in child] + [any_char] * (length - len(child))
+                probability = self._probability(relaxed)
+                if probability > 0:
+                    heapq.heappush(heap, (-probability, child))
+
+    def top(
+        self, length: int, limit: int, digits_only: bool = False
+    ) -> List[Combination]:
+        """
+        Возвращает limit самых вероятных комбинаций длины length.
+
+        Порядок равновероятных комбинаций детерминирован.
+
+        Args:
+            length: Длина комбинации.
+            limit: Сколько комбинаций вернуть.
+            digits_only: Искать только среди цифровых комбинаций ("счастливые числа").
+        """
+        if length <= 0 or limit <= 0:
+            return []
+
+        classes = self.classes
+        if digits_only:
+            classes = tuple(
+                "".join(c for c in cls if c.isdigit())
+                for cls in classes
+                if any(c.isdigit() for c in cls)
+            )
+
+        result: List[Combination] = []
+        for probability, sequence in self._iter_sequences(length, classes):
+            for chars in islice(product(*sequence), limit - len(result)):
+                result.append(Combination("".join(chars), probability * 100))
+            if len(result) >= limit:
+                break
+        return result
+
+
+class CombinationTable:
+    """
+    Предрасчитанные лучшие комбинации для всех стран набора данных.
+
+    Для каждой страны хранит PRECOMPUTED_LIMIT лучших комбинаций
+    и "счастливых чисел" (только цифры) каждой длины из PRECOMPUTED_LENGTHS.
+    Запросы вне таблицы считаются на лету тем же CombinationFinder.
+    """
+
+    def __init__(
+        self, formats: Dict[str, Sequence[Tuple[PlatePlan, float]]]
+    ) -> None:
+        self._finders = {
+            code: CombinationFinder(country_formats)
+            for code, country_formats in formats.items()
+        }
+        self._table: Dict[Tuple[str, int, bool], List[Combination]] = {}
+        for code, finder in self._finders.items():
+            for length in PRECOMPUTED_LENGTHS:
+                for digits_only in (False, True):
+                    self._table[(code, length, digits_only)] = finder.top(
+                        length, PRECOMPUTED_LIMIT, digits_only
+                    )
+
+    def __contains__(self, country_code: str) -> bool:
+        return country_code in self._finders
+
+    def top(
+        self, country_code: str, length: int, limit: int, digits_only: bool = False
+    ) -> List[Combination]:
+        """Лучшие комбинации страны: из таблицы или расчётом на лету."""
+        cached = self._table.get((country_code, length, digits_only))
+        # Список короче PRECOMPUTED_LIMIT исчерпывает все комбинации длины
+        if cached is not None and (
+            limit <= len(cached) or len(cached) < PRECOMPUTED_LIMIT
+        ):
+            return cached[:limit]
+        return self._finders[country_code].top(length, limit, digits_only)
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional
+
+from app.core.profiling import current_profile
+
+logger = logging.getLogger(__name__)
+
+ServiceFactory = Callable[[], Any]
+
+# Сервис, собранный в процессе-воркере пула (см. _init_worker)
+_worker_service: Any = None
+
+# Признак конца генератора при пошаговом выполнении в пуле
+_EXHAUSTED = object()
+
+
+class ComputeOverloadedError(Exception):
+    """Очередь вычислений переполнена, запрос не принят."""
+
+
+class ComputeTimeoutError(Exception):
+    """Вычисление не уложилось в отведённое время."""
+
+
+def _init_worker(factory: ServiceFactory) -> None:
+    """Собирает сервис один раз при старте процесса-воркера."""
+    global _worker_service
+    _worker_service = factory()
+
+
+def _call_worker_service(method: str, args: tuple, kwargs: dict) -> Any:
+    """Вызывает метод сервиса внутри процесса-воркера."""
+    return getattr(_worker_service, method)(*args, **kwargs)
+
+
+def _collect_worker_service(method: str, args: tuple, kwargs: dict) -> List[Any]:
+    """Выполняет генератор сервиса внутри процесса-воркера до конца."""
+    return list(getattr(_worker_service, method)(*args, **kwargs))
+
+
+async def _iterate(items: Iterable[Any]) -> AsyncIterator[Any]:
+    """Асинхронный итератор по готовым (или вычисляемым в event loop) элементам."""
+    for item in items:
+        yield item
+
+
+class ComputeExecutor:
+    """
+    Исполнитель CPU-нагруженных вызовов сервиса вне event loop.
+
+    Режимы:
+    - "inline": вызов прямо в обработчике (как раньше);
+    - "thread": ограниченный пул потоков;
+    - "process": пул процессов, в каждом из которых сервис собирается
+      фабрикой один раз (данные и кэш у каждого процесса свои).
+
+    Число одновременно принятых вызовов (выполняющихся и ожидающих)
+    ограничено max_pending, каждый вызов — таймаутом. Вызов, не уложившийся
+    в таймаут, занимает место, пока пул его не досчитает.
+
+    Attributes:
+        mode (str): Режим исполнения.
+        max_workers (int): Размер пула.
+        max_pending (int): Максимум принятых вызовов (0 — без ограничения).
+        timeout (float): Таймаут вызова в секундах (0 — без ограничения).
+    """
+
+    MODE_INLINE = "inline"
+    MODE_THREAD = "thread"
+    MODE_PROCESS = "process"
+    MODES = (MODE_INLINE, MODE_THREAD, MODE_PROCESS)
+
+    def __init__(
+        self,
+        mode: str = MODE_THREAD,
+        max_workers: int = 4,
+        max_pending: int = 64,
+        timeout: float = 10.0,
+        service_factory: Optional[ServiceFactory] = None,
+    ) -> None:
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown executor mode: {mode}")
+        if mode == self.MODE_PROCESS and service_factory is None:
+            raise ValueError("Process mode requires a picklable service_factory")
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.service_factory = service_factory
+
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def _get_pool(self) -> Executor:
+        """Лениво создаёт пул (в том числе после shutdown)."""
+        with self._lock:
+            if self._pool is None:
+                if self.mode == self.MODE_PROCESS:
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        initializer=_init_worker,
+                        initargs=(self.service_factory,),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="plate-compute",
+                    )
+            return self._pool
+
+    def _admit(self) -> None:
+        """Занимает место в очереди или отклоняет вызов при переполнении."""
+        with self._pending_lock:
+            if self.max_pending and self.pending >= self.max_pending:
+                self.rejected += 1
+                raise ComputeOverloadedError(
+                    f"Compute queue is full ({self.pending}/{self.max_pending})"
+                )
+            self.pending += 1
+
+    def _count(self, counter: str) -> None:
+        """Увеличивает счётчик вызовов (их меняют корутины и потоки пула)."""
+        with self._pending_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        """Освобождает место в очереди (годится как done-callback future)."""
+        with self._pending_lock:
+            self.pending -= 1
+
+    def _release_after(self, future: Optional[Future]) -> None:
+        """Освобождает место, когда вычисление future действительно завершится."""
+        if future is None or future.done():
+            self._release()
+        else:
+            future.add_done_callback(self._release)
+
+    def _thread_call(self, call: Callable[[], Any]) -> Callable[[], Any]:
+        """Оборачивает вызов в профилировщик запроса, если он профилируется."""
+        profile = current_profile.get()
+        return call if profile is None else partial(profile.run, call)
+
+    async def _wait(self, future: Future, method: str, timeout: float) -> Any:
+        """Ждёт future в event loop не дольше timeout секунд (0 — без лимита)."""
+        try:
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=timeout or None
+            )
+        except asyncio.TimeoutError:
+            self._count("timeouts")
+            logger.warning("Compute call %s timed out after %.2fs", method, timeout)
+            raise ComputeTimeoutError(
+                f"Computation exceeded {timeout:.2f}s timeout"
+            ) from None
+
+    async def _submit(self, call: Callable[[], Any], method: str) -> Any:
+        """
+        Выполняет call в пуле, занимая место в очереди до конца вычисления.
+
+        По таймауту ожидание прерывается, но поток или процесс пула
+        продолжает считать, поэтому место освобождается только по
+        завершении future: max_pending ограничивает реальную работу.
+        """
+        self._admit()
+        try:
+            future = self._get_pool().submit(call)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+
+        result = await self._wait(future, method, self.timeout)
+        self._count("completed")
+        return result
+
+    async def run(self, service: Any, method: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Выполняет service.<method>(*args, **kwargs) согласно режиму.
+
+        В режиме "process" вызывается метод сервиса, собранного в воркере,
+        а переданный service не используется.
+
+        Если запрос профилируется (см. ProfilingMiddleware), вызов в пуле
+        потоков выполняется под его профилировщиком; в режиме "inline"
+        вызов и так попадает в профиль потока event loop, в режиме
+        "process" расчёт в другом процессе не профилируется.
+
+        Raises:
+            ComputeOverloadedError: Если достигнут лимит max_pending.
+            ComputeTimeoutError: Если вызов не завершился за timeout секунд.
+        """
+        if self.mode == self.MODE_INLINE:
+            return getattr(service, method)(*args, **kwargs)
+
+        if self.mode == self.MODE_PROCESS:
+            call = partial(_call_worker_service, method, args, kwargs)
+        else:
+            call = self._thread_call(partial(getattr(service, method), *args, **kwargs))
+        return await self._submit(call, method)
+
+    async def stream(
+        self, service: Any, method: str, *args: Any, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        """
+        Выполняет генератор service.<method>(...) и отдаёт его элементы.
+
+        В режиме "thread" каждый следующий элемент вычисляется в пуле,
+        поток целиком занимает одно место в очереди, а timeout действует
+        на весь поток. Первый элемент вычисляется до возврата итератора,
+        поэтому перегрузка и таймаут основного расчёта превращаются
+        в 503/504 до начала ответа. В режиме "process" генератор
+        выполняется в воркере целиком, в режиме "inline" — в event loop.
+
+        Raises:
+            ComputeOverloadedError: Если достигнут лимит max_pending.
+            ComputeTimeoutError: Если поток не уложился в timeout секунд.
+        """
+        if self.mode == self.MODE_INLINE:
+            return _iterate(getattr(service, method)(*args, **kwargs))
+        if self.mode == self.MODE_PROCESS:
+            items = await self._submit(
+                partial(_collect_worker_service, method, args, kwargs), method
+            )
+            return _iterate(items)
+
+        items = iter(getattr(service, method)(*args, **kwargs))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout if self.timeout else None
+        last: Optional[Future] = None
+
+        async def step() -> Any:
+            nonlocal last
+            last = self._get_pool().submit(
+                self._thread_call(partial(next, items, _EXHAUSTED))
+            )
+            remaining = 0.0 if deadline is None else max(deadline - loop.time(), 1e-3)
+            return await self._wait(last, method, remaining)
+
+        self._admit()
+        try:
+            first = await step()
+        except BaseException:
+            self._release_after(last)
+            raise
+
+        async def iterate() -> AsyncIterator[Any]:
+            try:
+                item = first
+                while item is not _EXHAUSTED:
+                    yield item
+                    item = await step()
+                self._count("completed")
+            finally:
+                self._release_after(last)
+
+        return iterate()
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Останавливает пул; следующий вызов создаст новый."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Возвращает режим исполнителя и счётчики вызовов."""
+        with self._pending_lock:
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+            }
@@ -0,0 +1,226 @@
+from collections import Counter
+from typing import Dict, Iterator, List, Sequence, Set
+
+from app.core.plan import PlatePlan, char_mask
+from app.core.query import query_classes
+
+
+class QueryMatcher:
+    """
+    Скомпилированный запрос для подсчёта номеров, содержащих комбинацию.
+
+    Номер "содержит" запрос, если символы запроса встречаются в нём
+    по порядку (как подпоследовательность) — так же, как их размещает
+    перебор позиций шаблона. Подсчёт ведётся динамическим программированием
+    по слотам шаблона: состояние — длина жадно совпавшего префикса запроса,
+    поэтому каждый номер учитывается ровно один раз, а сложность равна
+    O(длина шаблона * длина запроса).
+
+    Позиция запроса может быть классом символов ("?", "#", "@", "[ABE]",
+    см. app.core.query): переход DP по слоту тогда взвешивается числом
+    символов слота, попадающих в класс, поэтому стоимость не зависит
+    от числа конкретных подстановок.
+
+    Attributes:
+        query (str): Исходная строка запроса.
+        positions (tuple): Битовая маска допустимых символов для каждой позиции.
+        char_counts (Counter): Сколько раз каждый символ встречается в запросе.
+    """
+
+    __slots__ = ("query", "positions", "char_counts")
+
+    def __init__(self, query: str) -> None:
+        classes = query_classes(query)
+        self.query = query
+        self.positions = tuple(char_mask(c) for c in classes)
+        self.char_counts = Counter(c for c in classes if len(c) == 1)
+
+    @classmethod
+    def from_classes(cls, classes: Sequence[str]) -> "QueryMatcher":
+        """
+        Собирает запрос, где каждая позиция — класс допустимых символов.
+
+        Номер содержит такой запрос, если хотя бы одна подстановка символов
+        из классов встречается в нём как подпоследовательность; поэтому
+        счёт по классам не меньше счёта для любой конкретной подстановки.
+        Верхняя оценка учитывает только позиции из одного символа.
+        """
+        # В отличие от __init__ классы заданы явно и синтаксис не разбирается
+        matcher = cls.__new__(cls)
+        matcher.query = "".join(c if len(c) == 1 else f"[{c}]" for c in classes)
+        matcher.positions = tuple(char_mask(c) for c in classes)
+        matcher.char_counts = Counter(c for c in classes if len(c) == 1)
+        return matcher
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def count(self, plan: PlatePlan) -> int:
+        """
+        Считает точное число номеров шаблона, содержащих запрос.
+
+        Args:
+            plan: Скомпилированный шаблон страны.
+
+        Returns:
+            int: Количество номеров, в которых встречается запрос.
+        """
+        m = len(self.positions)
+        if m == 0:
+            return plan.total
+
+        masks = plan.masks
+        counts = plan.option_counts
+        suffix = plan.suffix_products
+
+        # ways[j] — число префиксов номера, в которых жадно совпало j символов
+        ways = [1] + [0] * (m - 1)
+        matched = 0
+
+        for i, mask in enumerate(masks):
+            size = counts[i]
+            nxt = [0] * m
+            for j in range(min(i + 1, m)):
+                w = ways[j]
+                if not w:
+                    continue
+                hit = (mask & self.positions[j]).bit_count()
+                nxt[j] += w * (size - hit)
+                if j + 1 < m:
+                    nxt[j + 1] += w * hit
+                else:
+                    # Запрос найден: оставшиеся слоты заполняются свободно
+                    matched += w * hit * suffix[i + 1]
+            ways = nxt
+
+        return matched
+
+    def matches(self, plan: PlatePlan) -> bool:
+        """
+        Проверяет, есть ли в шаблоне хотя бы один номер с запросом.
+
+        Каждый слот допускает хотя бы один символ, поэтому count(plan) > 0
+        ровно тогда, когда запрос жадно вкладывается в слоты слева направо:
+        O(длина шаблона) без подсчёта номеров.
+        """
+        m = len(self.positions)
+        if m == 0:
+            return plan.total > 0
+        k = 0
+        for mask in plan.masks:
+            if mask & self.positions[k]:
+                k += 1
+                if k == m:
+                    return True
+        return False
+
+    def upper_bound(self, plan: PlatePlan) -> float:
+        """
+        Дешёвая верхняя оценка доли номеров, содержащих запрос.
+
+        Номер может содержать запрос, только если каждый символ встречается
+        в нём не реже, чем в запросе. Для символа это вероятность того, что
+        биномиальное число буквенных (или цифровых) слотов с ним покроет
+        недостачу после литералов шаблона. Оценка — минимум по символам,
+        считается за O(число различных символов) по предрасчётам плана.
+
+        Returns:
+            float: Значение из [0, 1], не меньше точной доли count / total.
+        """
+        if len(self.positions) > len(plan):
+            return 0.0
+
+        bound = 1.0
+        for char, need in self.char_counts.items():
+            need -= plan.literals.count(char)
+            if need <= 0:
+                continue
+            if char.isdigit():
+                tail = plan.digit_tail
+            elif char in plan.letters:
+                tail = plan.letter_tail
+            else:
+                return 0.0
+            if need >= len(tail):
+                return 0.0
+            bound = min(bound, tail[need])
+        return bound
+
+    def _bounds(self, masks: tuple) -> tuple[List[int], List[int]]:
+        """
+        Находит самое левое и самое правое вложение запроса в слоты.
+
+        Returns:
+            Пара списков (left, right): left[k] — минимальный слот для символа k,
+            right[k] — максимальный. Пустые списки, если вложения нет.
+        """
+        m = len(self.positions)
+        n = len(masks)
+
+        left: List[int] = []
+        i = 0
+        for k in range(m):
+            while i < n and not (masks[i] & self.positions[k]):
+                i += 1
+            if i == n:
+                return [], []
+            left.append(i)
+            i += 1
+
+        right = [0] * m
+        i = n - 1
+        for k in range(m - 1, -1, -1):
+            while not (masks[i] & self.positions[k]):
+                i -= 1
+            right[k] = i
+            i -= 1
+
+        return left, right
+
+    def placement_map(self, plan: PlatePlan) -> Dict[int, Set[int]] | None:
+        """
+        Для каждого слота возвращает индексы запроса, которые могут в нём стоять.
+
+        Слот i может принять символ k, если символ допустим в слоте, префикс
+        запроса помещается левее i, а суффикс — правее.
+
+        Returns:
+            Словарь {индекс слота: множество индексов запроса} или None,
+            если запрос не помещается в шаблон.
+        """
+        masks = plan.masks
+        left, right = self._bounds(masks)
+        if len(left) != len(self.positions):
+            return None
+
+        result: Dict[int, Set[int]] = {i: set() for i in range(len(masks))}
+        for k, allowed in enumerate(self.positions):
+            for i in range(left[k], right[k] + 1):
+                if masks[i] & allowed:
+                    result[i].add(k)
+        return result
+
+    def iter_placements(self, plan: PlatePlan) -> Iterator[List[int]]:
+        """
+        Лениво перечисляет размещения запроса в порядке перебора слева направо.
+
+        Ветви, из которых запрос уже не помещается, отсекаются, поэтому
+        каждое следующее размещение находится за полиномиальное время.
+        """
+        masks = plan.masks
+        left, right = self._bounds(masks)
+        m = len(self.positions)
+        if len(left) != m:
+            return
+
+        def backtrack(k: int, start: int, current: List[int]) -> Iterator[List[int]]:
+            if k == m:
+                yield current.copy()
+                return
+            for i in range(start, right[k] + 1):
+                if masks[i] & self.positions[k]:
+                    current.append(i)
+                    yield from backtrack(k + 1, i + 1, current)
+                    current.pop()
+
+        yield from backtrack(0, left[0] if m else 0, [])
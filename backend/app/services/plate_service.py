@@ -1,15 +1,62 @@
+import heapq
 import logging
-import math
+import threading
 import urllib.parse
-from typing import List
-
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.geo import haversine
+from app.core.metrics import metrics, stage
+from app.core.query import is_literal
+from app.core.packed import PackedPlans
+from app.core.plan import PlatePlan
 from app.core.repository import CountryRepository
-from app.schemas.plate import PlateCalculationResult
+from app.core.snapshot import DatasetSnapshot
+from app.schemas.combination import CombinationItem, CombinationsResponse
+from app.schemas.country import CountrySchema
+from app.schemas.plate import CompactPlateExample, ExamplesMode, PlateCalculationResult
 from app.schemas.trip import TripSegment
+from app.services.cache import ResultCache
 from app.services.calculator import PlateCalculator
+from app.services.combinations import CombinationTable
+from app.services.matcher import QueryMatcher
+from app.services.route import optimize_path
+from app.services.singleflight import SingleFlight
+from app.services.suggestions import LookalikeSearch
+from app.services.vectorized import count_matches_many
 
 logger = logging.getLogger(__name__)
 
+# Число стран в маршруте по умолчанию
+DEFAULT_ROUTE_STOPS = 5
+# Сколько вариантов с похожими символами предлагать
+SUGGESTIONS_COUNT = 5
+# Запас на погрешность float при сравнении верхней оценки с точной вероятностью
+_BOUND_EPSILON = 1e-9
+
+# Полное ранжирование запроса: (вероятность, локализованное название,
+# индекс страны, шаблон для примеров, число номеров) по убыванию вероятности
+Ranking = List[Tuple[float, str, int, PlatePlan, int]]
+
+
+@dataclass(frozen=True)
+class PlateSearch:
+    """
+    Ответ PlateService.search_plate для одной комбинации.
+
+    Attributes:
+        results (List[PlateCalculationResult]): Результаты по странам
+            (как у check_plate).
+        total (int): Сколько стран проходит порог вероятности без учёта
+            лимита (не меньше len(results)).
+        suggestions (List[str]): Варианты с заменой похожих символов
+            (как у get_suggestions).
+    """
+
+    results: List[PlateCalculationResult]
+    total: int
+    suggestions: List[str] = field(default_factory=list)
+
 
 class PlateService:
     """
@@ -19,99 +66,749 @@ class PlateService:
     - перебор стран
     - фильтрацию невозможных вариантов
     - сортировку результатов
+    - кэширование ранжирования по (запрос, язык, версия данных) и готовых
+      результатов по (запрос, язык, формат примеров, версия данных)
+    - объединение одинаковых одновременных расчётов (single-flight)
+
+    Совпадения по умолчанию считаются векторизованным движком сразу для всех
+    стран; при engine="scalar" или без NumPy — калькулятором по одной стране.
     """
 
+    ENGINE_VECTORIZED = "vectorized"
+    ENGINE_SCALAR = "scalar"
+
     def __init__(
         self,
         repository: CountryRepository,
         calculator: PlateCalculator,
+        cache: Optional[ResultCache] = None,
+        engine: str = ENGINE_VECTORIZED,
     ) -> None:
         self.repository = repository
         self.calculator = calculator
+        self.cache = cache
+        self.engine = engine
+        # Одинаковые запросы, пришедшие во время расчёта, ждут его результата
+        self.inflight = SingleFlight()
+        self._cache_version: Optional[int] = None
+        self._combinations: Optional[Tuple[int, CombinationTable]] = None
+        self._combinations_lock = threading.Lock()
+        # Таблица комбинаций предрасчитывается при каждой загрузке данных
+        repository.subscribe(self._combination_table)
+
+    def _snapshot(self) -> DatasetSnapshot:
+        """
+        Берёт текущий снимок данных и сбрасывает кэш, если сменилась версия.
 
-    def check_plate(self, query: str, lang: str = "ru") -> List[PlateCalculationResult]:
+        Весь вызов работает с одним снимком: перезагрузка данных посреди
+        расчёта не смешивает страны, индекс и упаковку разных версий.
+        """
+        snapshot = self.repository.get_snapshot()
+        if snapshot.version != self._cache_version:
+            if self.cache is not None:
+                self.cache.clear()
+            self._cache_version = snapshot.version
+        return snapshot
+
+    def check_plate(
+        self,
+        query: str,
+        lang: str = "ru",
+        limit: Optional[int] = None,
+        min_probability: Optional[float] = None,
+        examples: ExamplesMode = PlateCalculator.EXAMPLES_FULL,
+    ) -> List[PlateCalculationResult]:
         """
         Проверяет комбинацию по всем поддерживаемым странам.
 
         Args:
             query (str): Поисковая комбинация пользователя.
             lang (str): Язык ответа ('ru' или 'en').
+            limit (Optional[int]): Сколько лучших стран вернуть (None — все).
+            min_probability (Optional[float]): Минимальная вероятность страны
+                в процентах (None — любая больше 0).
+            examples (ExamplesMode): Формат примеров номеров: "full",
+                "compact" или "none" (без генерации).
 
         Returns:
             List[PlateCalculationResult]: Отсортированный список результатов,
             где вероятность больше 0.
         """
+        return self.check_plates([query], lang, limit, min_probability, examples)[0]
+
+    def search_plate(
+        self,
+        query: str,
+        lang: str = "ru",
+        limit: Optional[int] = None,
+        min_probability: Optional[float] = None,
+        examples: ExamplesMode = PlateCalculator.EXAMPLES_FULL,
+    ) -> PlateSearch:
+        """
+        Проверяет комбинацию и подбирает варианты с похожими символами.
+
+        Результаты и варианты считаются одним вызовом на одном снимке
+        данных, поэтому /check занимает один слот исполнителя и не может
+        получить результаты и варианты от разных версий данных.
+
+        Args:
+            query (str): Поисковая комбинация пользователя.
+            lang (str): Язык ответа ('ru' или 'en').
+            limit (Optional[int]): Сколько лучших стран вернуть (None — все).
+            min_probability (Optional[float]): Минимальная вероятность страны
+                в процентах (None — любая больше 0).
+            examples (ExamplesMode): Формат примеров номеров.
+
+        Returns:
+            PlateSearch: Результаты check_plate, число стран без учёта
+            лимита и варианты get_suggestions.
+        """
+        snapshot = self._snapshot()
+        search = self._search_snapshot(
+            snapshot, [query], lang, limit, min_probability, examples
+        )[0]
+        return PlateSearch(
+            search.results, search.total, self._suggestions(snapshot, query)
+        )
+
+    def check_plates(
+        self,
+        queries: List[str],
+        lang: str = "ru",
+        limit: Optional[int] = None,
+        min_probability: Optional[float] = None,
+        examples: ExamplesMode = PlateCalculator.EXAMPLES_FULL,
+    ) -> List[List[PlateCalculationResult]]:
+        """
+        Проверяет пакет комбинаций за один проход по общим данным стран.
+
+        Повторяющиеся запросы считаются один раз, закэшированные берутся
+        из кэша, остальные оцениваются вместе (векторизованно, если доступно).
+        Одновременные вызовы, считающие тот же запрос на той же версии
+        данных, ждут один общий расчёт независимо от лимита, порога
+        и формата примеров.
+
+        Args:
+            queries (List[str]): Поисковые комбинации.
+            lang (str): Язык ответа ('ru' или 'en').
+            limit (Optional[int]): Сколько лучших стран вернуть на запрос
+                (None — все).
+            min_probability (Optional[float]): Минимальная вероятность страны
+                в процентах (None — любая больше 0).
+            examples (ExamplesMode): Формат примеров номеров.
+
+        Returns:
+            List[List[PlateCalculationResult]]: Результаты в порядке запросов.
+        """
+        searches = self.search_plates(
+            queries, lang, limit, min_probability, examples
+        )
+        return [search.results for search in searches]
+
+    def search_plates(
+        self,
+        queries: List[str],
+        lang: str = "ru",
+        limit: Optional[int] = None,
+        min_probability: Optional[float] = None,
+        examples: ExamplesMode = PlateCalculator.EXAMPLES_FULL,
+    ) -> List[PlateSearch]:
+        """
+        check_plates вместе с числом подходящих стран без учёта лимита.
+
+        Returns:
+            List[PlateSearch]: Результаты в порядке запросов (без вариантов
+            с похожими символами).
+        """
+        return self._search_snapshot(
+            self._snapshot(), queries, lang, limit, min_probability, examples
+        )
+
+    def _search_snapshot(
+        self,
+        snapshot: DatasetSnapshot,
+        queries: List[str],
+        lang: str = "ru",
+        limit: Optional[int] = None,
+        min_probability: Optional[float] = None,
+        examples: ExamplesMode = PlateCalculator.EXAMPLES_FULL,
+    ) -> List[PlateSearch]:
+        """
+        search_plates на заданном снимке данных.
+
+        Лимит, порог вероятности и формат примеров применяются к полному
+        ранжированию запроса (см. _rankings), общему для всех вариантов
+        вызова: /check, /route и пакетные запросы используют один расчёт.
+        Без закэшированного ранжирования лимитированный вызов скалярного
+        движка точно оценивает только страны, способные попасть в выдачу
+        (см. _rank_top).
+        """
+        version = snapshot.version
+
+        normalized = [q.strip().upper() for q in queries]
+        resolved: Dict[str, List[PlateCalculationResult]] = {}
+        totals: Dict[str, int] = {}
+        missing: List[str] = []
+
+        for query in dict.fromkeys(normalized):
+            cached = (
+                self.cache.get((query, lang, examples, version))
+                if self.cache is not None
+                else None
+            )
+            if cached is not None:
+                if min_probability is not None:
+                    cached = [r for r in cached if r.probability >= min_probability]
+                resolved[query] = cached
+                totals[query] = len(cached)
+            else:
+                missing.append(query)
+
+        if missing:
+            # В кэш попадают только полные списки, пригодные для любых фильтров
+            complete = limit is None and min_probability is None
+            rankings = self._rankings(snapshot, missing, lang, limit, min_probability)
+            for query in missing:
+                ranking, total = rankings[query]
+                ranked = self._iter_results(
+                    query, snapshot, ranking, limit, min_probability, examples
+                )
+                results = list(ranked)
+                if complete and self.cache is not None:
+                    self.cache.set((query, lang, examples, version), results)
+                resolved[query] = results
+                totals[query] = total
+
+        # Копия списка защищает кэш от изменений на стороне вызывающего
+        return [
+            PlateSearch(resolved[query][:limit], totals[query]) for query in normalized
+        ]
+
+    @staticmethod
+    def _matched(ranking: Ranking, min_probability: Optional[float]) -> int:
+        """Сколько стран ранжирования проходит порог min_probability."""
+        if min_probability is None:
+            return len(ranking)
+        matched = 0
+        for probability, *_ in ranking:
+            if probability < min_probability:
+                break
+            matched += 1
+        return matched
+
+    def _rankings(
+        self,
+        snapshot: DatasetSnapshot,
+        queries: List[str],
+        lang: str,
+        limit: Optional[int] = None,
+        min_probability: Optional[float] = None,
+    ) -> Dict[str, Tuple[Ranking, int]]:
+        """
+        Возвращает ранжирования запросов, считая только незакэшированные.
+
+        Ключ кэша не зависит от лимита и формата примеров, поэтому ранжирование,
+        посчитанное для /check, переиспользуется маршрутом и наоборот.
+        Одновременные расчёты одного запроса на той же версии данных
+        объединяются по ключу (запрос, язык, версия).
+
+        Если задан limit, а движок скалярный, незакэшированный запрос
+        ранжируется частично (_rank_top): такое ранжирование верно только
+        для limit лучших стран и не кэшируется.
+
+        Returns:
+            Для каждого запроса — ранжирование и число стран, проходящих
+            порог min_probability (без учёта лимита).
+        """
+        version = snapshot.version
+        rankings: Dict[str, Tuple[Ranking, int]] = {}
+        missing: List[str] = []
+        for query in queries:
+            cached = (
+                self.cache.get(("ranking", query, lang, version))
+                if self.cache is not None
+                else None
+            )
+            if cached is not None:
+                rankings[query] = (cached, self._matched(cached, min_probability))
+            elif limit is not None and self._packed(snapshot) is None:
+                rankings[query] = self._rank_top(
+                    query, snapshot, lang, limit, min_probability
+                )
+            else:
+                missing.append(query)
+
+        if missing:
+            # Одновременные расчёты объединяются по отдельным запросам:
+            # пакет считает вместе только запросы, которые никто не считает
+            def compute(keys: List[Tuple[str, str, int]]) -> Dict:
+                computed = self._compute(snapshot, [key[0] for key in keys], lang)
+                return {key: computed[key[0]] for key in keys}
+
+            keys = [(query, lang, version) for query in missing]
+            shared = self.inflight.do_many(keys, compute)
+            for key in keys:
+                ranking = shared[key]
+                rankings[key[0]] = (ranking, self._matched(ranking, min_probability))
+        return rankings
+
+    def _compute(
+        self, snapshot: DatasetSnapshot, queries: List[str], lang: str
+    ) -> Dict[str, Ranking]:
+        """Считает и ранжирует незакэшированные запросы, сохраняя ранжирования."""
+        computed: Dict[str, Ranking] = {}
+        scored = self._count_many(queries, snapshot)
+        for query, counts in zip(queries, scored):
+            ranking = self._ranking(lang, snapshot, counts)
+            logger.debug(
+                "Calculated %d valid results for query '%s'", len(ranking), query
+            )
+            if self.cache is not None:
+                self.cache.set(("ranking", query, lang, snapshot.version), ranking)
+            computed[query] = ranking
+        return computed
+
+    def iter_plate(
+        self,
+        query: str,
+        lang: str = "ru",
+        examples: ExamplesMode = PlateCalculator.EXAMPLES_FULL,
+    ) -> Iterator[PlateCalculationResult]:
+        """
+        Лениво выдаёт результаты check_plate по мере их построения.
+
+        Порядок тот же, что у check_plate. После полного прохода список
+        результатов сохраняется в кэш.
+
+        Args:
+            query (str): Поисковая комбинация пользователя.
+            lang (str): Язык ответа ('ru' или 'en').
+            examples (ExamplesMode): Формат примеров номеров.
+        """
+        snapshot = self._snapshot()
+        query = query.strip().upper()
+        key = (query, lang, examples, snapshot.version)
+
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            yield from cached
+            return
+
+        ranking, _ = self._rankings(snapshot, [query], lang)[query]
+
         results: List[PlateCalculationResult] = []
+        for result in self._iter_results(query, snapshot, ranking, examples=examples):
+            results.append(result)
+            yield result
 
-        for country in self.repository.get_all():
-            result = self.calculator.calculate_probability(query, country)
-            if result is not None and result.probability > 0:
-                # Локализация названия страны, если требуется
-                if lang == "en" and country.country_name_en:
-                    result.country_name = country.country_name_en
-                results.append(result)
-
-        # Сортировка по вероятности (убывание), затем по названию
-        results.sort(key=lambda r: (-r.probability, r.country_name))
-
-        logger.debug(
-            "Calculated %d valid results for query '%s'",
-            len(results),
-            query,
+        if self.cache is not None:
+            self.cache.set(key, results)
+
+    def _packed(self, snapshot: DatasetSnapshot) -> Optional[PackedPlans]:
+        """Возвращает упаковку снимка, если выбран векторизованный движок."""
+        return snapshot.packed if self.engine == self.ENGINE_VECTORIZED else None
+
+    def _count_many(
+        self, queries: List[str], snapshot: DatasetSnapshot
+    ) -> List[Dict[int, int]]:
+        """
+        Считает выигрышные номера по уникальным шаблонам для каждого запроса.
+
+        Шаблоны, где запрос заведомо не встречается, отсеиваются индексом
+        сигнатур (CapabilityIndex) и не оцениваются вовсе. Шаблон, общий
+        для нескольких стран или форматов, считается один раз.
+
+        Returns:
+            Для каждого запроса — словарь {индекс в snapshot.scoring_plans:
+            число номеров} только для шаблонов с совпадениями.
+        """
+        packed = self._packed(snapshot)
+        index = snapshot.index
+        with stage("prefilter"):
+            candidates = [index.candidates(query) for query in queries]
+
+        with stage("counting"):
+            if packed is not None:
+                union = sorted(set().union(*candidates))
+                if not union:
+                    scored: List[Dict[int, int]] = [{} for _ in queries]
+                else:
+                    subset = packed if len(union) == len(packed) else packed.take(union)
+                    scored = [
+                        {union[pos]: count for pos, count in enumerate(row) if count}
+                        for row in count_matches_many(queries, subset)
+                    ]
+                evaluated = len(union) * len(queries)
+            else:
+                scored = []
+                evaluated = 0
+                for query, indices in zip(queries, candidates):
+                    counts, visited = self._count_pruned(query, snapshot, indices)
+                    scored.append(counts)
+                    evaluated += visited
+
+        metrics.patterns_scored.inc(evaluated)
+        metrics.patterns_skipped.inc(
+            len(snapshot.scoring_plans) * len(queries) - evaluated
         )
+        return scored
 
-        return results
+    def _count_pruned(
+        self, query: str, snapshot: DatasetSnapshot, indices: List[int]
+    ) -> Tuple[Dict[int, int], int]:
+        """
+        Точно считает совпадения шаблонов, прошедших индекс (indices).
+
+        Шаблоны с нулевой дешёвой верхней оценкой (QueryMatcher.upper_bound)
+        пропускаются без подсчёта. Лимит выдачи здесь не учитывается:
+        полное ранжирование кэшируется и обслуживает любые лимиты
+        (лимитированный промах кэша считает _rank_top).
+
+        Returns:
+            Словарь {индекс шаблона: число номеров} и число точно
+            оценённых шаблонов.
+        """
+        matcher = QueryMatcher(query)
+        plans = snapshot.scoring_plans
+        counts: Dict[int, int] = {}
+        evaluated = 0
+        for plan_id in indices:
+            if matcher.upper_bound(plans[plan_id]) <= 0:
+                continue
+            evaluated += 1
+            count = matcher.count(plans[plan_id])
+            if count:
+                counts[plan_id] = count
+        return counts, evaluated
+
+    def _rank_top(
+        self,
+        query: str,
+        snapshot: DatasetSnapshot,
+        lang: str,
+        limit: int,
+        min_probability: Optional[float] = None,
+    ) -> Tuple[Ranking, int]:
+        """
+        Ранжирует только страны, способные попасть в limit лучших.
+
+        Оценка страны — сумма верхних оценок её форматов (QueryMatcher.upper_bound)
+        с их долями. Страны перебираются по убыванию оценки, оценка ниже
+        min_probability отсекает страну без подсчёта. Без порога перебор
+        прекращается, как только оценка опускается ниже худшей из limit
+        лучших точных вероятностей (min-куча): оставшиеся страны для числа
+        совпадений лишь проверяются на вхождение запроса (QueryMatcher.matches),
+        без подсчёта номеров. С порогом каждую страну с оценкой не ниже него
+        приходится считать точно, иначе число совпадений неизвестно.
+
+        Returns:
+            Ранжирование оценённых стран (верно для limit лучших) и число
+            стран, проходящих порог, без учёта лимита.
+        """
+        matcher = QueryMatcher(query)
+        plans = snapshot.scoring_plans
+        floor = min_probability or 0.0
+
+        with stage("prefilter"):
+            bounds = {}
+            for plan_id in snapshot.index.candidates(query):
+                bound = matcher.upper_bound(plans[plan_id])
+                if bound > 0:
+                    bounds[plan_id] = bound
+
+        countries = dict.fromkeys(
+            idx for plan_id in bounds for idx in snapshot.plan_countries[plan_id]
+        )
+        ordered = []
+        for idx in countries:
+            bound = 100 * sum(
+                weight * bounds.get(plan_id, 0.0)
+                for plan_id, weight in snapshot.formats[idx]
+            )
+            if bound > 0 and bound + _BOUND_EPSILON >= floor:
+                ordered.append((-bound, idx))
+        ordered.sort()
+
+        counts: Dict[int, int] = {}
+        ranked = []
+        top: List[float] = []
+        rest: List[Tuple[float, int]] = []
+        with stage("counting"):
+            for pos, (neg_bound, idx) in enumerate(ordered):
+                full = not floor and len(top) >= limit
+                if full and -neg_bound + _BOUND_EPSILON < top[0]:
+                    rest = ordered[pos:]
+                    break
+
+                for plan_id, _ in snapshot.formats[idx]:
+                    if plan_id in bounds and plan_id not in counts:
+                        counts[plan_id] = matcher.count(plans[plan_id])
+                probability, plan, count = self._mix(snapshot, idx, counts)
+                if probability <= 0 or probability < floor:
+                    continue
+
+                name = self._country_name(snapshot.countries[idx], lang)
+                ranked.append((-probability, name, idx, plan, count))
+                if len(top) < limit:
+                    heapq.heappush(top, probability)
+                elif probability > top[0]:
+                    heapq.heapreplace(top, probability)
+
+            # Остальным странам для числа совпадений достаточно знать, входит ли
+            # запрос в их форматы: вероятность больше нуля при любом счёте > 0
+            hits: Dict[int, int] = {}
+            total = len(ranked)
+            for _, idx in rest:
+                for plan_id, _ in snapshot.formats[idx]:
+                    if plan_id in bounds and plan_id not in hits:
+                        hits[plan_id] = counts.get(plan_id) or int(
+                            matcher.matches(plans[plan_id])
+                        )
+                if self._mix(snapshot, idx, hits)[0] > 0:
+                    total += 1
+
+        metrics.patterns_scored.inc(len(counts))
+        metrics.patterns_skipped.inc(len(plans) - len(counts))
+        return self._sorted(ranked), total
+
+    def _mix(
+        self, snapshot: DatasetSnapshot, idx: int, counts: Dict[int, int]
+    ) -> Tuple[float, PlatePlan, int]:
+        """Вероятность страны idx по счётам её форматов (см. calculator.mixture)."""
+        plans = snapshot.scoring_plans
+        return self.calculator.mixture(
+            [
+                (weight, counts.get(plan_id, 0), plans[plan_id])
+                for plan_id, weight in snapshot.formats[idx]
+            ]
+        )
+
+    def _ranking(
+        self, lang: str, snapshot: DatasetSnapshot, counts: Dict[int, int]
+    ) -> Ranking:
+        """
+        Сортирует страны с совпадениями по вероятности, затем по названию.
+
+        Вероятность страны собирается из счётов уникальных шаблонов её
+        форматов. Полные результаты (символы, примеры) по ранжированию
+        строит _iter_results.
+        """
+        countries = snapshot.countries
+        ranked = []
+        seen = set()
+        for plan_id in counts:
+            for idx in snapshot.plan_countries[plan_id]:
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                probability, plan, count = self._mix(snapshot, idx, counts)
+                if probability > 0:
+                    name = self._country_name(countries[idx], lang)
+                    ranked.append((-probability, name, idx, plan, count))
+
+        return self._sorted(ranked)
+
+    @staticmethod
+    def _sorted(ranked: List[Tuple[float, str, int, PlatePlan, int]]) -> Ranking:
+        """Сортирует записи (-вероятность, название, индекс, ...) в Ranking."""
+        with stage("sorting"):
+            ranked.sort(key=lambda item: item[:3])
+        return [
+            (-neg_probability, name, idx, plan, count)
+            for neg_probability, name, idx, plan, count in ranked
+        ]
+
+    def _iter_results(
+        self,
+        query: str,
+        snapshot: DatasetSnapshot,
+        ranking: Ranking,
+        limit: Optional[int] = None,
+        min_probability: Optional[float] = None,
+        examples: ExamplesMode = PlateCalculator.EXAMPLES_FULL,
+    ) -> Iterator[PlateCalculationResult]:
+        """
+        Лениво строит результаты для лучших стран ранжирования.
+
+        Ранжирование отсортировано по убыванию вероятности, поэтому лимит
+        и порог min_probability просто обрывают перебор.
+        """
+        for probability, name, idx, plan, count in ranking[:limit]:
+            if min_probability is not None and probability < min_probability:
+                break
+            result = self.calculator.build_result(
+                query, snapshot.countries[idx], plan, count, examples, probability
+            )
+            result.country_name = name
+            yield result
+
+    def get_examples(
+        self,
+        query: str,
+        country_code: str,
+        offset: int = 0,
+        count: int = PlateCalculator.EXAMPLES_COUNT,
+    ) -> Optional[List[CompactPlateExample]]:
+        """
+        Возвращает страницу примеров номеров страны, содержащих комбинацию.
+
+        Примеры детерминированы и берутся из того же формата номеров,
+        что и в ответе /check, поэтому страницы согласованы между вызовами
+        и с примерами в ответе /check.
+
+        Returns:
+            Список примеров (пустой, если комбинация в стране не встречается)
+            или None, если страны нет.
+        """
+        snapshot = self._snapshot()
+        idx = snapshot.positions.get(country_code.upper())
+        if idx is None:
+            return None
+
+        query = query.strip().upper()
+        matcher = QueryMatcher(query)
+        counts = {
+            plan_id: matcher.count(snapshot.scoring_plans[plan_id])
+            for plan_id, _ in snapshot.formats[idx]
+        }
+        _, plan, winning = self._mix(snapshot, idx, counts)
+        return self.calculator.examples_page(
+            query, snapshot.countries[idx], plan, winning, offset, count
+        )
+
+    def _combination_table(self, snapshot: DatasetSnapshot) -> CombinationTable:
+        """Возвращает таблицу комбинаций снимка, строя её один раз на версию."""
+        current = self._combinations
+        if current is not None and current[0] == snapshot.version:
+            return current[1]
+
+        with self._combinations_lock:
+            current = self._combinations
+            if current is not None and current[0] == snapshot.version:
+                return current[1]
+            table = CombinationTable(
+                {
+                    country.country_code: snapshot.country_formats(idx)
+                    for idx, country in enumerate(snapshot.countries)
+                }
+            )
+            if current is None or snapshot.version > current[0]:
+                self._combinations = (snapshot.version, table)
+            return table
+
+    def get_combinations(
+        self, country_code: str, length: int = 3, limit: int = 10
+    ) -> Optional[CombinationsResponse]:
+        """
+        Самые вероятные комбинации длины length для страны.
+
+        Короткие длины берутся из таблицы, предрасчитанной при загрузке
+        данных, остальные считаются на лету по скомпилированному шаблону.
+
+        Returns:
+            CombinationsResponse или None, если страны нет.
+        """
+        code = country_code.upper()
+        table = self._combination_table(self._snapshot())
+        if code not in table:
+            return None
+
+        def items(digits_only: bool) -> List[CombinationItem]:
+            return [
+                CombinationItem(combination=c.combination, probability=c.probability)
+                for c in table.top(code, length, limit, digits_only)
+            ]
+
+        return CombinationsResponse(
+            country_code=code,
+            length=length,
+            combinations=items(False),
+            lucky_numbers=items(True),
+        )
+
+    def _country_name(self, country: CountrySchema, lang: str) -> str:
+        """Локализует название страны, если требуется."""
+        if lang == "en" and country.country_name_en:
+            return country.country_name_en
+        return country.country_name
 
     def _calculate_distance(
         self, lat1: float, lon1: float, lat2: float, lon2: float
     ) -> float:
         """Вычисляет расстояние между двумя точками."""
-        R = 6371  # Радиус Земли в км
-        dlat = math.radians(lat2 - lat1)
-        dlon = math.radians(lon2 - lon1)
-        a = (
-            math.sin(dlat / 2) ** 2
-            + math.cos(math.radians(lat1))
-            * math.cos(math.radians(lat2))
-            * math.sin(dlon / 2) ** 2
-        )
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        return R * c
+        return haversine(lat1, lon1, lat2, lon2)
 
-    def get_suggestions(self, query: str) -> List[str]:
-        """Генерирует варианты замены букв на похожие цифры.
+    def _optimize_route(
+        self,
+        snapshot: DatasetSnapshot,
+        candidates: List[PlateCalculationResult],
+        user_lat: float,
+        user_lng: float,
+    ) -> List[PlateCalculationResult]:
+        """
+        Упорядочивает страны маршрута, начиная с точки пользователя.
 
-        Например: TOM -> T0M, BOSS -> B0SS, 80SS...
+        Расстояния берутся из матрицы снимка; без NumPy используется
+        ближайший сосед с прямым расчётом расстояний.
         """
-        replacements = {
-            "O": "0",
-            "I": "1",
-            "Z": "2",
-            "E": "3",
-            "S": "5",
-            "B": "8",
-        }
+        if snapshot.distances is None:
+            ordered = []
+            current_lat, current_lng = user_lat, user_lng
+            pool = candidates[:]
+            while pool:
+                nearest = min(
+                    pool,
+                    key=lambda x: haversine(current_lat, current_lng, x.lat, x.lng),
+                )
+                pool.remove(nearest)
+                ordered.append(nearest)
+                current_lat, current_lng = nearest.lat, nearest.lng
+            return ordered
+
+        indices = [snapshot.positions[r.country_code] for r in candidates]
+        with stage("routing"):
+            dist = snapshot.distances.submatrix(indices, origin=(user_lat, user_lng))
+            order = optimize_path(dist)
+        return [candidates[node - 1] for node in order]
+
+    def get_suggestions(self, query: str, limit: int = SUGGESTIONS_COUNT) -> List[str]:
+        """
+        Подбирает варианты запроса с заменой похожих символов (O/0, S/5, ...).
+
+        Варианты оцениваются вместе по общему снимку данных поиском
+        best-first с верхними оценками (см. LookalikeSearch), поэтому
+        длинные запросы не приводят к перебору всех 2^k замен.
 
-        results = set()
+        Например: TOM -> T0M, BOSS -> 8055, B055...
 
-        # Рекурсивно генерируем все варианты замен
-        def backtrack(index: int, current: str):
-            if index == len(query):
-                if current != query:
-                    results.add(current)
-                return
+        Returns:
+            List[str]: До limit вариантов по убыванию лучшей вероятности
+            (затем числа стран); только те, что лучше исходного запроса.
+        """
+        return self._suggestions(self._snapshot(), query, limit)
+
+    def _suggestions(
+        self, snapshot: DatasetSnapshot, query: str, limit: int = SUGGESTIONS_COUNT
+    ) -> List[str]:
+        """get_suggestions на заданном снимке данных."""
+        query = query.strip().upper()
+        key = ("suggestions", query, limit, snapshot.version)
 
-            char = query[index]
-            # Вариант без замены
-            backtrack(index + 1, current + char)
+        # Замены похожих символов осмысленны только для обычных запросов
+        if not is_literal(query):
+            return []
 
-            # Вариант с заменой
-            if char in replacements:
-                backtrack(index + 1, current + replacements[char])
+        cached = self.cache.get(key) if self.cache is not None else None
+        if cached is not None:
+            return list(cached)
 
-        backtrack(0, "")
-        # Возвращаем топ-5 вариантов, отсортированных по алфавиту
-        return sorted(list(results))[:5]
+        with stage("suggestions"):
+            search = LookalikeSearch(snapshot, self.calculator)
+            suggestions = [s.query for s in search.search(query, limit)]
+
+        if self.cache is not None:
+            self.cache.set(key, suggestions)
+        return list(suggestions)
 
     def create_luck_route(
         self,
@@ -119,35 +816,33 @@ class PlateService:
         lang: str = "ru",
         user_lat: float | None = None,
         user_lng: float | None = None,
+        max_stops: int = DEFAULT_ROUTE_STOPS,
     ) -> List[TripSegment]:
         """
         Строит маршрут по странам с высокой вероятностью встречи номера.
 
         Генерирует ссылки на внешний сервис покупки билетов (Google Flights).
         Если переданы координаты пользователя, маршрут оптимизируется по расстоянию.
-        """
-        # Получение базового расчета вероятностей
-        results = self.check_plate(query, lang)
 
-        # Выбор топ-5 стран-кандидатов
-        candidates = results[:5]
-        ordered_route = []
-
-        # Оптимизация маршрута (Nearest Neighbor), если доступны координаты
+        Args:
+            max_stops (int): Сколько лучших стран включить в маршрут
+                (не больше числа стран в наборе данных).
+        """
+        snapshot = self._snapshot()
+        # Выбор стран-кандидатов с наибольшей вероятностью
+        candidates = self._search_snapshot(
+            snapshot,
+            [query],
+            lang,
+            limit=max(1, min(max_stops, len(snapshot.countries))),
+            examples=PlateCalculator.EXAMPLES_NONE,
+        )[0].results
+
+        # Оптимизация маршрута по расстоянию, если доступны координаты
         if user_lat is not None and user_lng is not None:
-            current_lat, current_lng = user_lat, user_lng
-            pool = candidates[:]
-
-            while pool:
-                # Ищем ближайшую страну из оставшихся
-                pool.sort(
-                    key=lambda x: self._calculate_distance(
-                        current_lat, current_lng, x.lat, x.lng
-                    )
-                )
-                nearest = pool.pop(0)
-                ordered_route.append(nearest)
-                current_lat, current_lng = nearest.lat, nearest.lng
+            ordered_route = self._optimize_route(
+                snapshot, candidates, user_lat, user_lng
+            )
         else:
             ordered_route = candidates
 
@@ -0,0 +1,129 @@
+from typing import List
+
+from app.core.geo import np
+
+# До скольких остановок маршрут ищется точно (Held-Karp, O(2^n * n^2))
+EXACT_ROUTE_LIMIT = 12
+# Сколько полных проходов 2-opt допускается для больших маршрутов
+TWO_OPT_MAX_PASSES = 20
+_IMPROVEMENT_EPSILON = 1e-9
+
+
+def path_length(dist: "np.ndarray", order: List[int]) -> float:
+    """Длина открытого пути 0 -> order[0] -> ... -> order[-1]."""
+    path = [0] + order
+    return float(sum(dist[a, b] for a, b in zip(path, path[1:])))
+
+
+def optimize_path(dist: "np.ndarray") -> List[int]:
+    """
+    Находит короткий открытый путь из узла 0 через все остальные узлы.
+
+    До EXACT_ROUTE_LIMIT остановок путь точный (динамика по подмножествам),
+    дальше — ближайший сосед с улучшением 2-opt.
+
+    Args:
+        dist: Симметричная матрица расстояний (n + 1, n + 1), узел 0 — старт.
+
+    Returns:
+        Порядок посещения узлов 1..n.
+    """
+    n = len(dist) - 1
+    if n <= 2:
+        order = list(range(1, n + 1))
+        if n == 2 and dist[0, 2] < dist[0, 1]:
+            order.reverse()
+        return order
+    if n <= EXACT_ROUTE_LIMIT:
+        return _held_karp(dist)
+    return _two_opt(dist, _nearest_neighbor(dist))
+
+
+def _held_karp(dist: "np.ndarray") -> List[int]:
+    """
+    Точный открытый путь динамикой Хелда-Карпа.
+
+    best[mask, j] — длина кратчайшего пути из старта через узлы mask,
+    заканчивающегося в j. Подмножества обрабатываются слоями по размеру,
+    переходы в узел j считаются сразу для всех подмножеств слоя.
+    """
+    n = len(dist) - 1
+    inner = dist[1:, 1:]
+    full = (1 << n) - 1
+
+    best = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.intp)
+    for j in range(n):
+        best[1 << j, j] = dist[0, j + 1]
+
+    masks = np.arange(1 << n)
+    sizes = np.zeros(1 << n, dtype=np.intp)
+    for j in range(n):
+        sizes += (masks >> j) & 1
+
+    for size in range(2, n + 1):
+        layer = masks[sizes == size]
+        for j in range(n):
+            current = layer[(layer >> j) & 1 == 1]
+            prev = current ^ (1 << j)
+            candidates = best[prev] + inner[:, j]
+            k = candidates.argmin(axis=1)
+            best[current, j] = candidates[np.arange(len(current)), k]
+            parent[current, j] = k
+
+    end = int(best[full].argmin())
+    order = []
+    mask = full
+    while end >= 0:
+        order.append(end + 1)
+        mask, end = mask ^ (1 << end), int(parent[mask, end])
+    order.reverse()
+    return order
+
+
+def _nearest_neighbor(dist: "np.ndarray") -> List[int]:
+    """Жадный путь: из текущего узла в ближайший непосещённый."""
+    n = len(dist)
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = True
+    order = []
+    current = 0
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, dist[current])
+        current = int(row.argmin())
+        visited[current] = True
+        order.append(current)
+    return order
+
+
+def _two_opt(dist: "np.ndarray", order: List[int]) -> List[int]:
+    """
+    Улучшает открытый путь разворотами отрезков (2-opt).
+
+    Для каждого начала отрезка выигрыш от разворота считается сразу
+    для всех концов; применяется лучший разворот. Старт остаётся на месте.
+    """
+    path = np.array([0] + order, dtype=np.intp)
+    m = len(path)
+
+    for _ in range(TWO_OPT_MAX_PASSES):
+        improved = False
+        for i in range(1, m - 1):
+            j = np.arange(i + 1, m)
+            a, b = path[i - 1], path[i]
+            c = path[j]
+            delta = dist[a, c] - dist[a, b]
+            # Ребро после отрезка есть только если отрезок не в конце пути
+            inner = j + 1 < m
+            d = path[j[inner] + 1]
+            delta[inner] += dist[b, d] - dist[c[inner], d]
+
+            best = int(delta.argmin())
+            if delta[best] < -_IMPROVEMENT_EPSILON:
+                end = int(j[best])
+                path[i : end + 1] = path[i : end + 1][::-1].copy()
+                improved = True
+        if not improved:
+            break
+
+    return [int(node) for node in path[1:]]
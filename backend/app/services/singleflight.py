@@ -0,0 +1,114 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    """Вычисление в работе: его результат или ошибка и событие завершения."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных вычислений (single-flight).
+
+    Первый вызов с ключом выполняет функцию, остальные вызовы с тем же
+    ключом, пришедшие до её завершения, ждут и получают тот же результат
+    (или то же исключение). После завершения ключ освобождается: следующий
+    вызов снова вычисляет значение (повторное использование — задача кэша).
+    do_many делает то же для пакета ключей.
+
+    Потокобезопасен; рассчитан на вызовы из пула потоков ComputeExecutor.
+
+    Attributes:
+        leaders (int): Сколько ключей было вычислено.
+        coalesced (int): Сколько ключей дождались чужого вычисления.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, func: Callable[[], T]) -> T:
+        """
+        Выполняет func или присоединяется к уже идущему вычислению с ключом key.
+
+        Returns:
+            Результат func, общий для всех объединённых вызовов.
+        """
+        return self.do_many([key], lambda keys: {key: func()})[key]
+
+    def do_many(
+        self,
+        keys: List[Hashable],
+        func: Callable[[List[Hashable]], Dict[Hashable, T]],
+    ) -> Dict[Hashable, T]:
+        """
+        Пакетный do: ключи без вычисления в работе считаются одним вызовом func.
+
+        Ключи, которые уже вычисляются другими вызовами, не передаются в func:
+        их результаты дожидаются после собственного расчёта. Ключи пакета
+        занимаются атомарно, а ожидание начинается только после завершения
+        своих вычислений, поэтому пересекающиеся пакеты не блокируют друг друга.
+
+        Args:
+            keys (List[Hashable]): Уникальные ключи.
+            func: Функция, получающая список занятых ключей и возвращающая
+                словарь {ключ: результат} для каждого из них.
+
+        Returns:
+            Словарь {ключ: результат} для всех ключей.
+        """
+        own: Dict[Hashable, _Call] = {}
+        joined: Dict[Hashable, _Call] = {}
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    own[key] = self._calls[key] = _Call()
+                else:
+                    joined[key] = call
+            self.leaders += len(own)
+            self.coalesced += len(joined)
+
+        results: Dict[Hashable, T] = {}
+        if own:
+            try:
+                results = func(list(own))
+                for key, call in own.items():
+                    call.result = results[key]
+            except BaseException as e:
+                for call in own.values():
+                    call.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in own:
+                        del self._calls[key]
+                for call in own.values():
+                    call.done.set()
+
+        for key, call in joined.items():
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results[key] = call.result
+        return results
+
+    def stats(self) -> Dict[str, int]:
+        """Возвращает число вычислений в работе, запущенных и объединённых вызовов."""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
@@ -0,0 +1,171 @@
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Set, Tuple
+
+from app.core.snapshot import DatasetSnapshot
+from app.services.calculator import PlateCalculator
+from app.services.matcher import QueryMatcher
+
+# Похожие по начертанию символы (в обе стороны)
+LOOKALIKES = {
+    "O": "0",
+    "I": "1",
+    "Z": "2",
+    "E": "3",
+    "S": "5",
+    "B": "8",
+}
+LOOKALIKES.update({digit: letter for letter, digit in LOOKALIKES.items()})
+
+# Сколько узлов дерева подстановок раскрывается на запрос не больше
+MAX_EXPANSIONS = 256
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    """
+    Вариант запроса с заменой похожих символов.
+
+    Attributes:
+        query (str): Вариант запроса.
+        best_probability (float): Лучшая вероятность по странам, %.
+        countries (int): В скольких странах вариант встречается.
+    """
+
+    query: str
+    best_probability: float
+    countries: int
+
+
+class LookalikeSearch:
+    """
+    Поиск лучших вариантов запроса с заменами похожих символов.
+
+    Варианты образуют двоичное дерево решений по заменяемым позициям.
+    Узел с нерешёнными позициями оценивается сверху счётом запроса,
+    где такие позиции — класс из обоих символов: любой номер, содержащий
+    конкретную подстановку, содержит и запрос с классами. Узлы раскрываются
+    в порядке убывания оценки (best-first), поэтому полные варианты
+    выходят в порядке убывания лучшей вероятности, а неперспективные
+    ветви не раскрываются вовсе.
+
+    Уникальные шаблоны снимка считаются один раз, а вероятность страны,
+    как и в /check, смешивается из её форматов по их долям.
+
+    Attributes:
+        snapshot (DatasetSnapshot): Снимок данных (шаблоны, индекс, форматы стран).
+        calculator (PlateCalculator): Калькулятор для смешивания форматов.
+    """
+
+    def __init__(self, snapshot: DatasetSnapshot, calculator: PlateCalculator) -> None:
+        self.snapshot = snapshot
+        self.calculator = calculator
+
+    def best_probability(self, classes: Sequence[str]) -> float:
+        """
+        Лучшая вероятность запроса по всем странам (в процентах).
+
+        Страны перебираются по убыванию дешёвой оценки — суммы оценок
+        форматов с их долями; перебор прекращается, как только оценка
+        не превосходит найденный максимум.
+        """
+        snapshot = self.snapshot
+        plans = snapshot.scoring_plans
+        matcher = QueryMatcher.from_classes(classes)
+        bounds = {
+            plan_id: matcher.upper_bound(plans[plan_id])
+            for plan_id in snapshot.index.candidates(classes)
+        }
+
+        bounded = []
+        countries = dict.fromkeys(
+            idx for plan_id in bounds for idx in snapshot.plan_countries[plan_id]
+        )
+        for idx in countries:
+            bound = 100 * sum(
+                weight * bounds.get(plan_id, 0.0)
+                for plan_id, weight in snapshot.formats[idx]
+            )
+            if bound > 0:
+                bounded.append((-bound, idx))
+        bounded.sort()
+
+        counts: Dict[int, int] = {}
+        best = 0.0
+        for neg_bound, idx in bounded:
+            if -neg_bound <= best:
+                break
+            parts = []
+            for plan_id, weight in snapshot.formats[idx]:
+                count = 0
+                if bounds.get(plan_id, 0.0) > 0:
+                    if plan_id not in counts:
+                        counts[plan_id] = matcher.count(plans[plan_id])
+                    count = counts[plan_id]
+                parts.append((weight, count, plans[plan_id]))
+            best = max(best, self.calculator.mixture(parts)[0])
+        return best
+
+    def countries(self, query: str) -> int:
+        """Число стран, где вариант встречается хотя бы в одном формате."""
+        snapshot = self.snapshot
+        matcher = QueryMatcher(query)
+        matched: Set[int] = set()
+        for plan_id in snapshot.index.candidates(query):
+            if matcher.count(snapshot.scoring_plans[plan_id]):
+                matched.update(snapshot.plan_countries[plan_id])
+        return len(matched)
+
+    def search(
+        self, query: str, limit: int = 5, max_expansions: int = MAX_EXPANSIONS
+    ) -> List[Suggestion]:
+        """
+        Возвращает до limit вариантов, улучшающих исходный запрос.
+
+        Вариант полезен, если его лучшая вероятность выше, чем у запроса,
+        или он встречается в большем числе стран. Порядок — по убыванию
+        лучшей вероятности, затем числа стран.
+        """
+        swappable = [i for i, c in enumerate(query) if c in LOOKALIKES]
+        if not swappable or limit <= 0:
+            return []
+
+        base_probability = self.best_probability(query)
+        base_countries = self.countries(query)
+
+        def classes(decided: Tuple[str, ...]) -> List[str]:
+            result = list(query)
+            for pos, i in enumerate(swappable):
+                c = query[i]
+                result[i] = decided[pos] if pos < len(decided) else c + LOOKALIKES[c]
+            return result
+
+        # (-оценка, решения по заменяемым позициям)
+        heap: List[Tuple[float, Tuple[str, ...]]] = [
+            (-self.best_probability(classes(())), ())
+        ]
+        found: List[Suggestion] = []
+        expansions = 0
+
+        while heap and len(found) < limit and expansions < max_expansions:
+            neg_bound, decided = heapq.heappop(heap)
+            if len(decided) == len(swappable):
+                variant = "".join(classes(decided))
+                if variant == query:
+                    continue
+                countries = self.countries(variant)
+                if -neg_bound > base_probability or countries > base_countries:
+                    found.append(Suggestion(variant, -neg_bound, countries))
+                continue
+
+            expansions += 1
+            original = query[swappable[len(decided)]]
+            for choice in (original, LOOKALIKES[original]):
+                child = decided + (choice,)
+                bound = self.best_probability(classes(child))
+                if bound > 0:
+                    heapq.heappush(heap, (-bound, child))
+
+        found.sort(key=lambda s: (-s.best_probability, -s.countries, s.query))
+        return found
+
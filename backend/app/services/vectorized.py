@@ -0,0 +1,131 @@
+from collections import defaultdict
+from typing import Dict, List, Sequence
+
+from app.core.packed import PackedPlans, np
+from app.core.query import query_classes
+from app.services.matcher import QueryMatcher
+
+# Сколько запросов одной длины обрабатывается за один проход DP
+BATCH_CHUNK_SIZE = 256
+
+
+def _count_group(queries: Sequence[str], packed: PackedPlans) -> List[List[int]]:
+    """
+    Считает совпадения для группы запросов одинаковой длины.
+
+    Состояние DP хранится тензором (запрос x страна x длина префикса)
+    и обновляется по одному слоту для всех запросов и стран одновременно.
+    Для позиции-класса вес перехода — сумма строк membership его символов,
+    то есть число символов слота, попадающих в класс.
+    """
+    n_queries = len(queries)
+    n_countries = len(packed)
+    parsed = [query_classes(query) for query in queries]
+    m = len(parsed[0])
+    width = packed.width
+
+    empty = np.zeros((n_countries, width), dtype=np.int64)
+    class_rows: Dict[str, "np.ndarray"] = {}
+
+    def class_row(chars: str) -> "np.ndarray":
+        row = class_rows.get(chars)
+        if row is None:
+            members = [packed.alphabet[c] for c in chars if c in packed.alphabet]
+            if len(members) == 1:
+                row = packed.membership[members[0]]
+            elif members:
+                row = packed.membership[members].sum(axis=0)
+            else:
+                row = empty
+            class_rows[chars] = row
+        return row
+
+    rows = [
+        np.stack([class_row(chars) for chars in classes], axis=-1)
+        for classes in parsed
+    ]
+    # hits[s, q, c, j] — подходит ли символ j запроса q к слоту s страны c
+    hits = np.stack(rows).transpose(2, 0, 1, 3)
+
+    ways = np.zeros((n_queries, n_countries, m), dtype=np.int64)
+    ways[:, :, 0] = 1
+    matched = np.zeros((n_queries, n_countries), dtype=np.int64)
+
+    for s in range(width):
+        h = hits[s]
+        advanced = ways * h
+        nxt = ways * packed.option_counts[None, :, s, None] - advanced
+        nxt[:, :, 1:] += advanced[:, :, :-1]
+        matched += advanced[:, :, -1] * packed.suffix_products[None, :, s + 1]
+        ways = nxt
+
+    counts = matched.tolist()
+
+    if not packed.int64_safe.all():
+        unsafe = np.flatnonzero(~packed.int64_safe)
+        for q, query in enumerate(queries):
+            matcher = QueryMatcher(query)
+            for c in unsafe:
+                counts[q][c] = matcher.count(packed.plans[c])
+
+    return counts
+
+
+def count_matches_many(
+    queries: Sequence[str], packed: PackedPlans
+) -> List[List[int]]:
+    """
+    Считает число номеров, содержащих каждый из запросов, для всех стран.
+
+    Запросы группируются по длине, и каждая группа считается одним
+    векторизованным DP (см. count_matches).
+
+    Args:
+        queries: Строки запросов в верхнем регистре.
+        packed: Упакованные шаблоны стран.
+
+    Returns:
+        List[List[int]]: Для каждого запроса — число выигрышных номеров
+        по странам в порядке packed.
+    """
+    results: List[List[int]] = [[] for _ in queries]
+    if len(packed) == 0:
+        return results
+
+    # Группы по числу позиций: "[AB]7" и "A7" считаются одним DP
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for idx, query in enumerate(queries):
+        groups[len(query_classes(query))].append(idx)
+
+    for length, indices in groups.items():
+        if length == 0:
+            for idx in indices:
+                results[idx] = list(packed.totals)
+            continue
+
+        for start in range(0, len(indices), BATCH_CHUNK_SIZE):
+            chunk = indices[start : start + BATCH_CHUNK_SIZE]
+            counts = _count_group([queries[i] for i in chunk], packed)
+            for idx, row in zip(chunk, counts):
+                results[idx] = row
+
+    return results
+
+
+def count_matches(query: str, packed: PackedPlans) -> List[int]:
+    """
+    Считает число номеров, содержащих запрос, сразу для всех стран.
+
+    Тот же DP, что и в QueryMatcher.count, но состояние хранится матрицей
+    (страна x длина совпавшего префикса) и обновляется по одному слоту
+    для всех стран одновременно. Страны, чьё пространство номеров
+    не помещается в int64, досчитываются скалярным QueryMatcher.
+
+    Args:
+        query: Строка запроса в верхнем регистре.
+        packed: Упакованные шаблоны стран.
+
+    Returns:
+        List[int]: Число выигрышных номеров для каждой страны в порядке packed.
+    """
+    return count_matches_many([query], packed)[0]
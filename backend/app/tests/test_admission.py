@@ -0,0 +1,136 @@
+import asyncio
+from collections import Counter
+
+import httpx
+from app.api.admission import (
+    PRIORITY_LOW,
+    PRIORITY_NORMAL,
+    AdmissionController,
+    Rejection,
+    classify,
+)
+from app.api.middleware import AdmissionMiddleware
+from fastapi import FastAPI
+
+
+def _slow_app(controller: AdmissionController, delay: float) -> FastAPI:
+    """Приложение с маршрутами той же формы, что у API, и медленным расчётом."""
+    app = FastAPI()
+
+    @app.get("/")
+    async def healthcheck():
+        return {"status": "ok"}
+
+    @app.post("/check")
+    async def check():
+        await asyncio.sleep(delay)
+        return {"results": []}
+
+    @app.post("/route")
+    async def route():
+        await asyncio.sleep(delay)
+        return {"segments": []}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    return app
+
+
+async def _generate_load(app: FastAPI, requests: list) -> list:
+    """Локальный генератор нагрузки: все запросы уходят одновременно."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(
+            *(client.request(method, path, json={}) for method, path in requests)
+        )
+
+
+def test_route_classification():
+    """Тяжёлые маршруты получают приоритет, лёгкие не ограничиваются."""
+    assert classify("POST", "/check") == ("/check", PRIORITY_NORMAL)
+    assert classify("POST", "/route") == ("/route", PRIORITY_LOW)
+    assert classify("GET", "/countries/RU/combinations")[1] == PRIORITY_NORMAL
+    assert classify("GET", "/countries") is None
+    assert classify("GET", "/") is None
+
+
+def test_overload_sheds_heavy_routes_first():
+    """Под перегрузкой лишние запросы отклоняются сразу, /route — раньше /check."""
+    controller = AdmissionController(max_inflight=4, low_priority_share=0.5)
+    app = _slow_app(controller, delay=0.2)
+
+    requests = (
+        [("POST", "/route")] * 10 + [("POST", "/check")] * 10 + [("GET", "/")] * 5
+    )
+    responses = asyncio.run(_generate_load(app, requests))
+    by_path = {}
+    for (_, path), response in zip(requests, responses):
+        by_path.setdefault(path, Counter())[response.status_code] += 1
+
+    # Лёгкий маршрут проходит всегда
+    assert by_path["/"] == Counter({200: 5})
+    # /route занимает не больше половины лимита, остаток достаётся /check
+    assert by_path["/route"][200] == 2
+    assert by_path["/check"][200] == 2
+    assert by_path["/route"][429] == 8
+    assert by_path["/check"][503] == 8
+
+    rejected = [r for r in responses if r.status_code in (429, 503)]
+    assert all(int(r.headers["Retry-After"]) >= 1 for r in rejected)
+    assert controller.stats()["in_flight"] == 0
+
+
+def test_slow_route_lowers_its_limit():
+    """Задержка выше целевой уменьшает лимит маршрута, Retry-After растёт."""
+    controller = AdmissionController(max_inflight=10, latency_target=1.0)
+    assert controller.limit("/check", PRIORITY_NORMAL) == 10
+
+    controller.acquire("/check", PRIORITY_NORMAL)
+    controller.release("/check", 4.0)
+    assert controller.limit("/check", PRIORITY_NORMAL) == 2
+    assert controller.limit("/route", PRIORITY_LOW) == 5
+
+    for _ in range(2):
+        assert controller.acquire("/check", PRIORITY_NORMAL) is None
+    rejection = controller.acquire("/check", PRIORITY_NORMAL)
+    assert rejection.status == 429
+    assert rejection.retry_after == 4
+
+
+def test_latency_decays_after_spike(monkeypatch):
+    """Без новых замеров среднее задержки затухает и лимит восстанавливается."""
+    now = [100.0]
+    monkeypatch.setattr("app.api.admission.time.monotonic", lambda: now[0])
+    controller = AdmissionController(
+        max_inflight=10, latency_target=1.0, latency_half_life=5.0
+    )
+
+    controller.acquire("/check", PRIORITY_NORMAL)
+    controller.release("/check", 4.0)
+    assert controller.limit("/check", PRIORITY_NORMAL) == 2
+
+    now[0] += 10
+    assert controller.latency("/check") == 1.0
+    assert controller.limit("/check", PRIORITY_NORMAL) == 10
+
+    # Новый замер смешивается с затухшим средним, а не с пиком
+    controller.acquire("/check", PRIORITY_NORMAL)
+    controller.release("/check", 1.0)
+    assert controller.latency("/check") == 1.0
+
+
+def test_rejections_carry_cors_headers(client, monkeypatch):
+    """CORS оборачивает контроль допуска: браузер видит статус и Retry-After."""
+    from app.api.deps import get_admission_controller
+
+    controller = get_admission_controller()
+    monkeypatch.setattr(
+        controller, "acquire", lambda route, priority: Rejection(503, 3, "Overloaded")
+    )
+
+    response = client.post(
+        "/check", json={"query": "777"}, headers={"Origin": "http://localhost:5173"}
+    )
+    assert response.status_code == 503
+    assert response.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert "Retry-After" in response.headers["access-control-expose-headers"]
+    assert response.headers["retry-after"] == "3"
@@ -3,6 +3,7 @@ from unittest.mock import MagicMock
 from app.api.routes.plates import get_plate_service
 from app.main import app
 from app.schemas.plate import PlateCalculationResult
+from app.services.plate_service import PlateSearch
 
 
 def test_healthcheck(client):
@@ -29,7 +30,7 @@ def test_check_endpoint_mocked(client):
 
     # Мокаем сервис
     mock_service = MagicMock()
-    mock_service.check_plate.return_value = [mock_result]
+    mock_service.search_plate.return_value = PlateSearch([mock_result], 1, ["A8C"])
 
     # Подменяем зависимость
     app.dependency_overrides[get_plate_service] = lambda: mock_service
@@ -42,9 +43,12 @@ def test_check_endpoint_mocked(client):
         assert data["total_results"] == 1
         assert data["max_probability"] == 50.0
         assert data["results"][0]["country_name"] == "TestLand"
+        assert data["suggestions"] == ["A8C"]
 
         # Проверяем, что сервис был вызван с правильными аргументами
-        mock_service.check_plate.assert_called_with("ABC", "ru")
+        mock_service.search_plate.assert_called_once_with(
+            "ABC", "ru", limit=None, min_probability=None, examples="full"
+        )
 
     finally:
         # Очищаем override после теста
@@ -58,3 +62,213 @@ def test_check_validation_error(client):
 
     response = client.post("/check", json={"query": ""})
     assert response.status_code == 422
+
+
+def test_check_batch_endpoint(client):
+    """Пакетный эндпоинт отвечает на каждую комбинацию в порядке запроса."""
+    response = client.post(
+        "/check/batch",
+        json={"queries": [{"query": "777"}, {"query": "boss"}, {"query": "777"}]},
+    )
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["query"] for item in items] == ["777", "BOSS", "777"]
+
+    single = client.post("/check", json={"query": "777"}).json()
+    assert items[0]["total_results"] == single["total_results"]
+    assert items[0]["max_probability"] == single["max_probability"]
+    assert [r["country_code"] for r in items[0]["results"]] == [
+        r["country_code"] for r in single["results"]
+    ]
+
+
+def test_check_batch_top(client):
+    """Параметр top ограничивает число стран на комбинацию."""
+    response = client.post(
+        "/check/batch", json={"queries": [{"query": "7"}, {"query": "A"}], "top": 3}
+    )
+
+    assert response.status_code == 200
+    for item in response.json()["items"]:
+        assert len(item["results"]) == 3
+        assert item["total_results"] > 3
+        probabilities = [r["probability"] for r in item["results"]]
+        assert probabilities == sorted(probabilities, reverse=True)
+
+
+def test_check_batch_validation(client):
+    """Пустой пакет и невалидные комбинации отклоняются."""
+    assert client.post("/check/batch", json={"queries": []}).status_code == 422
+    response = client.post("/check/batch", json={"queries": [{"query": ""}]})
+    assert response.status_code == 422
+
+
+def test_check_overloaded_returns_503(client):
+    """Переполненная очередь вычислений отвечает 503 с Retry-After."""
+    from unittest.mock import AsyncMock
+
+    from app.api.deps import get_compute_executor
+    from app.services.executor import ComputeOverloadedError
+
+    executor = MagicMock()
+    executor.run = AsyncMock(side_effect=ComputeOverloadedError("full"))
+    app.dependency_overrides[get_compute_executor] = lambda: executor
+
+    try:
+        response = client.post("/check", json={"query": "777"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+    finally:
+        app.dependency_overrides = {}
+
+
+def test_check_stream_ndjson(client):
+    """Потоковый /check отдает те же результаты построчно и сводку в конце."""
+    import json
+
+    expected = client.post("/check", json={"query": "777"}).json()
+
+    with client.stream("POST", "/check/stream", json={"query": "777"}) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.iter_lines() if line]
+
+    assert [e["event"] for e in events[:-1]] == ["result"] * expected["total_results"]
+    assert [e["data"]["country_code"] for e in events[:-1]] == [
+        r["country_code"] for r in expected["results"]
+    ]
+    assert events[-1] == {
+        "event": "summary",
+        "data": {
+            "total_results": expected["total_results"],
+            "max_probability": expected["max_probability"],
+        },
+    }
+
+
+def test_check_stream_sse(client):
+    """Формат SSE: события result и завершающее summary с тем же total_results."""
+    import json
+
+    response = client.post("/check/stream?format=sse", json={"query": "BOSS"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in response.text.split("\n\n") if b]
+    assert blocks[0].startswith("event: result\ndata: {")
+    assert blocks[-1].startswith("event: summary\ndata: {")
+
+    summary = json.loads(blocks[-1].split("data: ", 1)[1])
+    top = client.post("/check?limit=1", json={"query": "BOSS"}).json()
+    assert summary["total_results"] == top["total_results"] == len(blocks) - 1
+
+
+def test_check_limit_param(client):
+    """limit ограничивает выдачу /check, total_results считается без лимита."""
+    full = client.post("/check", json={"query": "77"}).json()
+    top = client.post("/check?limit=2", json={"query": "77"}).json()
+
+    assert len(top["results"]) == 2
+    assert top["total_results"] == full["total_results"] == len(full["results"])
+    assert top["max_probability"] == full["max_probability"]
+    assert [r["country_code"] for r in top["results"]] == [
+        r["country_code"] for r in full["results"][:2]
+    ]
+
+    assert client.post("/check?limit=0", json={"query": "77"}).status_code == 422
+
+
+def test_metrics_endpoint(client):
+    """После запроса /check в /metrics есть задержки маршрута и стадий."""
+    client.post("/check", json={"query": "7A7"})
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'signluck_request_duration_seconds_count{method="POST",route="/check",status="200"}' in body
+    for stage_name in ("prefilter", "counting", "matching", "examples", "symbols", "sorting", "serialization"):
+        assert f'signluck_stage_duration_seconds_count{{stage="{stage_name}"}}' in body
+    assert "signluck_patterns_scored_total" in body
+    assert "signluck_cache_hits" in body
+    assert "signluck_executor_completed" in body
+    assert "signluck_singleflight_coalesced" in body
+
+
+def test_check_examples_paging(client):
+    """/check/examples листает те же примеры, что отдаёт /check в компактном виде."""
+    check = client.post("/check?examples=compact&limit=1", json={"query": "77"}).json()
+    result = check["results"][0]
+    assert result["examples"] == []
+
+    page = client.post(
+        "/check/examples",
+        json={"query": "77", "country_code": result["country_code"], "count": 5},
+    ).json()
+    assert page["examples"] == result["compact_examples"]
+    assert page["next_offset"] == 5
+
+    response = client.post("/check/examples", json={"query": "77", "country_code": "QQ"})
+    assert response.status_code == 404
+
+
+def test_check_returns_suggestions(client):
+    """/check предлагает варианты с похожими символами."""
+    data = client.post("/check", json={"query": "BOSS"}).json()
+    assert data["suggestions"]
+    assert all(len(s) == 4 for s in data["suggestions"])
+
+
+def test_check_pattern_query(client):
+    """/check принимает шаблоны с классами и отклоняет неверный синтаксис."""
+    data = client.post("/check?limit=3", json={"query": "7?7"}).json()
+    assert len(data["results"]) == 3
+    assert data["suggestions"] == []
+
+    assert client.post("/check", json={"query": "[AB"}).status_code == 422
+    assert client.post("/check", json={"query": "[AB]" * 11}).status_code == 422
+
+
+def test_conditional_requests(client, monkeypatch):
+    """ETag зависит от хеша данных и запроса; совпавший If-None-Match даёт 304."""
+    from app.services.plate_service import PlateService
+
+    countries = client.get("/countries")
+    etag = countries.headers["etag"]
+    assert countries.headers["cache-control"] == "no-cache"
+    cached = client.get("/countries", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert client.get("/countries", headers={"If-None-Match": "*"}).status_code == 304
+
+    first = client.post("/check?lang=en", json={"query": "a77"})
+    check_etag = first.headers["etag"]
+    assert check_etag != etag
+    assert client.post("/check", json={"query": "A77"}).headers["etag"] != check_etag
+
+    url = "/countries/RU/combinations?length=2"
+    combinations_etag = client.get(url).headers["etag"]
+
+    # 304 отдаётся без обращения к сервису
+    def fail(*args, **kwargs):
+        raise AssertionError("service must not run")
+
+    monkeypatch.setattr(PlateService, "get_combinations", fail)
+    repeated = client.get(
+        url, headers={"If-None-Match": f'W/"0-0", {combinations_etag}'}
+    )
+    assert repeated.status_code == 304
+    assert repeated.headers["etag"] == combinations_etag
+
+
+def test_conditional_post_ignored(client):
+    """Для POST If-None-Match (в том числе "*") не даёт 304: ответ с телом."""
+    first = client.post("/check", json={"query": "A77"})
+    for header in ("*", first.headers["etag"]):
+        response = client.post(
+            "/check", json={"query": "A77"}, headers={"If-None-Match": header}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] == first.headers["etag"]
+        assert response.json() == first.json()
@@ -0,0 +1,39 @@
+from benchmarks.harness import BenchmarkResult, compare, measure
+from benchmarks.run import synthetic_countries
+
+
+def _result(name, ops, alloc=1.0):
+    return BenchmarkResult(
+        name=name, ops_per_sec=ops, mean_us=1e6 / ops, alloc_kib=alloc, iterations=1
+    )
+
+
+def test_measure_reports_throughput():
+    """measure возвращает положительную пропускную способность."""
+    result = measure("noop", lambda: sum(range(10)), iterations=10, repeats=2)
+
+    assert result.name == "noop"
+    assert result.ops_per_sec > 0
+    assert result.alloc_kib >= 0
+
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Просадка больше порога считается регрессией, в пределах — нет."""
+    baseline = {
+        "fast": {"ops_per_sec": 1000.0, "alloc_kib": 10.0},
+        "slow": {"ops_per_sec": 1000.0, "alloc_kib": 10.0},
+    }
+    results = [_result("fast", 900.0, 10.0), _result("slow", 500.0, 30.0)]
+
+    regressions = compare(results, baseline, threshold=0.2)
+
+    assert len(regressions) == 2
+    assert all(line.startswith("slow") for line in regressions)
+    assert compare([_result("new", 1.0)], baseline, threshold=0.2) == []
+
+
+def test_synthetic_countries_have_unique_codes():
+    """Масштабный набор не теряет стран из-за повторяющихся кодов."""
+    countries = synthetic_countries(3000)
+
+    assert len({c.country_code for c in countries}) == 3000
@@ -0,0 +1,97 @@
+from app.core.repository import CountryRepository
+from app.schemas.country import CountrySchema
+from app.services.cache import ResultCache
+from app.services.plate_service import PlateService
+
+
+def test_cache_lru_eviction():
+    """При переполнении вытесняется давно неиспользуемая запись."""
+    cache = ResultCache(max_size=2, ttl=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" становится самой свежей
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_ttl_expiration(monkeypatch):
+    """Устаревшая запись считается промахом и удаляется."""
+    now = [100.0]
+    monkeypatch.setattr("app.services.cache.time.monotonic", lambda: now[0])
+
+    cache = ResultCache(max_size=10, ttl=5)
+    cache.set("key", "value")
+    assert cache.get("key") == "value"
+
+    now[0] += 10
+    assert cache.get("key") is None
+    assert len(cache) == 0
+    assert cache.stats()["expirations"] == 1
+
+
+def test_cache_disabled():
+    """Кэш нулевого размера ничего не хранит."""
+    cache = ResultCache(max_size=0)
+    cache.set("key", "value")
+    assert cache.get("key") is None
+
+
+def test_service_uses_cache(calculator, sample_country_simple):
+    """Повторный запрос обслуживается из кэша, перезагрузка данных его сбрасывает."""
+    repository = CountryRepository.from_countries([sample_country_simple])
+    cache = ResultCache(max_size=10, ttl=60)
+    service = PlateService(repository, calculator, cache=cache)
+
+    first = service.check_plate("ab")
+    second = service.check_plate(" AB ")
+    assert first == second
+    assert cache.stats()["hits"] == 1
+    # Промах по готовым результатам и по ранжированию
+    assert cache.stats()["misses"] == 2
+
+    other = CountrySchema(
+        country_code="YY", country_name="Other", pattern="AA", lat=0, lng=0
+    )
+    repository._set_data([sample_country_simple, other])
+
+    third = service.check_plate("AB")
+    assert len(third) == 2
+    assert cache.stats()["misses"] == 4
+
+
+def test_route_reuses_check_ranking(calculator, monkeypatch):
+    """Маршрут и ограниченные запросы берут страны из ранжирования /check."""
+    repository = CountryRepository()
+    cache = ResultCache(max_size=100, ttl=60)
+    service = PlateService(repository, calculator, cache=cache)
+
+    full = service.check_plate("777")
+
+    calls = []
+    original = PlateService._count_many
+
+    def counting(self, queries, snapshot):
+        calls.append(tuple(queries))
+        return original(self, queries, snapshot)
+
+    monkeypatch.setattr(PlateService, "_count_many", counting)
+
+    for _ in range(3):
+        route = service.create_luck_route("777", max_stops=3)
+        assert [s.country_code for s in route] == [
+            r.country_code for r in full[:3]
+        ]
+    top = service.check_plate("777", limit=2, examples="none")
+    assert [r.country_code for r in top] == [r.country_code for r in full[:2]]
+    assert top[0].examples == []
+
+    assert calls == []
+
+    # Маршрут первым заполняет ранжирование для /check
+    service.create_luck_route("BOSS")
+    service.check_plate("BOSS")
+    assert calls == [("BOSS",)]
@@ -68,3 +68,163 @@ def test_empty_query(calculator, sample_country_simple):
     # В текущей реализации это скорее всего вернет результат с 100% (пустота везде),
     # либо упадет. Но так как API защищен min_length=1, это edge-case unit теста.
     pass
+
+
+def test_exact_count_matches_brute_force(calculator, sample_country_simple):
+    """Подсчет DP совпадает с полным перебором номеров (без двойного учета)."""
+    from itertools import product
+
+    plates = ["".join(p) for p in product("ABC", repeat=3)]
+
+    for query in ["A", "AA", "AB", "CA", "ABC"]:
+        expected = 0
+        for plate in plates:
+            it = iter(plate)
+            if all(ch in it for ch in query):
+                expected += 1
+        assert calculator.count_matching_plates(query, sample_country_simple) == expected
+
+
+def test_probability_is_exact_fraction(calculator, sample_country_simple):
+    """Перекрывающиеся размещения не завышают вероятность."""
+    # "A" не встречается только в номерах из {B, C}: 2^3 = 8 из 27.
+    fraction = calculator.match_fraction("A", sample_country_simple)
+    assert fraction.numerator * 27 == 19 * fraction.denominator
+
+    result = calculator.calculate_probability("A", sample_country_simple)
+    assert abs(result.probability - 19 / 27 * 100) < 1e-9
+
+
+def test_short_query_long_pattern(calculator):
+    """Короткий запрос на длинном шаблоне считается без перебора размещений."""
+    from app.schemas.country import CountrySchema
+
+    country = CountrySchema(
+        country_code="LL",
+        country_name="LongLand",
+        pattern="0" * 60,
+        lat=0,
+        lng=0,
+    )
+    result = calculator.calculate_probability("77", country)
+
+    assert result is not None
+    assert 0 < result.probability <= 100.0
+    assert len(result.examples) == calculator.EXAMPLES_COUNT
+
+
+def test_upper_bound_is_valid():
+    """Верхняя оценка не меньше точной доли для всех стран из CSV."""
+    from app.core.repository import CountryRepository
+    from app.services.matcher import QueryMatcher
+
+    compiled = CountryRepository().get_compiled()
+    for query in ["7", "777", "A7", "BOSS", "AAA", "S", "KA", "0000", "-"]:
+        matcher = QueryMatcher(query)
+        for _, plan in compiled:
+            exact = matcher.count(plan) / plan.total
+            assert matcher.upper_bound(plan) + 1e-12 >= exact, (query, plan.pattern)
+
+
+def test_examples_are_deterministic(calculator, sample_country_ru):
+    """Примеры зависят только от запроса и страны, компактная форма согласована с полной."""
+    first = calculator.calculate_probability("77", sample_country_ru)
+    second = calculator.calculate_probability("77", sample_country_ru)
+    assert first.examples == second.examples
+
+    compact = calculator.calculate_probability("77", sample_country_ru, examples="compact")
+    assert not compact.examples
+    assert [calculator.expand_example(e) for e in compact.compact_examples] == first.examples
+    for example in compact.compact_examples:
+        picked = [c for i, c in enumerate(example.value) if example.query_mask >> i & 1]
+        assert "".join(picked) == "77"
+
+    bare = calculator.calculate_probability("77", sample_country_ru, examples="none")
+    assert not bare.examples and not bare.compact_examples
+
+
+def test_examples_paging(calculator, sample_country_simple):
+    """Страницы примеров не пересекаются и не превышают число выигрышных номеров."""
+    from app.core.plan import compile_plan
+
+    plan = compile_plan(sample_country_simple.pattern, sample_country_simple.allowed_letters)
+    winning = calculator.count_matching_plates("AB", sample_country_simple)
+
+    pages = [
+        calculator.examples_page("AB", sample_country_simple, plan, winning, offset, 3)
+        for offset in range(0, 9, 3)
+    ]
+    values = [e.value for page in pages for e in page]
+    assert len(values) == len(set(values)) <= winning
+    assert values[:3] == [e.value for e in pages[0]]
+    assert all("A" in v and "B" in v[v.index("A"):] for v in values)
+
+
+def test_character_class_counts_brute_force(calculator):
+    """Запросы с ?, #, @ и наборами считаются так же, как перебор номеров."""
+    import re
+    from itertools import product
+
+    from app.schemas.country import CountrySchema
+
+    country = CountrySchema(
+        country_code="MX", country_name="Mixed", pattern="A0A", allowed_letters="ABC",
+        lat=0, lng=0,
+    )
+    plates = ["".join(p) for p in product("ABC", "0123456789", "ABC")]
+    cases = {
+        "A?": "A.*[A-Z0-9]",
+        "#": "[0-9]",
+        "@@": "[A-Z].*[A-Z]",
+        "[AB]7": "[AB].*7",
+        "?[0-2]?": "[A-Z0-9].*[0-2].*[A-Z0-9]",
+    }
+    for query, regex in cases.items():
+        expected = sum(1 for plate in plates if re.search(regex, plate))
+        assert calculator.count_matching_plates(query, country) == expected, query
+
+
+def test_character_class_examples_and_symbols(calculator, sample_country_ru):
+    """Примеры подставляют в классы конкретные символы, а символы плана — запись класса."""
+    result = calculator.calculate_probability("#7", sample_country_ru, examples="compact")
+
+    assert result is not None
+    assert any(s.value == "#" and s.is_fixed for s in result.symbols)
+    for example in result.compact_examples:
+        picked = [c for i, c in enumerate(example.value) if example.query_mask >> i & 1]
+        assert picked[0].isdigit() and picked[1] == "7"
+
+
+def test_multiple_formats_mixture(calculator):
+    """Вероятность страны с несколькими форматами взвешивается долями в парке."""
+    from fractions import Fraction
+
+    from app.schemas.country import CountrySchema
+
+    # Старая серия AAA (ABC) — 3/4 парка, новая 000 — 1/4
+    country = CountrySchema(
+        country_code="MF",
+        country_name="MultiFormat",
+        pattern="AAA|000",
+        weights="3|1",
+        allowed_letters="ABC",
+        lat=0,
+        lng=0,
+    )
+    assert country.pattern == "AAA"
+    assert [(f.pattern, f.weight) for f in country.formats] == [
+        ("AAA", 0.75),
+        ("000", 0.25),
+    ]
+
+    # "7" встречается только в новой серии: 1 - 0.9^3 = 271/1000
+    assert calculator.match_fraction("7", country) == Fraction(271, 4000)
+    result = calculator.calculate_probability("7", country)
+    assert abs(result.probability - 0.25 * 27.1) < 1e-9
+    # Символы и примеры строятся по формату с наибольшим вкладом
+    assert result.pattern == "000"
+    assert all("7" in "".join(s.value for s in e) for e in result.examples)
+
+    mixed = calculator.calculate_probability("A", country)
+    assert abs(mixed.probability - 0.75 * 19 / 27 * 100) < 1e-9
+    assert mixed.pattern == "AAA"
@@ -0,0 +1,53 @@
+from itertools import product
+
+from app.core.plan import compile_plan
+from app.services.combinations import CombinationFinder
+from app.services.matcher import QueryMatcher
+
+
+def _brute_force(plan, length, alphabet):
+    scored = [
+        (QueryMatcher("".join(chars)).count(plan) / plan.total * 100, "".join(chars))
+        for chars in product(alphabet, repeat=length)
+    ]
+    return sorted((p for p, _ in scored if p > 0), reverse=True)
+
+
+def test_finder_matches_brute_force():
+    """Вероятности лучших комбинаций совпадают с полным перебором."""
+    plan = compile_plan("A0-0A", "ABE")
+    finder = CombinationFinder(plan)
+    assert finder.classes == ("0123456789", "ABE")
+
+    for length in (1, 2, 3):
+        expected = _brute_force(plan, length, "ABE0123456789")
+        found = finder.top(length, 40)
+        assert [c.probability for c in found] == expected[:40]
+        for c in found:
+            exact = QueryMatcher(c.combination).count(plan) / plan.total * 100
+            assert abs(exact - c.probability) < 1e-9
+
+
+def test_finder_lucky_numbers_and_literals():
+    """Литеральные цифры шаблона образуют свой класс и попадают в лучшие числа."""
+    plan = compile_plan("7000", "")
+    finder = CombinationFinder(plan)
+
+    best = finder.top(1, 1, digits_only=True)[0]
+    assert best.combination == "7"
+    assert all(c.combination.isdigit() for c in finder.top(2, 15, digits_only=True))
+
+
+def test_combinations_endpoint(client):
+    """Эндпоинт отдаёт предрасчитанные и вычисленные на лету комбинации."""
+    response = client.get("/countries/ru/combinations?length=2&limit=5")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["country_code"] == "RU"
+    assert len(data["combinations"]) == 5
+    probabilities = [c["probability"] for c in data["combinations"]]
+    assert probabilities == sorted(probabilities, reverse=True)
+    assert all(c["combination"].isdigit() for c in data["lucky_numbers"])
+
+    assert client.get("/countries/RU/combinations?length=7&limit=3").status_code == 200
+    assert client.get("/countries/QQ/combinations").status_code == 404
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.executor import (
+    ComputeExecutor,
+    ComputeOverloadedError,
+    ComputeTimeoutError,
+)
+
+
+class SlowService:
+    """Сервис, вычисления которого можно задержать событием."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.thread_names = []
+
+    def check_plate(self, query, lang="ru"):
+        self.thread_names.append(threading.current_thread().name)
+        self.release.wait(timeout=5)
+        return [query, lang]
+
+
+def test_inline_mode_runs_in_caller():
+    """Режим inline вызывает сервис в текущем потоке."""
+    service = SlowService()
+    service.release.set()
+    executor = ComputeExecutor(mode="inline")
+
+    result = asyncio.run(executor.run(service, "check_plate", "777", "en"))
+
+    assert result == ["777", "en"]
+    assert service.thread_names == [threading.current_thread().name]
+
+
+def test_thread_mode_keeps_event_loop_free():
+    """Пока вычисление идёт в пуле, event loop обслуживает другие задачи."""
+    service = SlowService()
+    executor = ComputeExecutor(mode="thread", max_workers=1)
+
+    async def scenario():
+        task = asyncio.create_task(executor.run(service, "check_plate", "777"))
+        await asyncio.sleep(0.05)
+        assert not task.done()  # loop не заблокирован
+        service.release.set()
+        return await task
+
+    assert asyncio.run(scenario()) == ["777", "ru"]
+    assert service.thread_names[0].startswith("plate-compute")
+    executor.shutdown()
+
+
+def test_queue_limit_rejects_excess():
+    """Сверх max_pending вызовы сразу отклоняются."""
+    service = SlowService()
+    executor = ComputeExecutor(mode="thread", max_workers=1, max_pending=1)
+
+    async def scenario():
+        first = asyncio.create_task(executor.run(service, "check_plate", "1"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ComputeOverloadedError):
+            await executor.run(service, "check_plate", "2")
+        service.release.set()
+        await first
+
+    asyncio.run(scenario())
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_timeout():
+    """Долгое вычисление завершается ComputeTimeoutError, но держит место до конца."""
+    service = SlowService()
+    executor = ComputeExecutor(mode="thread", max_pending=1, timeout=0.05)
+
+    async def scenario():
+        with pytest.raises(ComputeTimeoutError):
+            await executor.run(service, "check_plate", "777")
+        # Поток пула ещё считает: новый вызов не принимается
+        assert executor.pending == 1
+        with pytest.raises(ComputeOverloadedError):
+            await executor.run(service, "check_plate", "778")
+
+    asyncio.run(scenario())
+    service.release.set()
+    executor.shutdown(wait=True)
+    assert executor.stats()["timeouts"] == 1
+    assert executor.pending == 0
+
+
+class StreamingService:
+    """Сервис с генератором, шаги которого выполняются в пуле."""
+
+    def __init__(self):
+        self.thread_names = []
+
+    def iter_plate(self, query, lang="ru"):
+        for char in query:
+            self.thread_names.append(threading.current_thread().name)
+            yield char
+
+
+def test_stream_runs_generator_in_pool():
+    """stream отдаёт элементы генератора, вычисляя их в пуле и занимая место."""
+    service = StreamingService()
+    executor = ComputeExecutor(mode="thread", max_workers=1, max_pending=1)
+
+    async def scenario():
+        items = await executor.stream(service, "iter_plate", "777")
+        assert executor.pending == 1
+        with pytest.raises(ComputeOverloadedError):
+            await executor.stream(service, "iter_plate", "1")
+        return [item async for item in items]
+
+    assert asyncio.run(scenario()) == ["7", "7", "7"]
+    assert all(name.startswith("plate-compute") for name in service.thread_names)
+    assert executor.pending == 0
+    executor.shutdown()
+
+
+def _make_service():
+    service = SlowService()
+    service.release.set()
+    return service
+
+
+def test_process_mode_uses_worker_service():
+    """В режиме process сервис собирается фабрикой в воркере."""
+    executor = ComputeExecutor(
+        mode="process", max_workers=1, service_factory=_make_service
+    )
+
+    result = asyncio.run(executor.run(None, "check_plate", "777", "en"))
+
+    assert result == ["777", "en"]
+    executor.shutdown(wait=True)
+
+
+def test_stream_timeout_counts_and_reports_deadline(caplog):
+    """Таймаут потока учитывается в счётчике и сообщает фактический предел."""
+    service = SlowService()
+
+    def slow_iter(query, lang="ru"):
+        yield service.check_plate(query, lang)
+
+    service.iter_plate = slow_iter
+    executor = ComputeExecutor(mode="thread", max_workers=1, timeout=0.05)
+
+    async def scenario():
+        with pytest.raises(ComputeTimeoutError, match=r"exceeded 0\.0[45]s"):
+            await executor.stream(service, "iter_plate", "777")
+
+    asyncio.run(scenario())
+    service.release.set()
+    executor.shutdown(wait=True)
+    assert executor.stats()["timeouts"] == 1
+    assert executor.stats()["pending"] == 0
+    assert "iter_plate timed out after 0.0" in caplog.text
@@ -0,0 +1,34 @@
+from app.core.index import CapabilityIndex
+from app.core.plan import compile_plan
+from app.core.repository import CountryRepository
+from app.services.matcher import QueryMatcher
+
+
+def test_index_never_drops_matching_country():
+    """Индекс отсеивает только шаблоны, где совпадений точно нет."""
+    snapshot = CountryRepository().get_snapshot()
+    index = snapshot.index
+
+    for query in ["7", "777", "A7", "BOSS", "AEIOU", "S", "KA", "12345678", "-", "Я"]:
+        candidates = set(index.candidates(query))
+        matcher = QueryMatcher(query)
+        for idx, plan in enumerate(snapshot.scoring_plans):
+            if matcher.count(plan):
+                assert idx in candidates, (query, plan.pattern)
+
+
+def test_index_rules_out_impossible_queries():
+    """Длина, буквы вне allowed_letters и избыток цифр отсекаются."""
+    plans = [
+        compile_plan("0000AAA", "BCDFGHJKLMNPRSTVWXYZ"),  # без гласных
+        compile_plan("A000AA", "ABEKMHOPCTYX"),
+        compile_plan("AAAAAA"),
+    ]
+    index = CapabilityIndex.from_plans(plans)
+
+    assert index.candidates("E") == [1, 2]
+    assert index.candidates("7777") == [0]
+    assert index.candidates("AAAA") == [2]  # в A000AA помещаются только 3 буквы
+    assert index.candidates("AAAAAAAA") == []
+    assert index.candidates("Z") == [0, 2]
+    assert index.candidates("Ы") == []
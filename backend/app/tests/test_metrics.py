@@ -0,0 +1,27 @@
+from app.core.metrics import Counter, Histogram
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Гистограмма отдает накопительные корзины, сумму и количество."""
+    histogram = Histogram("demo_seconds", "Demo.", labels=("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5.0, "/a")
+
+    lines = histogram.render()
+
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+    assert histogram.count("/a") == 3
+
+
+def test_counter_accumulates():
+    """Счетчик суммирует приращения."""
+    counter = Counter("demo_total", "Demo.")
+    counter.inc(2)
+    counter.inc()
+
+    assert counter.value() == 3
+    assert "demo_total 3" in counter.render()
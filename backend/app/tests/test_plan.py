@@ -0,0 +1,31 @@
+from app.core.plan import compile_plan
+from app.core.repository import CountryRepository
+
+
+def test_compile_plan_products():
+    """План хранит количество вариантов и префиксные/суффиксные произведения."""
+    plan = compile_plan("a0-a", "abc")
+
+    assert plan.pattern == "A0-A"
+    assert plan.allowed_letters == "ABC"
+    assert plan.option_counts == (3, 10, 1, 3)
+    assert plan.prefix_products == (1, 3, 30, 30, 90)
+    assert plan.suffix_products == (90, 30, 3, 3, 1)
+    assert plan.total == 90
+    assert plan.slot_chars[2] == "-"
+
+
+def test_compile_plan_is_shared():
+    """Одинаковые шаблоны компилируются один раз."""
+    assert compile_plan("AA000AA", "ABC") is compile_plan("AA000AA", "ABC")
+
+
+def test_repository_builds_plans():
+    """Репозиторий компилирует план для каждой страны при загрузке."""
+    repository = CountryRepository()
+    compiled = repository.get_compiled()
+
+    assert len(compiled) == len(repository.get_all())
+    for country, plan in compiled:
+        assert plan.pattern == country.pattern.upper()
+        assert repository.get_plan(country.country_code) is plan
@@ -0,0 +1,114 @@
+import pstats
+
+from app.api.deps import get_plate_service
+from app.api.middleware import ProfilingMiddleware
+from app.core.profiling import RequestProfile
+from app.services.executor import ComputeExecutor
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def _busy(n: int) -> int:
+    """Нагрузка, которая наверняка попадёт в сэмплы."""
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def _profiled_app(directory) -> FastAPI:
+    """Приложение, считающее запрос через PlateService в пуле потоков."""
+    app = FastAPI()
+    executor = ComputeExecutor(mode="thread", max_workers=1)
+
+    @app.get("/check/{query}")
+    async def check(query: str):
+        results = await executor.run(get_plate_service(), "check_plate", query)
+        return {"count": len(results)}
+
+    app.add_middleware(ProfilingMiddleware, directory=str(directory))
+    return app
+
+
+def test_collapsed_profile_contains_worker_stacks(tmp_path):
+    """Сэмплы потока, выполняющего run, сворачиваются в стеки с его функциями."""
+    profile = RequestProfile("collapsed")
+    profile.start()
+    profile.run(lambda: _busy(2_000_000))
+    profile.stop()
+
+    path = tmp_path / "profile.collapsed.txt"
+    profile.dump(str(path))
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    assert any("_busy (" in line and "test_profiling.py" in line for line in lines)
+
+
+def test_request_without_header_is_not_profiled(tmp_path):
+    """Без X-Profile запрос проходит как обычно и файл не пишется."""
+    with TestClient(_profiled_app(tmp_path)) as client:
+        response = client.get("/check/777")
+
+    assert response.status_code == 200
+    assert "x-profile-file" not in response.headers
+    assert not list(tmp_path.iterdir())
+
+
+def test_profiled_request_includes_service_calls(tmp_path):
+    """Профиль pstats сводит поток event loop и поток пула с расчётом сервиса."""
+    with TestClient(_profiled_app(tmp_path)) as client:
+        response = client.get("/check/Q7Z", headers={"X-Profile": "pstats"})
+        invalid = client.get("/check/777", headers={"X-Profile": "flame"})
+
+    assert response.status_code == 200
+    assert invalid.status_code == 400
+
+    stats = pstats.Stats(response.headers["x-profile-file"])
+    functions = {(file, name) for file, _, name in stats.stats}
+    assert any(
+        file.endswith("plate_service.py") and name == "check_plate"
+        for file, name in functions
+    )
+    # Обработчик выполнялся в потоке event loop и тоже попал в профиль
+    assert any(name == "check" for _, name in functions)
+
+
+def test_busy_cprofile_falls_back_to_sampler(tmp_path):
+    """Пока cProfile занят другим профилем, запрос pstats сэмплируется."""
+    first = RequestProfile("pstats")
+    first.start()
+    try:
+        second = RequestProfile("pstats")
+        second.start()
+        second.run(lambda: _busy(2_000_000))
+        second.stop()
+    finally:
+        first.stop()
+
+    assert first.format == "pstats"
+    assert second.format == "collapsed"
+    path = tmp_path / "profile.collapsed.txt"
+    second.dump(str(path))
+    assert "_busy (" in path.read_text(encoding="utf-8")
+
+    # После остановки первого профиля cProfile снова свободен
+    third = RequestProfile("pstats")
+    third.start()
+    third.run(lambda: _busy(1000))
+    third.stop()
+    assert third.format == "pstats"
+
+
+def test_profiled_request_with_busy_cprofile(tmp_path):
+    """Middleware пишет сэмплированный профиль, если cProfile уже занят."""
+    busy = RequestProfile("pstats")
+    busy.start()
+    try:
+        with TestClient(_profiled_app(tmp_path)) as client:
+            response = client.get("/check/Q7Z", headers={"X-Profile": "pstats"})
+    finally:
+        busy.stop()
+
+    assert response.status_code == 200
+    assert response.headers["x-profile-file"].endswith(".collapsed.txt")
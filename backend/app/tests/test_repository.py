@@ -0,0 +1,251 @@
+import os
+import shutil
+import time
+from pathlib import Path
+
+from app.core import snapshot_file
+from app.core.geo import DistanceMatrix
+from app.core.packed import PackedPlans, np
+from app.core.repository import CountryRepository
+from app.core.snapshot import DatasetSnapshot
+
+DATA_FILE = Path(__file__).parent.parent.parent / "data" / "countries.csv"
+
+
+def _wait_for_version(repository: CountryRepository, version: int) -> None:
+    deadline = time.monotonic() + 5
+    while repository.version < version and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def _copy_data(tmp_path: Path) -> Path:
+    path = tmp_path / "countries.csv"
+    shutil.copy(DATA_FILE, path)
+    return path
+
+
+def _drop_last_country(path: Path) -> None:
+    lines = path.read_text(encoding="utf-8").splitlines(keepends=True)
+    path.write_text("".join(lines[:-1]), encoding="utf-8")
+    # mtime меняется явно: разрешение часов ФС бывает грубым
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_reload_publishes_new_snapshot(tmp_path):
+    """Перезагрузка подменяет снимок целиком, старый снимок не меняется."""
+    path = _copy_data(tmp_path)
+    repository = CountryRepository(path)
+    old = repository.get_snapshot()
+
+    _drop_last_country(path)
+    repository.reload()
+    new = repository.get_snapshot()
+
+    assert new.version == old.version + 1
+    assert len(new.countries) == len(old.countries) - 1
+    assert len(new.index) == len(new.scoring_plans)
+    assert len(new.compiled) == len(new.countries)
+    # Запросы, взявшие старый снимок, продолжают работать с согласованными данными
+    assert len(old.index) == len(old.scoring_plans)
+    assert len(old.compiled) == len(old.countries)
+
+
+def test_watch_reloads_in_background(tmp_path):
+    """Изменение файла замечается по mtime и подхватывается в фоне."""
+    path = _copy_data(tmp_path)
+    repository = CountryRepository(path, watch_interval=0.01)
+    before = len(repository.get_all())
+
+    _drop_last_country(path)
+    time.sleep(0.02)
+    repository.get_snapshot()  # возвращает текущий снимок, не дожидаясь загрузки
+    _wait_for_version(repository, 2)
+
+    assert repository.version == 2
+    assert len(repository.get_all()) == before - 1
+
+
+def test_failed_reload_keeps_snapshot(tmp_path):
+    """Ошибка фоновой перезагрузки оставляет прежнюю версию данных."""
+    path = _copy_data(tmp_path)
+    repository = CountryRepository(path)
+    snapshot = repository.get_snapshot()
+
+    path.write_text("country_code,pattern\nXX,AAA\n", encoding="utf-8")
+    assert repository.reload_in_background()
+    deadline = time.monotonic() + 5
+    while repository._reload_lock.locked() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert repository.get_snapshot() is snapshot
+
+
+def test_admin_reload_requires_token(client, monkeypatch):
+    """Эндпоинт перезагрузки скрыт без токена и проверяет заголовок."""
+    from app.core.config import Settings
+
+    monkeypatch.setattr(
+        "app.api.routes.admin.get_settings", lambda: Settings(admin_token="")
+    )
+    assert client.post("/admin/reload").status_code == 404
+
+    monkeypatch.setattr(
+        "app.api.routes.admin.get_settings", lambda: Settings(admin_token="secret")
+    )
+    assert client.post("/admin/reload", headers={"X-Admin-Token": "bad"}).status_code == 403
+
+    response = client.post("/admin/reload", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 202
+    assert response.json()["status"] in ("started", "in_progress")
+
+
+def test_binary_snapshot_roundtrip(tmp_path, monkeypatch):
+    """Снимок восстанавливает все производные структуры без пересборки."""
+    path = _copy_data(tmp_path)
+    from_csv = CountryRepository(path).get_snapshot()
+
+    out = tmp_path / "snapshots" / "countries.bin"
+    assert snapshot_file.main(["--csv", str(path), "--out", str(out)]) == 0
+    assert snapshot_file.read_snapshot(out, snapshot_file.source_digest(path))
+
+    def rebuild(*args, **kwargs):
+        raise AssertionError("snapshot must not be rebuilt")
+
+    monkeypatch.setattr(DatasetSnapshot, "build", rebuild)
+    monkeypatch.setattr(PackedPlans, "from_plans", rebuild)
+    monkeypatch.setattr(DistanceMatrix, "from_points", rebuild)
+    snapshot = CountryRepository(path, snapshot_file=out).get_snapshot()
+
+    assert snapshot.version == 1
+    assert snapshot.source_mtime == from_csv.source_mtime
+    assert snapshot.countries == from_csv.countries
+    assert snapshot.scoring_plans == from_csv.scoring_plans
+    assert snapshot.formats == from_csv.formats
+    assert snapshot.plan_countries == from_csv.plan_countries
+    assert snapshot.compiled == from_csv.compiled
+    assert snapshot.index == from_csv.index
+    assert snapshot.digest == from_csv.digest
+    if np is None:
+        return
+    for name in (
+        "slot_classes",
+        "option_counts",
+        "suffix_products",
+        "membership",
+        "int64_safe",
+    ):
+        expected = getattr(from_csv.packed, name)
+        assert np.array_equal(getattr(snapshot.packed, name), expected)
+    assert snapshot.packed.alphabet == from_csv.packed.alphabet
+    assert np.array_equal(snapshot.distances.values, from_csv.distances.values)
+
+
+def test_stale_or_broken_snapshot_falls_back_to_csv(tmp_path):
+    """Устаревший или повреждённый снимок игнорируется, данные читаются из CSV."""
+    path = _copy_data(tmp_path)
+    snapshot_file.main(["--csv", str(path)])
+    repository = CountryRepository(path)
+    total = len(repository.get_all())
+
+    _drop_last_country(path)
+    assert snapshot_file.read_snapshot(
+        repository.snapshot_file, snapshot_file.source_digest(path)
+    ) is None
+    repository.reload()
+    assert len(repository.get_all()) == total - 1
+
+    repository.snapshot_file.write_bytes(b"SLDS\x01\x00garbage")
+    repository.reload()
+    assert len(repository.get_all()) == total - 1
+
+
+def test_listeners_see_each_snapshot(tmp_path):
+    """Подписчики вызываются после публикации каждого снимка; их ошибки не мешают."""
+    path = _copy_data(tmp_path)
+    repository = CountryRepository(path)
+    seen = []
+
+    def broken(snapshot):
+        raise RuntimeError("boom")
+
+    repository.subscribe(broken)
+    repository.subscribe(lambda snapshot: seen.append(snapshot.version))
+    repository.get_snapshot()
+    repository.reload()
+
+    assert seen == [1, 2]
+    assert repository.version == 2
+
+
+def test_binary_snapshot_keeps_formats(tmp_path):
+    """Несколько форматов страны с долями переживают бинарный снимок."""
+    path = tmp_path / "countries.csv"
+    path.write_text(
+        "country_code,country_name,pattern,allowed_letters,lat,lng,weights\n"
+        "RU,Россия,A000AA|AA000,ABEKMHOPCTYX,61.5,105.3,0.2|0.8\n"
+        "BY,Беларусь,0000AA-0,ABCEHIKMOPTX,53.7,27.9,\n",
+        encoding="utf-8",
+    )
+    from_csv = CountryRepository(path).get_snapshot()
+    assert snapshot_file.main(["--csv", str(path)]) == 0
+    assert snapshot_file.read_snapshot(
+        snapshot_file.snapshot_path(path), snapshot_file.source_digest(path)
+    )
+    loaded = CountryRepository(path).get_snapshot()
+
+    assert loaded.countries == from_csv.countries
+    assert loaded.formats == from_csv.formats
+    assert loaded.digest == from_csv.digest
+    assert loaded.countries[0].pattern == "AA000"
+    assert [p.pattern for p in loaded.scoring_plans] == ["A000AA", "AA000", "0000AA-0"]
+
+
+def test_digest_tracks_content_not_version(tmp_path):
+    """Хеш данных не зависит от версии снимка и меняется вместе с CSV."""
+    path = _copy_data(tmp_path)
+    repository = CountryRepository(path)
+    first = repository.get_snapshot()
+
+    repository.reload()
+    reloaded = repository.get_snapshot()
+    assert reloaded.version != first.version
+    assert reloaded.digest == first.digest
+
+    # Новый процесс с теми же данными — тот же хеш
+    assert CountryRepository(path).get_snapshot().digest == first.digest
+
+    path.write_text(
+        path.read_text(encoding="utf-8").replace("Россия", "Russia"), encoding="utf-8"
+    )
+    assert CountryRepository(path).get_snapshot().digest != first.digest
+
+
+def test_concurrent_cold_start_loads_once(tmp_path, monkeypatch):
+    """Одновременные первые запросы получают один снимок, данные читаются раз."""
+    import threading
+
+    repository = CountryRepository(_copy_data(tmp_path))
+    loads = []
+    original = CountryRepository._read_csv
+
+    def slow_read(self):
+        loads.append(threading.current_thread().name)
+        time.sleep(0.1)
+        return original(self)
+
+    monkeypatch.setattr(CountryRepository, "_read_csv", slow_read)
+
+    snapshots = []
+    threads = [
+        threading.Thread(target=lambda: snapshots.append(repository.get_snapshot()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loads) == 1
+    assert {s.version for s in snapshots} == {1}
+    assert all(s is snapshots[0] for s in snapshots)
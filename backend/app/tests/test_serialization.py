@@ -0,0 +1,68 @@
+import json
+
+from app.api.serialization import (
+    encode_batch_response,
+    encode_result,
+    encode_search_response,
+)
+from app.core.repository import CountryRepository
+from app.schemas.search import BatchSearchItem, BatchSearchResponse, SearchResponse
+from app.services.plate_service import PlateService
+
+
+def test_encoded_results_match_pydantic(calculator):
+    """Быстрый сериализатор выдаёт тот же JSON, что и model_dump_json."""
+    service = PlateService(CountryRepository(), calculator)
+
+    for lang in ("ru", "en"):
+        for examples in ("full", "compact", "none"):
+            results = service.check_plate("7A", lang, examples=examples)
+            assert results
+            for result in results:
+                assert json.loads(encode_result(result)) == json.loads(
+                    result.model_dump_json()
+                )
+
+            expected = SearchResponse(
+                results=results,
+                total_results=len(results),
+                max_probability=max(r.probability for r in results),
+            )
+            encoded = encode_search_response(results, len(results))
+            assert json.loads(encoded) == json.loads(expected.model_dump_json())
+
+    # total_results считается без учёта лимита
+    search = service.search_plates(["77"], limit=2)[0]
+    assert len(search.results) == 2 < search.total
+    expected = SearchResponse(
+        results=search.results,
+        total_results=search.total,
+        max_probability=search.results[0].probability,
+    )
+    encoded = encode_search_response(search.results, search.total)
+    assert json.loads(encoded) == json.loads(expected.model_dump_json())
+
+
+def test_encoded_batch_matches_pydantic(calculator):
+    """Пакетный ответ, включая пустой список результатов, совпадает со схемой."""
+    service = PlateService(CountryRepository(), calculator)
+    queries = ["77", "QQQQQQQQQQ"]
+    batch = [
+        (search.results, search.total)
+        for search in service.search_plates(queries, limit=3)
+    ]
+
+    expected = BatchSearchResponse(
+        items=[
+            BatchSearchItem(
+                query=query,
+                results=results,
+                total_results=total,
+                max_probability=max((r.probability for r in results), default=0.0),
+            )
+            for query, (results, total) in zip(queries, batch)
+        ]
+    )
+    assert json.loads(encode_batch_response(queries, batch)) == json.loads(
+        expected.model_dump_json()
+    )
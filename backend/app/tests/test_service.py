@@ -1,12 +1,12 @@
-from unittest.mock import MagicMock
+import pytest
 
+from app.core.repository import CountryRepository
 from app.schemas.country import CountrySchema
 from app.services.plate_service import PlateService
 
 
 def test_check_plate_sorting(calculator):
     """Проверка, что результаты сортируются по вероятности (от большей к меньшей)."""
-    repo_mock = MagicMock()
 
     # Страна А: вероятность будет низкой (мало вариантов)
     c1 = CountrySchema(
@@ -29,9 +29,9 @@ def test_check_plate_sorting(calculator):
         allowed_letters="",
     )
 
-    repo_mock.get_all.return_value = [c1, c2]
+    repository = CountryRepository.from_countries([c1, c2])
 
-    service = PlateService(repo_mock, calculator)
+    service = PlateService(repository, calculator)
     results = service.check_plate("7")
 
     assert len(results) == 2
@@ -41,20 +41,73 @@ def test_check_plate_sorting(calculator):
 
 
 def test_suggestions_generation(calculator):
-    """Тест генерации подсказок (Leet speak)."""
-    repo_mock = MagicMock()
-    service = PlateService(repo_mock, calculator)
+    """Варианты с похожими символами ранжируются по лучшей вероятности."""
+    from app.services.suggestions import LookalikeSearch
 
-    # BOSS -> B0SS, 80SS, etc.
+    repository = CountryRepository()
+    service = PlateService(repository, calculator)
+
+    # BOSS -> 8055, B055, ...
     suggestions = service.get_suggestions("BOSS")
+    assert 0 < len(suggestions) <= 5
+    assert "BOSS" not in suggestions
+
+    snapshot = repository.get_snapshot()
+    search = LookalikeSearch(snapshot, calculator)
+    scores = [search.best_probability(s) for s in suggestions]
+    assert scores == sorted(scores, reverse=True)
+    assert scores[0] > search.best_probability("BOSS")
+
+
+def test_search_plate_combines_results_and_suggestions(calculator):
+    """search_plate возвращает результаты check_plate и варианты за один вызов."""
+    service = PlateService(CountryRepository(), calculator)
+
+    search = service.search_plate("BOSS", "en", limit=3, examples="none")
+    expected = service.check_plate("BOSS", "en", limit=3, examples="none")
+    assert [r.country_code for r in search.results] == [
+        r.country_code for r in expected
+    ]
+    assert search.suggestions == service.get_suggestions("BOSS")
+
+
+def test_suggestions_best_first_matches_exhaustive(calculator):
+    """Поиск с оценками находит тот же лучший вариант, что и полный перебор."""
+    from itertools import product
+
+    from app.services.suggestions import LOOKALIKES, LookalikeSearch
+
+    repository = CountryRepository()
+    snapshot = repository.get_snapshot()
+    search = LookalikeSearch(snapshot, calculator)
+
+    query = "SOS0"
+    variants = {
+        "".join(v) for v in product(*[(c, LOOKALIKES[c]) for c in query])
+    } - {query}
+    best = max(search.best_probability(v) for v in variants)
 
-    assert "80SS" in suggestions
-    assert len(suggestions) > 0
+    found = search.search(query, limit=1)
+    assert abs(found[0].best_probability - best) < 1e-9
+    assert search.search("777") == []
+
+
+def test_suggestion_scores_match_check(calculator):
+    """Число стран и лучшая вероятность варианта совпадают с выдачей /check."""
+    from app.services.suggestions import LookalikeSearch
+
+    repository = CountryRepository()
+    service = PlateService(repository, calculator)
+    search = LookalikeSearch(repository.get_snapshot(), calculator)
+
+    for query in ["777", "BOSS", "8055"]:
+        results = service.check_plate(query, examples="none")
+        assert search.countries(query) == len(results)
+        assert search.best_probability(query) == results[0].probability
 
 
 def test_route_nearest_neighbor(calculator):
     """Тест построения маршрута методом ближайшего соседа."""
-    repo_mock = MagicMock()
 
     # Создаем 3 страны с одинаковым шаблоном (чтобы вероятность была > 0)
     # Расположим их на одной линии: User(0,0) -> Near(1,1) -> Mid(5,5) -> Far(10,10)
@@ -68,9 +121,9 @@ def test_route_nearest_neighbor(calculator):
         country_code="MM", country_name="Mid", pattern="0", lat=5, lng=5
     )
 
-    repo_mock.get_all.return_value = [c_far, c_near, c_mid]
+    repository = CountryRepository.from_countries([c_far, c_near, c_mid])
 
-    service = PlateService(repo_mock, calculator)
+    service = PlateService(repository, calculator)
 
     # Запрос "7" даст совпадение во всех странах
     segments = service.create_luck_route("7", user_lat=0, user_lng=0)
@@ -85,3 +138,299 @@ def test_route_nearest_neighbor(calculator):
 
     # Проверка генерации ссылок
     assert "google.com/travel/flights" in segments[0].booking_url
+
+
+def test_check_plates_matches_single(calculator):
+    """Пакетная проверка совпадает с поштучной и поддерживает limit."""
+    repository = CountryRepository()
+    service = PlateService(repository, calculator)
+
+    queries = ["777", "A7", "BOSS", "777"]
+    batch = service.check_plates(queries)
+    for query, results in zip(queries, batch):
+        single = service.check_plate(query)
+        assert [(r.country_code, r.probability) for r in results] == [
+            (r.country_code, r.probability) for r in single
+        ]
+
+    top = service.check_plates(["777"], limit=2)[0]
+    assert [r.country_code for r in top] == [r.country_code for r in batch[0][:2]]
+
+
+def test_top_k_reuses_full_ranking(calculator, monkeypatch):
+    """Top-K со скалярным движком совпадает с полной сортировкой без пересчёта."""
+    from app.services.cache import ResultCache
+    from app.services.matcher import QueryMatcher
+
+    repository = CountryRepository()
+    service = PlateService(
+        repository, calculator, cache=ResultCache(max_size=100), engine="scalar"
+    )
+
+    calls = []
+    original = QueryMatcher.count
+
+    def counting(self, plan):
+        calls.append(plan)
+        return original(self, plan)
+
+    monkeypatch.setattr(QueryMatcher, "count", counting)
+
+    for query in ["777", "BOSS", "A7"]:
+        full = service.check_plate(query)
+        calls.clear()
+        top = service.check_plate(query, limit=3)
+
+        assert [(r.country_code, r.probability) for r in top] == [
+            (r.country_code, r.probability) for r in full[:3]
+        ]
+        assert calls == []
+
+
+def test_top_k_cache_miss_prunes_by_bound(calculator, monkeypatch):
+    """Лимит без кэша считает меньше шаблонов, но выдача и total точные."""
+    from app.services.matcher import QueryMatcher
+
+    repository = CountryRepository()
+    full_service = PlateService(repository, calculator, engine="scalar")
+
+    calls = []
+    original = QueryMatcher.count
+
+    def counting(self, plan):
+        calls.append(plan)
+        return original(self, plan)
+
+    for query in ["777", "BOSS", "A7", "7?7", "QQQQQQQQQQ"]:
+        full = full_service.search_plates([query])[0]
+        monkeypatch.setattr(QueryMatcher, "count", counting)
+        for limit in (1, 3, 10):
+            for min_probability in (None, 0.0, 0.5):
+                service = PlateService(repository, calculator, engine="scalar")
+                calls.clear()
+                top = service.search_plates([query], "ru", limit, min_probability)[0]
+
+                expected = [
+                    r
+                    for r in full.results
+                    if min_probability is None or r.probability >= min_probability
+                ]
+                assert [(r.country_code, r.probability) for r in top.results] == [
+                    (r.country_code, r.probability) for r in expected[:limit]
+                ]
+                assert top.total == len(expected)
+        monkeypatch.setattr(QueryMatcher, "count", original)
+
+    calls.clear()
+    monkeypatch.setattr(QueryMatcher, "count", counting)
+    PlateService(repository, calculator, engine="scalar").check_plate("777")
+    unlimited = len(calls)
+    calls.clear()
+    PlateService(repository, calculator, engine="scalar").check_plate("777", limit=1)
+    assert len(calls) < unlimited
+
+
+def test_min_probability_filter(calculator):
+    """min_probability отсекает страны с меньшей вероятностью в обоих движках."""
+    repository = CountryRepository()
+
+    for engine in ("scalar", "vectorized"):
+        service = PlateService(repository, calculator, engine=engine)
+        full = service.check_plate("77")
+        threshold = full[len(full) // 2].probability
+
+        filtered = service.check_plate("77", min_probability=threshold)
+        assert [r.country_code for r in filtered] == [
+            r.country_code for r in full if r.probability >= threshold
+        ]
+
+
+def test_route_is_optimal_for_small_n(calculator):
+    """Маршрут из точки пользователя короче жадного и совпадает с полным перебором."""
+    from itertools import permutations
+
+    from app.core.geo import haversine
+
+    # Жадный обход из (0, 0) уходит в A, затем вынужден возвращаться через старт
+    points = {"AA": (0, 1), "BB": (0, -1.5), "CC": (0, 3), "DD": (0, -4)}
+    countries = [
+        CountrySchema(country_code=code, country_name=code, pattern="0", lat=lat, lng=lng)
+        for code, (lat, lng) in points.items()
+    ]
+    service = PlateService(CountryRepository.from_countries(countries), calculator)
+
+    def length(codes):
+        path = [(0, 0)] + [points[c] for c in codes]
+        return sum(haversine(*a, *b) for a, b in zip(path, path[1:]))
+
+    segments = service.create_luck_route("7", user_lat=0, user_lng=0, max_stops=10)
+    route = [s.country_code for s in segments]
+
+    assert sorted(route) == sorted(points)
+    assert abs(length(route) - min(length(p) for p in permutations(points))) < 1e-6
+
+
+def test_route_two_opt_improves_nearest_neighbor():
+    """Для больших маршрутов 2-opt не хуже ближайшего соседа и посещает все узлы."""
+    import random
+
+    from app.core.geo import DistanceMatrix
+    from app.services.route import _nearest_neighbor, optimize_path, path_length
+
+    rng = random.Random(7)
+    lats = [rng.uniform(-60, 70) for _ in range(41)]
+    lngs = [rng.uniform(-180, 180) for _ in range(41)]
+    dist = DistanceMatrix.from_points(lats, lngs).values
+
+    order = optimize_path(dist)
+    assert sorted(order) == list(range(1, 41))
+    assert path_length(dist, order) <= path_length(dist, _nearest_neighbor(dist)) + 1e-6
+
+
+def test_shared_formats_scored_once(calculator, monkeypatch):
+    """Шаблон, общий для стран и форматов, считается один раз на запрос."""
+    from app.services.matcher import QueryMatcher
+
+    def country(code: str, pattern: str, weights: str = "") -> CountrySchema:
+        return CountrySchema(
+            country_code=code,
+            country_name=code,
+            pattern=pattern,
+            weights=weights,
+            allowed_letters="ABC",
+            lat=0,
+            lng=0,
+        )
+
+    countries = [
+        country("AA", "AA00"),
+        country("BB", "AA00"),
+        country("CC", "AA00|000", "1|3"),
+        country("DD", "A0A0|AA00"),
+    ]
+    repository = CountryRepository.from_countries(countries)
+    assert len(repository.get_snapshot().scoring_plans) == 3
+
+    calls = []
+    original = QueryMatcher.count
+
+    def counting(self, plan):
+        calls.append(plan.pattern)
+        return original(self, plan)
+
+    expected = {
+        c.country_code: calculator.calculate_probability("0", c).probability
+        for c in countries
+    }
+    for engine in ("scalar", "vectorized"):
+        service = PlateService(repository, calculator, engine=engine)
+        results = service.check_plate("0")
+        probabilities = {r.country_code: r.probability for r in results}
+        assert probabilities == pytest.approx(expected)
+
+    service = PlateService(repository, calculator, engine="scalar")
+    monkeypatch.setattr(QueryMatcher, "count", counting)
+    calls.clear()
+    service._count_many(["0"], repository.get_snapshot())
+    assert sorted(calls) == ["000", "A0A0", "AA00"]
+
+
+def test_concurrent_identical_queries_are_coalesced(calculator, monkeypatch):
+    """Одинаковые одновременные запросы, включая маршрут, ждут один расчёт."""
+    import threading
+    import time
+
+    repository = CountryRepository()
+    repository.get_snapshot()
+    service = PlateService(repository, calculator)
+
+    calls = []
+    original = PlateService._count_many
+
+    def slow_count(self, queries, *args, **kwargs):
+        calls.append(tuple(queries))
+        time.sleep(0.2)
+        return original(self, queries, *args, **kwargs)
+
+    monkeypatch.setattr(PlateService, "_count_many", slow_count)
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.check_plate("777")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("777",)]
+    assert service.inflight.stats()["coalesced"] == 7
+    assert all(r == results[0] for r in results)
+
+    # create_luck_route объединяется с такими же маршрутами
+    calls.clear()
+    routes = []
+    threads = [
+        threading.Thread(target=lambda: routes.append(service.create_luck_route("A7")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [("A7",)]
+    assert all(r == routes[0] for r in routes)
+
+
+def test_mixed_calls_share_per_query_computation(calculator, monkeypatch):
+    """/check, маршрут и пакет с тем же запросом ждут один расчёт этого запроса."""
+    import threading
+    import time
+
+    repository = CountryRepository()
+    repository.get_snapshot()
+    service = PlateService(repository, calculator)
+
+    calls = []
+    original = PlateService._count_many
+
+    def slow_count(self, queries, *args, **kwargs):
+        calls.append(tuple(queries))
+        time.sleep(0.3)
+        return original(self, queries, *args, **kwargs)
+
+    monkeypatch.setattr(PlateService, "_count_many", slow_count)
+
+    leader = threading.Thread(target=lambda: service.check_plate("BOSS"))
+    leader.start()
+    time.sleep(0.1)
+
+    outputs = {}
+    followers = [
+        threading.Thread(
+            target=lambda: outputs.update(route=service.create_luck_route("BOSS"))
+        ),
+        threading.Thread(
+            target=lambda: outputs.update(
+                batch=service.check_plates(["BOSS", "A7"], limit=3)
+            )
+        ),
+        threading.Thread(
+            target=lambda: outputs.update(
+                compact=service.check_plate("BOSS", examples="compact")
+            )
+        ),
+    ]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    # Пакет считает только запрос, который никто не считал
+    assert sorted(calls) == [("A7",), ("BOSS",)]
+    assert service.inflight.stats()["coalesced"] == 3
+    assert [r.country_code for r in outputs["batch"][0]] == [
+        s.country_code for s in outputs["route"][:3]
+    ]
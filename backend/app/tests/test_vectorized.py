@@ -0,0 +1,56 @@
+import pytest
+
+from app.core.packed import PackedPlans
+from app.core.plan import compile_plan
+from app.core.repository import CountryRepository
+from app.services.matcher import QueryMatcher
+from app.services.plate_service import PlateService
+
+pytest.importorskip("numpy")
+from app.services.vectorized import count_matches, count_matches_many  # noqa: E402
+
+QUERIES = ["7", "77", "777", "0000", "A", "AA", "A7", "7A", "BOSS", "AB-", "-", "S7", "KA", "Я"]
+PATTERN_QUERIES = ["7?7", "@77", "###", "[ABE]7", "[0-3]?", "?", "@@@#"]
+
+
+def test_vectorized_parity_with_scalar():
+    """Векторизованный движок совпадает со скалярным на всём countries.csv."""
+    snapshot = CountryRepository().get_snapshot()
+    packed = snapshot.packed
+
+    for query in QUERIES + PATTERN_QUERIES:
+        matcher = QueryMatcher(query)
+        expected = [matcher.count(plan) for plan in snapshot.scoring_plans]
+        assert count_matches(query, packed) == expected, query
+
+
+def test_vectorized_batch_parity():
+    """Пакетный подсчет по запросам разной длины совпадает с поштучным."""
+    packed = CountryRepository().get_packed()
+
+    queries = QUERIES + PATTERN_QUERIES
+    batch = count_matches_many(queries, packed)
+    assert batch == [count_matches(query, packed) for query in queries]
+
+
+def test_vectorized_large_totals_fall_back():
+    """Шаблоны вне диапазона int64 досчитываются скалярно и остаются точными."""
+    plans = [compile_plan("A" * 20), compile_plan("AA0")]
+    packed = PackedPlans.from_plans(plans)
+
+    assert not packed.int64_safe[0]
+    assert count_matches("AB", packed) == [
+        QueryMatcher("AB").count(plan) for plan in plans
+    ]
+
+
+def test_service_engines_agree(calculator):
+    """Сервис возвращает одинаковые вероятности в обоих режимах."""
+    repository = CountryRepository()
+    vectorized = PlateService(repository, calculator, engine="vectorized")
+    scalar = PlateService(repository, calculator, engine="scalar")
+
+    for query in ["777", "BOSS", "A7", "7?7", "[AB]#"]:
+        fast = [(r.country_code, r.probability) for r in vectorized.check_plate(query)]
+        slow = [(r.country_code, r.probability) for r in scalar.check_plate(query)]
+        assert fast == slow
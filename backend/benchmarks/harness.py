@@ -0,0 +1,129 @@
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Результат одного бенчмарка.
+
+    Attributes:
+        name (str): Имя бенчмарка ("стадия/сценарий").
+        ops_per_sec (float): Лучшая пропускная способность среди повторов.
+        mean_us (float): Среднее время одной операции в лучшем повторе, мкс.
+        alloc_kib (float): Пиковый объём памяти, выделенной за одну операцию, КиБ.
+        iterations (int): Число операций в одном повторе.
+    """
+
+    name: str
+    ops_per_sec: float
+    mean_us: float
+    alloc_kib: float
+    iterations: int
+
+
+def measure(
+    name: str,
+    func: Callable[[], object],
+    iterations: int = 100,
+    repeats: int = 5,
+) -> BenchmarkResult:
+    """
+    Замеряет func: лучший из repeats прогонов по iterations вызовов
+    и отдельно — пиковые аллокации одного вызова через tracemalloc.
+    """
+    func()  # прогрев кэшей и ленивых структур
+
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    per_op = best / iterations
+    return BenchmarkResult(
+        name=name,
+        ops_per_sec=1.0 / per_op if per_op > 0 else float("inf"),
+        mean_us=per_op * 1e6,
+        alloc_kib=max(peak - base, 0) / 1024,
+        iterations=iterations,
+    )
+
+
+def save_baseline(results: List[BenchmarkResult], path: Path) -> None:
+    """Сохраняет результаты как базовую линию в JSON."""
+    payload = {r.name: asdict(r) for r in results}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, dict]]:
+    """Читает базовую линию или возвращает None, если файла нет."""
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def compare(
+    results: List[BenchmarkResult],
+    baseline: Dict[str, dict],
+    threshold: float,
+) -> List[str]:
+    """
+    Сравнивает результаты с базовой линией.
+
+    Регрессией считается падение ops/sec или рост аллокаций больше,
+    чем на долю threshold.
+
+    Returns:
+        List[str]: Описания регрессий (пустой список — всё в норме).
+    """
+    regressions = []
+    for result in results:
+        base = baseline.get(result.name)
+        if base is None:
+            continue
+
+        if result.ops_per_sec < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{result.name}: {result.ops_per_sec:,.0f} ops/s "
+                f"vs baseline {base['ops_per_sec']:,.0f} ops/s"
+            )
+        # Мелкие аллокации шумят, поэтому сравниваем с допуском в 1 КиБ
+        if result.alloc_kib > base["alloc_kib"] * (1 + threshold) + 1:
+            regressions.append(
+                f"{result.name}: {result.alloc_kib:,.1f} KiB/op "
+                f"vs baseline {base['alloc_kib']:,.1f} KiB/op"
+            )
+    return regressions
+
+
+def format_table(
+    results: List[BenchmarkResult], baseline: Optional[Dict[str, dict]] = None
+) -> str:
+    """Форматирует результаты таблицей (с изменением к базовой линии)."""
+    lines = [
+        f"{'benchmark':<48} {'ops/sec':>12} {'us/op':>10} {'KiB/op':>9} {'vs base':>8}"
+    ]
+    for r in results:
+        delta = ""
+        if baseline and r.name in baseline:
+            delta = f"{r.ops_per_sec / baseline[r.name]['ops_per_sec'] - 1:+.0%}"
+        lines.append(
+            f"{r.name:<48} {r.ops_per_sec:>12,.0f} {r.mean_us:>10,.1f} "
+            f"{r.alloc_kib:>9,.1f} {delta:>8}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,349 @@
+"""
+Нагрузочное тестирование HTTP API с перцентилями задержек.
+
+Генератор воспроизводит смесь вызовов /check, /route и /countries
+с запросами из корпуса с распределением Ципфа (популярные комбинации
+встречаются намного чаще редких) на нескольких уровнях параллельности.
+Приложение app.main:app запускается в том же процессе: через ASGI-транспорт
+httpx (без сети) или в локальном uvicorn (через TCP).
+
+Запуск из каталога backend:
+
+    python -m benchmarks.load                                  # ASGI, 1/8/32 клиента
+    python -m benchmarks.load --target uvicorn --concurrency 4,16,64
+    python -m benchmarks.load --mix check=8,route=1,countries=1 --requests 2000
+    python -m benchmarks.load --save load.json                 # сохранить замеры
+    python -m benchmarks.load --baseline load.json             # сравнить с замерами
+
+Настройки приложения (кэш, исполнитель, контроль допуска) берутся
+из переменных окружения BACKEND_*, как при обычном запуске.
+Отклонённые запросы (429/503) учитываются отдельно от ошибок.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+from benchmarks.run import REALISTIC_QUERIES
+
+# Точка пользователя для /route (Москва)
+ROUTE_ORIGIN = {"user_lat": 55.75, "user_lng": 37.61}
+DEFAULT_MIX = "check=7,route=1,countries=2"
+ALPHABET = "ABCEHKMOPTX0123456789"
+
+
+@dataclass
+class LoadResult:
+    """
+    Результат одного маршрута на одном уровне параллельности.
+
+    Attributes:
+        concurrency (int): Число одновременных клиентов.
+        endpoint (str): Маршрут ("check", "route", "countries" или "all").
+        requests (int): Число отправленных запросов.
+        rejected (int): Ответы 429/503 контроля допуска.
+        errors (int): Прочие ответы не 2xx и исключения клиента.
+        throughput (float): Успешных ответов в секунду.
+        p50_ms (float): Медиана задержки успешных ответов, мс.
+        p95_ms (float): 95-й перцентиль, мс.
+        p99_ms (float): 99-й перцентиль, мс.
+    """
+
+    concurrency: int
+    endpoint: str
+    requests: int
+    rejected: int
+    errors: int
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+def zipf_corpus(size: int, seed: int = 42) -> List[str]:
+    """
+    Корпус запросов по убыванию популярности.
+
+    Первые места занимают типичные пользовательские запросы, хвост —
+    детерминированные случайные комбинации длиной 1-4 символа.
+    """
+    rng = random.Random(seed)
+    corpus = list(dict.fromkeys(REALISTIC_QUERIES))
+    seen = set(corpus)
+    while len(corpus) < size:
+        query = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(1, 4)))
+        if query not in seen:
+            seen.add(query)
+            corpus.append(query)
+    return corpus[:size]
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Разбирает смесь вида "check=7,route=1,countries=2" в веса маршрутов."""
+    mix: Dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("check", "route", "countries"):
+            raise ValueError(f"Unknown endpoint in mix: {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def build_plan(
+    total: int, mix: Dict[str, float], corpus: Sequence[str], zipf: float, seed: int
+) -> List[Tuple[str, Optional[str]]]:
+    """Детерминированная последовательность (маршрут, запрос) для прогона."""
+    rng = random.Random(seed)
+    endpoints = list(mix)
+    kinds = rng.choices(endpoints, weights=[mix[e] for e in endpoints], k=total)
+    query_weights = [1 / rank**zipf for rank in range(1, len(corpus) + 1)]
+    queries = rng.choices(corpus, weights=query_weights, k=total)
+    return [
+        (kind, None if kind == "countries" else query)
+        for kind, query in zip(kinds, queries)
+    ]
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Перцентиль q (0-100) отсортированного списка методом ближайшего ранга."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+async def _send(
+    client: httpx.AsyncClient, kind: str, query: Optional[str]
+) -> httpx.Response:
+    if kind == "countries":
+        return await client.get("/countries")
+    if kind == "route":
+        return await client.post("/route", json={"query": query, **ROUTE_ORIGIN})
+    return await client.post("/check", json={"query": query})
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    plan: List[Tuple[str, Optional[str]]],
+    concurrency: int,
+) -> List[LoadResult]:
+    """Прогоняет план concurrency клиентами и сводит замеры по маршрутам."""
+    samples: List[Tuple[str, str, float]] = []
+    source = iter(plan)
+
+    async def worker() -> None:
+        for kind, query in source:
+            started = time.perf_counter()
+            try:
+                response = await _send(client, kind, query)
+                status = response.status_code
+                outcome = (
+                    "ok"
+                    if status < 400
+                    else "rejected" if status in (429, 503) else "error"
+                )
+            except httpx.HTTPError:
+                outcome = "error"
+            samples.append((kind, outcome, time.perf_counter() - started))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = []
+    for endpoint in sorted({kind for kind, _, _ in samples}) + ["all"]:
+        selected = [s for s in samples if endpoint in ("all", s[0])]
+        latencies = sorted(t * 1000 for _, outcome, t in selected if outcome == "ok")
+        results.append(
+            LoadResult(
+                concurrency=concurrency,
+                endpoint=endpoint,
+                requests=len(selected),
+                rejected=sum(outcome == "rejected" for _, outcome, _ in selected),
+                errors=sum(outcome == "error" for _, outcome, _ in selected),
+                throughput=len(latencies) / elapsed if elapsed > 0 else 0.0,
+                p50_ms=percentile(latencies, 50),
+                p95_ms=percentile(latencies, 95),
+                p99_ms=percentile(latencies, 99),
+            )
+        )
+    return results
+
+
+async def _drive(
+    base_url: str,
+    transport: Optional[httpx.AsyncBaseTransport],
+    plans: Dict[int, List[Tuple[str, Optional[str]]]],
+    warmup: List[Tuple[str, Optional[str]]],
+    timeout: float,
+) -> List[LoadResult]:
+    results: List[LoadResult] = []
+    connections = max(plans, default=1)
+    limits = httpx.Limits(
+        max_connections=connections, max_keepalive_connections=connections
+    )
+    async with httpx.AsyncClient(
+        base_url=base_url, transport=transport, timeout=timeout, limits=limits
+    ) as client:
+        # Прогрев: загрузка данных, пул исполнителя, кэши популярных запросов
+        await run_level(client, warmup, 1)
+        for concurrency, plan in plans.items():
+            results.extend(await run_level(client, plan, concurrency))
+    return results
+
+
+def run_asgi(plans, warmup, timeout: float) -> List[LoadResult]:
+    """Гоняет нагрузку через ASGI-транспорт httpx в том же event loop."""
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    return asyncio.run(_drive("http://loadtest", transport, plans, warmup, timeout))
+
+
+def run_uvicorn(plans, warmup, timeout: float) -> List[LoadResult]:
+    """Поднимает uvicorn на свободном локальном порту и гоняет нагрузку по TCP."""
+    import uvicorn
+
+    from app.main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, name="loadtest-uvicorn", daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            if not thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        return asyncio.run(
+            _drive(f"http://127.0.0.1:{port}", None, plans, warmup, timeout)
+        )
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_table(
+    results: List[LoadResult], baseline: Optional[List[LoadResult]] = None
+) -> str:
+    """Таблица результатов; с baseline — изменение пропускной способности и p99."""
+    base = {(r.concurrency, r.endpoint): r for r in baseline or []}
+    lines = [
+        f"{'conc':>5} {'endpoint':<10} {'reqs':>7} {'rej':>6} {'err':>5} "
+        f"{'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'Δ req/s':>8} {'Δ p99':>7}"
+    ]
+    for r in results:
+        delta_rps = delta_p99 = ""
+        old = base.get((r.concurrency, r.endpoint))
+        if old is not None:
+            if old.throughput:
+                delta_rps = f"{r.throughput / old.throughput - 1:+.0%}"
+            if old.p99_ms:
+                delta_p99 = f"{r.p99_ms / old.p99_ms - 1:+.0%}"
+        lines.append(
+            f"{r.concurrency:>5} {r.endpoint:<10} {r.requests:>7} {r.rejected:>6} "
+            f"{r.errors:>5} {r.throughput:>9,.1f} {r.p50_ms:>9,.2f} {r.p95_ms:>9,.2f} "
+            f"{r.p99_ms:>9,.2f} {delta_rps:>8} {delta_p99:>7}"
+        )
+    return "\n".join(lines)
+
+
+def save_results(
+    results: List[LoadResult], path: Path, meta: Dict[str, object]
+) -> None:
+    """Сохраняет замеры и параметры прогона в JSON."""
+    payload = {**meta, "results": [asdict(r) for r in results]}
+    path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+
+
+def load_results(path: Path) -> Tuple[Dict[str, object], List[LoadResult]]:
+    """Читает сохранённые замеры: (параметры прогона, результаты)."""
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    results = [LoadResult(**r) for r in payload.pop("results")]
+    return payload, results
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="SignLuck HTTP load test")
+    parser.add_argument("--target", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument(
+        "--concurrency", default="1,8,32", help="уровни параллельности через запятую"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=500, help="запросов на уровень параллельности"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="веса маршрутов")
+    parser.add_argument("--corpus-size", type=int, default=500)
+    parser.add_argument("--zipf", type=float, default=1.1, help="показатель Ципфа")
+    parser.add_argument("--warmup", type=int, default=50, help="запросов прогрева")
+    parser.add_argument("--timeout", type=float, default=30.0, help="таймаут, с")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", type=Path, help="сохранить замеры в JSON")
+    parser.add_argument("--baseline", type=Path, help="сравнить с сохранёнными")
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    mix = parse_mix(args.mix)
+    corpus = zipf_corpus(args.corpus_size, args.seed)
+    plans = {
+        level: build_plan(args.requests, mix, corpus, args.zipf, args.seed + level)
+        for level in levels
+    }
+    warmup = build_plan(args.warmup, mix, corpus, args.zipf, args.seed - 1)
+
+    runner = run_uvicorn if args.target == "uvicorn" else run_asgi
+    results = runner(plans, warmup, args.timeout)
+
+    baseline = None
+    if args.baseline is not None:
+        meta, baseline = load_results(args.baseline)
+        print(f"Baseline: {args.baseline} (commit {meta.get('commit') or 'unknown'})")
+    print(format_table(results, baseline))
+
+    if args.save is not None:
+        save_results(
+            results,
+            args.save,
+            {
+                "commit": _git_commit(),
+                "target": args.target,
+                "mix": mix,
+                "requests": args.requests,
+                "corpus_size": args.corpus_size,
+                "zipf": args.zipf,
+                "seed": args.seed,
+            },
+        )
+        print(f"\nResults saved to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
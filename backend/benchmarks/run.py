@@ -0,0 +1,320 @@
+"""
+Офлайн-бенчмарки горячих путей калькулятора и сервиса.
+
+Запуск из каталога backend:
+
+    python -m benchmarks.run                 # замер и сравнение с baseline
+    python -m benchmarks.run --save          # сохранить текущие замеры как baseline
+    python -m benchmarks.run --threshold 0.3 --filter service
+
+Код возврата 1, если какой-либо бенчмарк просел относительно baseline
+больше, чем на threshold.
+"""
+
+import argparse
+import csv
+import random
+import sys
+import tempfile
+from itertools import cycle
+from pathlib import Path
+from typing import Callable, Iterable, List, Tuple
+
+from app.core import snapshot_file
+from app.core.plan import compile_plan, slot_mask
+from app.core.repository import CountryRepository
+from app.schemas.country import CountrySchema
+from app.services.calculator import PlateCalculator
+from app.services.matcher import QueryMatcher
+from app.services.plate_service import PlateService
+from app.services.vectorized import count_matches
+from benchmarks.harness import (
+    BenchmarkResult,
+    compare,
+    format_table,
+    load_baseline,
+    measure,
+    save_baseline,
+)
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+# Типичные пользовательские запросы
+REALISTIC_QUERIES = [
+    "777", "BOSS", "AAA", "001", "007", "666", "123", "MAX", "KING", "A777AA",
+    "88", "1000", "TAXI", "ABC", "LOVE", "XXX", "999", "COP", "MOM", "2024",
+]
+
+# Короткие запросы против длинных шаблонов: больше всего размещений
+ADVERSARIAL_QUERIES = ["7", "A", "77", "AA", "A7", "7A"]
+ADVERSARIAL_PATTERNS = ["AAA AA 000", "AA-000-AA", "00-AA-00000", "AAAAAAAAAA00000"]
+
+# Символы двухсимвольных кодов синтетических стран (заглавные, upper() их
+# не меняет): латиница, цифры, греческий и кириллица — 92^2 уникальных кодов
+SYNTHETIC_CODE_CHARS = (
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    "ΑΒΓΔΕΖΗΘΙΚΛΜΝΞΟΠΡΣΤΥΦΧΨΩ"
+    "АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+)
+
+
+def synthetic_countries(size: int, seed: int = 42) -> List[CountrySchema]:
+    """
+    Генерирует детерминированный набор стран со случайными шаблонами.
+
+    Коды стран уникальны: схема допускает только два символа, поэтому
+    они берутся из SYNTHETIC_CODE_CHARS (больше 676 латинских пар).
+    """
+    capacity = len(SYNTHETIC_CODE_CHARS) ** 2
+    if size > capacity:
+        raise ValueError(f"At most {capacity} synthetic countries")
+    rng = random.Random(seed)
+    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    chars = SYNTHETIC_CODE_CHARS
+    countries = []
+    for i in range(size):
+        length = rng.randint(5, 10)
+        pattern = "".join(rng.choice("AAA000-") for _ in range(length))
+        letters = "".join(sorted(rng.sample(alphabet, rng.randint(10, 26))))
+        countries.append(
+            CountrySchema(
+                country_code=f"{chars[i // len(chars)]}{chars[i % len(chars)]}",
+                country_name=f"Synthetic {i}",
+                pattern=pattern,
+                allowed_letters=letters,
+                lat=rng.uniform(-60, 70),
+                lng=rng.uniform(-180, 180),
+            )
+        )
+    return countries
+
+
+def write_csv(countries: Iterable[CountrySchema], path: Path) -> None:
+    """Записывает страны в CSV в формате data/countries.csv."""
+    fields = [
+        "country_code",
+        "country_name",
+        "pattern",
+        "allowed_letters",
+        "lat",
+        "lng",
+    ]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for country in countries:
+            writer.writerow({name: getattr(country, name) for name in fields})
+
+
+def _load_cases(
+    name: str,
+    csv_path: Path,
+    directory: tempfile.TemporaryDirectory,
+    iterations: int,
+) -> List[Tuple[str, Callable[[], object], int]]:
+    """Холодная загрузка репозитория из CSV и из бинарного снимка."""
+    snapshot_name = f"{name}.bin"
+    snapshot_file.main(
+        ["--csv", str(csv_path), "--out", str(Path(directory.name) / snapshot_name)]
+    )
+
+    def load(file_name: str) -> object:
+        # Как в новом процессе: планы ещё не скомпилированы. Замыкание
+        # держит directory, поэтому каталог живёт, пока живы кейсы
+        compile_plan.cache_clear()
+        slot_mask.cache_clear()
+        snapshot = Path(directory.name) / file_name
+        return CountryRepository(csv_path, snapshot_file=snapshot).get_snapshot()
+
+    return [
+        (f"repository.load/csv/{name}", lambda: load("missing.bin"), iterations),
+        (f"repository.load/binary/{name}", lambda: load(snapshot_name), iterations),
+    ]
+
+
+def _cycling(queries: Iterable[str], func: Callable[[str], object]) -> Callable[[], object]:
+    """Оборачивает func так, что каждый вызов берёт следующий запрос."""
+    source = cycle(list(queries))
+    return lambda: func(next(source))
+
+
+def build_cases(quick: bool = False) -> List[Tuple[str, Callable[[], object], int]]:
+    """Собирает список (имя, функция одной операции, число итераций)."""
+    scale = 0.1 if quick else 1.0
+
+    def n(iterations: int) -> int:
+        return max(1, int(iterations * scale))
+
+    calculator = PlateCalculator()
+    repository = CountryRepository()
+    compiled = repository.get_compiled()
+    packed = repository.get_packed()
+    index = repository.get_index()
+
+    synthetic = CountryRepository.from_countries(
+        synthetic_countries(300 if quick else 3000)
+    )
+    adversarial = CountryRepository.from_countries(
+        [
+            CountrySchema(
+                country_code=f"Z{i}",
+                country_name=f"Adversarial {i}",
+                pattern=pattern,
+                allowed_letters="",
+                lat=0,
+                lng=0,
+            )
+            for i, pattern in enumerate(ADVERSARIAL_PATTERNS)
+        ]
+    )
+
+    def count_all(query: str) -> list:
+        matcher = QueryMatcher(query)
+        return [matcher.count(plan) for _, plan in compiled]
+
+    def bound_all(query: str) -> list:
+        matcher = QueryMatcher(query)
+        return [matcher.upper_bound(plan) for _, plan in compiled]
+
+    def build_adversarial(query: str) -> list:
+        return [
+            calculator.calculate_probability(query, country, plan)
+            for country, plan in adversarial.get_compiled()
+        ]
+
+    # Реальный шаблон Германии (AAA AA 000) из набора данных
+    de_country, de_plan = compiled[repository.get_snapshot().positions["DE"]]
+    example_match = next(QueryMatcher("A7").iter_placements(de_plan))
+    de_winning = QueryMatcher("A7").count(de_plan)
+    example_rng = random.Random(0)
+
+    cases = [
+        ("index.candidates/realistic", _cycling(REALISTIC_QUERIES, index.candidates), n(5000)),
+        ("matcher.upper_bound/realistic", _cycling(REALISTIC_QUERIES, bound_all), n(500)),
+        ("matcher.count/realistic", _cycling(REALISTIC_QUERIES, count_all), n(200)),
+        ("matcher.count/adversarial", _cycling(ADVERSARIAL_QUERIES, count_all), n(200)),
+        (
+            "calculator.calculate_probability/adversarial",
+            _cycling(ADVERSARIAL_QUERIES, build_adversarial),
+            n(200),
+        ),
+        (
+            "calculator._generate_example/DE",
+            lambda: calculator._generate_example(example_match, "A7", de_plan, example_rng),
+            n(5000),
+        ),
+        (
+            "calculator.examples_page/DE",
+            lambda: calculator.examples_page("A7", de_country, de_plan, de_winning),
+            n(1000),
+        ),
+    ]
+
+    if packed is not None:
+        cases.append(
+            (
+                "vectorized.count_matches/realistic",
+                _cycling(REALISTIC_QUERIES, lambda q: count_matches(q, packed)),
+                n(500),
+            )
+        )
+        synthetic_packed = synthetic.get_packed()
+        cases.append(
+            (
+                "vectorized.count_matches/synthetic",
+                _cycling(REALISTIC_QUERIES, lambda q: count_matches(q, synthetic_packed)),
+                n(50),
+            )
+        )
+
+    for engine in (PlateService.ENGINE_SCALAR, PlateService.ENGINE_VECTORIZED):
+        # Без кэша: замеряется полный расчёт
+        service = PlateService(repository, calculator, engine=engine)
+        synthetic_service = PlateService(synthetic, calculator, engine=engine)
+        cases += [
+            (
+                f"service.check_plate/realistic/{engine}",
+                _cycling(REALISTIC_QUERIES, service.check_plate),
+                n(50),
+            ),
+            (
+                f"service.check_plate/limit5/{engine}",
+                _cycling(REALISTIC_QUERIES, lambda q, s=service: s.check_plate(q, limit=5)),
+                n(100),
+            ),
+            (
+                f"service.check_plates/batch20/{engine}",
+                lambda s=service: s.check_plates(REALISTIC_QUERIES),
+                n(5),
+            ),
+            (
+                f"service.create_luck_route/all-stops/{engine}",
+                lambda s=service: s.create_luck_route(
+                    "7", user_lat=55.75, user_lng=37.61, max_stops=len(compiled)
+                ),
+                n(20),
+            ),
+            (
+                f"service.check_plate/synthetic-limit10/{engine}",
+                _cycling(
+                    REALISTIC_QUERIES,
+                    lambda q, s=synthetic_service: s.check_plate(q, limit=10),
+                ),
+                n(10),
+            ),
+        ]
+
+    directory = tempfile.TemporaryDirectory(prefix="signluck-bench-")
+    synthetic_csv = Path(directory.name) / "synthetic.csv"
+    write_csv(synthetic.get_all(), synthetic_csv)
+    cases += _load_cases("realistic", repository.file_path, directory, n(20))
+    cases += _load_cases("synthetic", synthetic_csv, directory, n(3))
+
+    return cases
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="SignLuck hot path benchmarks")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="сохранить как baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="допустимая просадка относительно baseline (доля, по умолчанию 0.2)",
+    )
+    parser.add_argument("--filter", default="", help="запускать только имена с подстрокой")
+    parser.add_argument("--quick", action="store_true", help="уменьшенные прогоны")
+    args = parser.parse_args(argv)
+
+    results: List[BenchmarkResult] = []
+    for name, func, iterations in build_cases(quick=args.quick):
+        if args.filter and args.filter not in name:
+            continue
+        results.append(measure(name, func, iterations=iterations))
+
+    baseline = load_baseline(args.baseline)
+    print(format_table(results, baseline))
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one.")
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+
+    print(f"\nNo regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())